@@ -4,10 +4,13 @@ import importlib
 
 _NODE_MODULES = [
     "FPTextCleanAndSplitt",
+    "FPTextCleanAndSplittList",
     "FPFoldedPrompts",
+    "FPFoldedPromptsVariants",
     "FPTextAreaPlus",
     "FPTabbedTextArea",
     "FPTab",
+    "ExecutionBlockerBreaker",
 ]
 
 NODE_CLASS_MAPPINGS = {}
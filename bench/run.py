@@ -0,0 +1,328 @@
+"""Offline benchmarks for the node hot paths.
+
+    python bench/run.py                      # run all, compare with bench/baseline.json if present
+    python bench/run.py --save-baseline      # record a new baseline
+    python bench/run.py --only clean_split --threshold 0.1 --output bench_output.txt
+
+Each benchmark reports median latency, best-sample throughput, tracemalloc
+peak memory, the number of blocks still allocated after one run and gen-0 GC
+collections per run (a proxy for container allocation churn). The exit status
+is 1 when a result regresses past the threshold relative to the baseline:
+throughput below (1 - threshold) x baseline or peak memory above
+(1 + threshold) x baseline. Baselines are machine specific and not committed.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import workloads                        # noqa: E402
+from stubs import load_node_module      # noqa: E402
+
+BENCH_DIR        = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+THRESHOLD_ENV    = "FP_BENCH_THRESHOLD"
+MIN_SAMPLE_SEC   = 0.05
+PEAK_SLACK_BYTES = 64 * 1024   # tracemalloc noise on tiny workloads
+
+# name -> setup(scale) returning (op, bytes_per_op, items_per_op)
+BENCHMARKS: dict[str, Callable[[float], tuple[Callable[[], object], int, int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _nbytes(text: str) -> int:
+    return len(text.encode("utf-8", "surrogatepass"))
+
+
+# ------------------- FP Folded Prompts -------------------
+
+def _folded_cold(tree_json: str):
+    m = load_node_module("FPFoldedPrompts")
+
+    def op():
+        m._TREE_CACHE.clear()
+        return m._build_output_text(tree_json, "", "before text")
+
+    return op, _nbytes(tree_json), 1
+
+
+@benchmark("folded_deep_tree_cold")
+def _(scale):
+    return _folded_cold(workloads.deep_tree(scale))
+
+
+@benchmark("folded_wide_tree_cold")
+def _(scale):
+    return _folded_cold(workloads.wide_tree(scale))
+
+
+@benchmark("folded_fingerprint_warm")
+def _(scale):
+    m = load_node_module("FPFoldedPrompts")
+    tree_json = workloads.wide_tree(scale)
+    m._build_output_text(tree_json, "", "")
+    return (lambda: m.FPFoldedPrompts.fingerprint_inputs(pf_json=tree_json)), _nbytes(tree_json), 1
+
+
+@benchmark("tree_codec_roundtrip")
+def _(scale):
+    fp_tree = load_node_module("fp_tree")
+    tree_json = workloads.wide_tree(scale)
+    return (lambda: fp_tree.load_tree(fp_tree.encode_document(tree_json))), _nbytes(tree_json), 1
+
+
+# ------------------- FP Text Clean And Splitt -------------------
+
+@benchmark("clean_split_cold")
+def _(scale):
+    m = load_node_module("FPTextCleanAndSplitt")
+    text = workloads.area_text(scale)
+    return (lambda: m.clean_and_split(text, "before", "after", "//")), _nbytes(text), 1
+
+
+@benchmark("clean_split_execute_warm")
+def _(scale):
+    m = load_node_module("FPTextCleanAndSplitt")
+    node = m.FPTextCleanAndSplitt
+    text = workloads.area_text(scale)
+    node.hidden = SimpleNamespace(unique_id="bench")
+
+    def op():
+        return node.execute(text=text, before_text="", after_text="", comment_prefix="//")
+
+    return op, _nbytes(text), 1
+
+
+@benchmark("clean_split_list_batch")
+def _(scale):
+    m = load_node_module("FPTextCleanAndSplittList")
+    clean = load_node_module("FPTextCleanAndSplitt")
+    text = workloads.area_text(scale, target_bytes=1024 * 1024)
+    prompts = [text[i:i + 512] for i in range(0, len(text), 512)]
+
+    def op():
+        clean._RESULT_CACHE.clear()
+        return m.clean_and_split_batch(prompts, [""], [""], "//")
+
+    return op, _nbytes(text), len(prompts)
+
+
+# ------------------- text / tab nodes -------------------
+
+@benchmark("tabbed_fingerprint")
+def _(scale):
+    m = load_node_module("FPTabbedTextArea")
+    text = workloads.tab_text(scale)
+    return (lambda: m.FPTabbedTextArea.fingerprint_inputs(__fp_text__=text)), _nbytes(text), 1
+
+
+@benchmark("tabbed_execute")
+def _(scale):
+    m = load_node_module("FPTabbedTextArea")
+    node = m.FPTabbedTextArea
+    node.hidden = SimpleNamespace(unique_id="bench")
+    text = workloads.tab_text(scale)
+    return (lambda: node.execute(node_data_json="{}", __fp_text__=text, before_text="b", after_text="a")), _nbytes(text), 1
+
+
+@benchmark("text_area_plus_execute")
+def _(scale):
+    m = load_node_module("FPTextAreaPlus")
+    text = workloads.tab_text(scale)
+    return (lambda: m.FPTextAreaPlus.execute(text=text, before_text="b", after_text="a")), _nbytes(text), 1
+
+
+@benchmark("tab_execute")
+def _(scale):
+    m = load_node_module("FPTab")
+    text = workloads.tab_text(scale)
+
+    def op():
+        m.FPTab.fingerprint_inputs(__fp_tab_text__=text)
+        return m.FPTab.execute(owner_id="1", tab_name="Tab 1", __fp_tab_text__=text)
+
+    return op, _nbytes(text), 1
+
+
+# ------------------- Execution Blocker Breaker -------------------
+
+@benchmark("blocker_high_cardinality")
+def _(scale):
+    m = load_node_module("ExecutionBlockerBreaker")
+    node = m.ExecutionBlockerBreaker
+    ids = workloads.blocker_ids(scale)
+    blocker = m.ExecutionBlocker(None)
+    hidden = [SimpleNamespace(unique_id=uid, extra_pnginfo={"workflow": {"id": "wf"}}) for uid in ids]
+    value = [0.0] * 16
+
+    def op():
+        m.STORE.clear()
+        for h in hidden:
+            node.hidden = h
+            node.execute(value=value, cache_scope="workflow")
+            node.execute(value=blocker, cache_scope="workflow")
+
+    return op, 0, 2 * len(ids)
+
+
+# ------------------- runner -------------------
+
+def run_one(name: str, scale: float, repeat: int) -> dict:
+    op, nbytes, items = BENCHMARKS[name](scale)
+    op()  # warm-up: imports, regex compilation, caches that are meant to be warm
+
+    # Fast ops are looped so that each sample lasts at least MIN_SAMPLE_SEC.
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            op()
+        if time.perf_counter() - t0 >= MIN_SAMPLE_SEC or loops >= 1 << 20:
+            break
+        loops *= 4
+
+    gen0_before = gc.get_stats()[0]["collections"]
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            op()
+        times.append((time.perf_counter() - t0) / loops)
+    gen0 = (gc.get_stats()[0]["collections"] - gen0_before) / (repeat * loops)
+
+    gc.collect()
+    tracemalloc.start()
+    result = op()
+    _, peak = tracemalloc.get_traced_memory()
+    live_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del result
+
+    # Throughput uses the best sample: it is the least disturbed by other load.
+    median = statistics.median(times)
+    best = min(times)
+    return {
+        "median_ms":    median * 1000,
+        "ops_per_sec":  1.0 / best if best > 0 else float("inf"),
+        "items_per_sec": items / best if best > 0 else float("inf"),
+        "mb_per_sec":   nbytes / best / 1e6 if best > 0 and nbytes else 0.0,
+        "peak_bytes":   peak,
+        "live_blocks":  live_blocks,
+        "gc_gen0_per_op": gen0,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    failures = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if res["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            failures.append(
+                f"{name}: throughput {res['ops_per_sec']:.2f}/s < baseline {base['ops_per_sec']:.2f}/s"
+            )
+        if res["peak_bytes"] > base["peak_bytes"] * (1 + threshold) + PEAK_SLACK_BYTES:
+            failures.append(
+                f"{name}: peak memory {res['peak_bytes'] / 1e6:.2f} MB > baseline {base['peak_bytes'] / 1e6:.2f} MB"
+            )
+    return failures
+
+
+def format_report(results: dict, baseline: dict) -> str:
+    header = f"{'benchmark':<28} {'median ms':>10} {'ops/s':>10} {'items/s':>12} {'MB/s':>8} {'peak MB':>9} {'live blk':>9} {'gen0/op':>8} {'vs base':>8}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = f"{r['ops_per_sec'] / base['ops_per_sec'] - 1:+.0%}" if base else "-"
+        lines.append(
+            f"{name:<28} {r['median_ms']:>10.2f} {r['ops_per_sec']:>10.2f} {r['items_per_sec']:>12.0f} "
+            f"{r['mb_per_sec']:>8.1f} {r['peak_bytes'] / 1e6:>9.2f} {r['live_blocks']:>9} "
+            f"{r['gc_gen0_per_op']:>8.1f} {delta:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Folded Prompts nodes.")
+    parser.add_argument("--only", help="comma-separated substrings of benchmark names to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="workload size multiplier")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=float(os.environ.get(THRESHOLD_ENV, 0.25)),
+        help=f"allowed regression fraction (default 0.25, or ${THRESHOLD_ENV})",
+    )
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = list(BENCHMARKS)
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",") if w.strip()]
+        names = [n for n in names if any(w in n for w in wanted)]
+
+    baseline, baseline_meta = {}, {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        baseline, baseline_meta = data.get("results", {}), data.get("meta", {})
+        if baseline_meta.get("scale") != args.scale:
+            print(f"[bench] baseline was recorded with scale={baseline_meta.get('scale')}, ignoring it")
+            baseline = {}
+
+    results = {}
+    for name in names:
+        print(f"[bench] {name} ...", flush=True)
+        results[name] = run_one(name, args.scale, max(1, args.repeat))
+
+    report = format_report(results, baseline)
+    failures = compare(results, baseline, args.threshold) if baseline else []
+    if failures:
+        report += f"\n\nREGRESSIONS (threshold {args.threshold:.0%}):\n" + "\n".join("  " + f for f in failures)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+    if args.save_baseline:
+        meta = {
+            "scale":    args.scale,
+            "python":   platform.python_version(),
+            "platform": platform.platform(),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("results", {})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": {**previous, **results}}, f, indent=2)
+        print(f"[bench] baseline saved to {args.baseline}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Minimal stand-ins for the ComfyUI modules the nodes import, so the node
+modules can be loaded and exercised without a ComfyUI checkout."""
+import os
+import sys
+import types
+import importlib
+
+PACKAGE_NAME = "fp_bench_pkg"
+REPO_ROOT    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _IOType:
+    def __init__(self, name: str):
+        self.name = name
+
+    def Input(self, *args, **kwargs):
+        return ("input", self.name, args, kwargs)
+
+    def Output(self, *args, **kwargs):
+        return ("output", self.name, args, kwargs)
+
+
+class _MatchType:
+    @staticmethod
+    def Template(name, *args, **kwargs):
+        return name
+
+    @staticmethod
+    def Input(*args, **kwargs):
+        return ("input", "MATCH", args, kwargs)
+
+    @staticmethod
+    def Output(*args, **kwargs):
+        return ("output", "MATCH", args, kwargs)
+
+
+class _Hidden:
+    def __getattr__(self, name):
+        return name
+
+
+class _NodeOutput:
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+
+class _Schema:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _ComfyNode:
+    hidden = None
+
+
+def _make_io() -> types.SimpleNamespace:
+    io = types.SimpleNamespace(
+        ComfyNode=_ComfyNode,
+        Schema=_Schema,
+        NodeOutput=_NodeOutput,
+        MatchType=_MatchType,
+        Hidden=_Hidden(),
+        Custom=_IOType,
+    )
+    for name in ("String", "Int", "Float", "Boolean", "Combo", "Image", "Latent", "Conditioning"):
+        setattr(io, name, _IOType(name.upper()))
+    return io
+
+
+class ExecutionBlocker:
+    def __init__(self, message=None):
+        self.message = message
+
+
+def install_stubs() -> None:
+    if "comfy_api.latest" not in sys.modules:
+        comfy_api = types.ModuleType("comfy_api")
+        latest = types.ModuleType("comfy_api.latest")
+        latest.ComfyExtension = type("ComfyExtension", (), {})
+        latest.io = _make_io()
+        comfy_api.latest = latest
+        sys.modules["comfy_api"] = comfy_api
+        sys.modules["comfy_api.latest"] = latest
+
+    if "comfy_execution.graph" not in sys.modules:
+        comfy_execution = types.ModuleType("comfy_execution")
+        graph = types.ModuleType("comfy_execution.graph")
+        graph.ExecutionBlocker = ExecutionBlocker
+        comfy_execution.graph = graph
+        sys.modules["comfy_execution"] = comfy_execution
+        sys.modules["comfy_execution.graph"] = graph
+
+
+def load_node_module(name: str, repo_root: str = REPO_ROOT):
+    """Import nodes/<name>.py from the repo under a private package name,
+    without running the package __init__ (which registers every node)."""
+    install_stubs()
+    if PACKAGE_NAME not in sys.modules:
+        pkg = types.ModuleType(PACKAGE_NAME)
+        pkg.__path__ = [repo_root]
+        sys.modules[PACKAGE_NAME] = pkg
+    return importlib.import_module(f"{PACKAGE_NAME}.nodes.{name}")
@@ -0,0 +1,109 @@
+"""Deterministic synthetic inputs for the benchmarks. `scale` multiplies
+the size of every workload."""
+import json
+import random
+
+_WORDS = [
+    "masterpiece", "best_quality", "1girl", "solo", "looking_at_viewer", "smile",
+    "long_hair", "blue_eyes", "outdoors", "sky", "cloud", "tree", "dress",
+    "standing", "upper_body", "detailed_background", "night", "city_lights",
+]
+
+
+def _tags(rng: random.Random, n: int) -> str:
+    return ", ".join(rng.choice(_WORDS) for _ in range(n)) + ", "
+
+
+def _line(rng: random.Random, line_id: int) -> dict:
+    weight = rng.choice([1, 1, 1, 1.1, 1.2, 0.8])
+    text = _tags(rng, rng.randint(2, 8))
+    if weight != 1:
+        text = f"({text.rstrip(', ')}:{weight:.2f}), "
+    return {
+        "type":    "line",
+        "id":      f"line-{line_id}",
+        "enabled": rng.random() < 0.6,
+        "area":    rng.choice(["ALL"] * 6 + ["AR1", "AR2"]),
+        "text":    text,
+        "weight":  weight,
+    }
+
+
+def deep_tree(scale: float = 1.0, seed: int = 1) -> str:
+    """Binary folder tree ~12 levels deep with a few lines per folder."""
+    rng = random.Random(seed)
+    depth = max(3, int(12 + (scale - 1) * 2))
+    counter = [0]
+
+    def folder(level: int, path: list[str]) -> dict:
+        title = f"L{level}_{rng.randint(0, 9999)}"
+        sub_path = path + [title]
+        children = []
+        for _ in range(3):
+            counter[0] += 1
+            children.append(_line(rng, counter[0]))
+        if level < depth:
+            children += [folder(level + 1, sub_path) for _ in range(2)]
+        return {
+            "type": "folder", "id": "folder-" + "_".join(sub_path), "title": title,
+            "expanded": False, "area": rng.choice(["ALL"] * 5 + ["AR3"]), "children": children,
+        }
+
+    return json.dumps({"items": [folder(1, [])]})
+
+
+def wide_tree(scale: float = 1.0, seed: int = 2) -> str:
+    """Flat-ish tree: 200 folders with ~100 lines each."""
+    rng = random.Random(seed)
+    folders = max(1, int(200 * scale))
+    counter = 0
+    items = []
+    for f in range(folders):
+        children = []
+        for _ in range(100):
+            counter += 1
+            children.append(_line(rng, counter))
+        items.append({
+            "type": "folder", "id": f"folder-F{f}", "title": f"F{f}",
+            "expanded": False, "area": "ALL", "children": children,
+        })
+    return json.dumps({"items": items})
+
+
+def area_text(scale: float = 1.0, seed: int = 3, target_bytes: int = 4 * 1024 * 1024) -> str:
+    """Multi-MB prompt with comment lines and many <ARn> blocks."""
+    rng = random.Random(seed)
+    target = int(target_bytes * scale)
+    parts, size = [], 0
+    while size < target:
+        r = rng.random()
+        if r < 0.25:
+            chunk = "// " + _tags(rng, rng.randint(2, 6))
+        elif r < 0.55:
+            n = rng.randint(1, 5)
+            body = "\n".join(_tags(rng, rng.randint(2, 6)) for _ in range(rng.randint(1, 3)))
+            chunk = f"<AR{n}>{body}</>"
+        else:
+            chunk = _tags(rng, rng.randint(3, 10))
+        parts.append(chunk)
+        size += len(chunk) + 1
+    return "\n".join(parts)
+
+
+def tab_text(scale: float = 1.0, seed: int = 4, target_bytes: int = 8 * 1024 * 1024) -> str:
+    """Combined text of many large tabs, as the JS writes to __fp_text__."""
+    rng = random.Random(seed)
+    target = int(target_bytes * scale)
+    lines, size = [], 0
+    while size < target:
+        line = _tags(rng, rng.randint(4, 16))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def blocker_ids(scale: float = 1.0, seed: int = 5) -> list[str]:
+    """High-cardinality node ids, as produced by large or nested graphs."""
+    rng = random.Random(seed)
+    count = max(1, int(50_000 * scale))
+    return [f"{rng.randint(1, 999)}:{rng.randint(1, 99999)}:{i}" for i in range(count)]
@@ -7,7 +7,15 @@ import { api } from "../../scripts/api.js";
 import { app } from "../../../scripts/app.js";
 
 (function () {
-    const AREAS = ["ALL", "AR1", "AR2", "AR3", "AR4", "AR5"];
+    // Regions: <ARn> for any n, or <AR:name>; same keys as nodes/fp_regions.py.
+    // The area button cycles ALL, AR1..AR<region count>, then any other
+    // region already used in the tree.
+    const AREA_TAG = "AR(?:\\d+|:[^\\s<>/]+)";
+    const SINGLE_AREA_RE = new RegExp("^<(" + AREA_TAG + ")>\\s*([\\s\\S]*?)\\s*<\\/>\\s*$", "i");
+    const OPEN_AREA_RE = new RegExp("^<(" + AREA_TAG + ")>\\s*(.*)$", "i");
+    const REGION_COUNT_SETTING = "FP.RegionCount";
+    const DEFAULT_REGION_COUNT = 5;
+    const MAX_REGION_COUNT = 1024;
 
     // Tree UI configuration
     const TREE_FONT_FAMILY = "sans-serif";
@@ -29,6 +37,11 @@ import { app } from "../../../scripts/app.js";
     const TREE_WEIGHT_TEXT_BOX_WIDTH = 40;
     const TREE_WEIGHT_RIGHT_PADDING = 8;
 
+    // Taller trees get a fixed-height viewport with a scrollbar
+    const TREE_MAX_VISIBLE_ROWS = 40;
+    const TREE_SCROLLBAR_WIDTH = 10;
+    const TREE_SCROLLBAR_MIN_THUMB = 20;
+
     let PF_CONTEXT_MENU_PATCHED = false;
 
     function patchFPFoldedPromptsContextMenu() {
@@ -106,23 +119,48 @@ import { app } from "../../../scripts/app.js";
         console.log("[FPFoldedPrompts]", ...args);
     }
 
-    // Area symbol mapping: ALL -> ○, AR1..AR5 -> ①..⑤
-    function getAreaSymbol(area) {
-        switch (area) {
-            case "AR1":
-                return "①";
-            case "AR2":
-                return "②";
-            case "AR3":
-                return "③";
-            case "AR4":
-                return "④";
-            case "AR5":
-                return "⑤";
-            case "ALL":
-            default:
-                return "×";
+    // "<ar012>" / "AR:face" -> "AR12" / "AR:face" (see region_key() in fp_regions.py)
+    function normalizeArea(tag) {
+        const m = /^AR(?:(\d+)|:(.+))$/i.exec(tag);
+        if (!m) return "ALL";
+        return m[1] !== undefined ? "AR" + parseInt(m[1], 10) : "AR:" + m[2];
+    }
+
+    function getRegionCount() {
+        let v = null;
+        try { v = app.ui?.settings?.getSettingValue(REGION_COUNT_SETTING); } catch {}
+        if (v === null || v === undefined) {
+            try { v = localStorage.getItem(REGION_COUNT_SETTING); } catch {}
         }
+        const n = parseInt(v, 10);
+        return Number.isFinite(n) ? Math.min(Math.max(n, 1), MAX_REGION_COUNT) : DEFAULT_REGION_COUNT;
+    }
+
+    function registerRegionCountSetting() {
+        const api = app.ui?.settings;
+        if (!api?.addSetting) return;
+        api.addSetting({
+            id: REGION_COUNT_SETTING,
+            category: ["Folded Prompts", "Regions", "A"],
+            name: "Regions in the area cycle (AR1..ARn):",
+            type: "number",
+            defaultValue: DEFAULT_REGION_COUNT,
+            attrs: { min: 1, max: MAX_REGION_COUNT, step: 1 },
+            onChange: v => { try { localStorage.setItem(REGION_COUNT_SETTING, String(v)); } catch {} },
+        });
+    }
+
+    // Area symbol mapping: ALL -> ×, AR1..AR50 -> ①..㊿, larger numbers as
+    // digits, named regions by their first letter.
+    function getAreaSymbol(area) {
+        if (!area || area === "ALL") return "×";
+        const m = /^AR(\d+)$/.exec(area);
+        if (!m) return area.slice(3, 4).toUpperCase() || "?";
+        const n = parseInt(m[1], 10);
+        if (n >= 1 && n <= 20) return String.fromCodePoint(0x2460 + n - 1);
+        if (n >= 21 && n <= 35) return String.fromCodePoint(0x3251 + n - 21);
+        if (n >= 36 && n <= 50) return String.fromCodePoint(0x32b1 + n - 36);
+        return m[1];
     }
 
     function clipTextToWidth(ctx, text, maxWidth) {
@@ -142,6 +180,33 @@ import { app } from "../../../scripts/app.js";
         return ellipsis;
     }
 
+    // clipTextToWidth memoized per row item; recomputed only when the
+    // label, font or available width changes.
+    const clipCache = new WeakMap();
+
+    function clipRowLabel(ctx, item, label, maxWidth) {
+        const font = ctx.font;
+        const cached = clipCache.get(item);
+        if (cached && cached.label === label && cached.maxWidth === maxWidth && cached.font === font) {
+            return cached.clipped;
+        }
+        const clipped = clipTextToWidth(ctx, label, maxWidth);
+        clipCache.set(item, { label, maxWidth, font, clipped });
+        return clipped;
+    }
+
+    const symbolWidthCache = new Map();
+
+    function measureSymbol(ctx, symbol) {
+        const key = ctx.font + "|" + symbol;
+        let w = symbolWidthCache.get(key);
+        if (w === undefined) {
+            w = ctx.measureText(symbol).width;
+            symbolWidthCache.set(key, w);
+        }
+        return w;
+    }
+
 
 
     // Detect weight from a full line text without changing the text itself.
@@ -382,9 +447,9 @@ import { app } from "../../../scripts/app.js";
 
             // --- Single-line area tag: <ARx> ... </>
             let area = "ALL";
-            const singleAreaMatch = text.match(/^<(AR[1-5])>\s*([\s\S]*?)\s*<\/>\s*$/);
+            const singleAreaMatch = text.match(SINGLE_AREA_RE);
             if (singleAreaMatch) {
-                area = singleAreaMatch[1];
+                area = normalizeArea(singleAreaMatch[1]);
                 const innerText = singleAreaMatch[2].trim();
                 const lineItem = {
                     type: "line",
@@ -412,9 +477,9 @@ import { app } from "../../../scripts/app.js";
             }
 
             // --- Start of multiline block <ARx> ... (without </> on this line)
-            const openAreaMatch = text.match(/^<(AR[1-5])>\s*(.*)$/);
+            const openAreaMatch = text.match(OPEN_AREA_RE);
             if (openAreaMatch) {
-                areaBlockArea = openAreaMatch[1];
+                areaBlockArea = normalizeArea(openAreaMatch[1]);
                 areaBlockEnabled = enabled;
                 areaBlockLines = [];
 
@@ -469,91 +534,100 @@ import { app } from "../../../scripts/app.js";
 
     // ------------------- TREE -> TEXT -------------------
 
-    function treeToText(tree) {
+    // `cache` (optional WeakMap folder -> lines) lets callers reuse the
+    // rendered block of every folder that no patch has touched since.
+    function treeToText(tree, cache) {
         log("treeToText() start");
         const items = (tree && tree.items) || [];
         const out = [];
 
-        function walk(itemsList, path) {
+        function folderLines(item, path) {
+            const cached = cache && cache.get(item);
+            if (cached) return cached;
+
+            const newPath = [...path, item.title];
+            const bracketPath = newPath.join("/") + "/";
+            const lines = ["[" + bracketPath.replace(/\/+$/, "/") + "]"];
+            walk(item.children || [], newPath, lines);
+            if (cache) cache.set(item, lines);
+            return lines;
+        }
+
+        function walk(itemsList, path, target) {
             for (const item of itemsList) {
                 if (item.type === "folder") {
-                    const newPath = [...path, item.title];
-                    const bracketPath = newPath.join("/") + "/";
                     // always insert an empty line before each folder header
-                    if (out.length === 0 || out[out.length - 1] !== "") {
-                        out.push("");
+                    if (target.length === 0 || target[target.length - 1] !== "") {
+                        target.push("");
                     }
-                    out.push("[" + bracketPath.replace(/\/+$/, "/") + "]");
-                    log("Export folder:", bracketPath);
-                    walk(item.children || [], newPath);
+                    for (const line of folderLines(item, path)) target.push(line);
                 } else if (item.type === "line") {
                     let lineText = item.text || "";
 
                     // Apply weight to the line text (if any)
                     lineText = applyWeightToLineText(lineText, item.weight);
 
-                    // If the line has area (AR1..AR5) — wrap in tag
+                    // If the line has an area (ARn, AR:name) — wrap in tag
                     if (item.area && item.area !== "ALL") {
                         lineText = `<${item.area}>` + lineText + `</>`;
                     }
 
                     const prefix = item.enabled ? "" : "// ";
-                    out.push(prefix + lineText);
-                    log(
-                        "Export line:",
-                        "enabled=",
-                        item.enabled,
-                        "area=",
-                        item.area || "ALL",
-                        "text=",
-                        item.text || ""
-                    );
+                    target.push(prefix + lineText);
                 }
             }
         }
 
-        walk(items, []);
+        walk(items, [], out);
         const result = out.join("\n");
         log("treeToText() done, length:", result.length);
         return result;
     }
     // ------------------- TREE helpers -------------------
 
-    function rebuildFlat(state) {
-        log("rebuildFlat()");
-        const flat = [];
+    // Recompute a folder's derived flags from its direct children, whose own
+    // flags must already be current.
+    function deriveFolderFlags(item) {
+        let hasEnabled = false;
+        let hasDisabled = false;
 
-        function computeFolderEnabled(item) {
-            let hasEnabled = false;
-            let hasDisabled = false;
-
-            for (const child of item.children || []) {
-                if (child.type === "line") {
-                    if (child.enabled) {
-                        hasEnabled = true;
-                    } else {
-                        hasDisabled = true;
-                    }
-                } else if (child.type === "folder") {
-                    const childHasEnabled = computeFolderEnabled(child);
-                    if (childHasEnabled) {
-                        hasEnabled = true;
-                    } else {
-                        hasDisabled = true;
-                    }
-                    if (child._partialSelected) {
-                        hasDisabled = true;
-                    }
+        for (const child of item.children || []) {
+            if (child.type === "line") {
+                if (child.enabled) {
+                    hasEnabled = true;
+                } else {
+                    hasDisabled = true;
+                }
+            } else if (child.type === "folder") {
+                if (child._hasAnyEnabled) {
+                    hasEnabled = true;
+                } else {
+                    hasDisabled = true;
+                }
+                if (child._partialSelected) {
+                    hasDisabled = true;
                 }
             }
+        }
+
+        item._hasAnyEnabled = hasEnabled;
+        item._hasAnyDisabled = hasDisabled;
+        item._partialSelected = hasEnabled && hasDisabled;
+        item._derivedEnabled = hasEnabled;
 
-            item._hasAnyEnabled = hasEnabled;
-            item._hasAnyDisabled = hasDisabled;
-            item._partialSelected = hasEnabled && hasDisabled;
-            item._derivedEnabled = hasEnabled;
+        return hasEnabled;
+    }
 
-            return hasEnabled;
+    function computeFolderEnabled(item) {
+        for (const child of item.children || []) {
+            if (child.type === "folder") computeFolderEnabled(child);
         }
+        return deriveFolderFlags(item);
+    }
+
+    function rebuildFlat(state) {
+        log("rebuildFlat()");
+        const flat = [];
 
         function walk(items, depth, parentFolder, inheritedLock) {
             if (!items) return;
@@ -677,30 +751,406 @@ import { app } from "../../../scripts/app.js";
     }
 
 
-    function nextArea(current) {
-        const idx = AREAS.indexOf(current || "ALL");
+    function areaCycle(tree) {
+        const cycle = ["ALL"];
+        const count = getRegionCount();
+        for (let n = 1; n <= count; n++) cycle.push("AR" + n);
+        const seen = new Set(cycle);
+        const extra = [];
+        (function walk(items) {
+            for (const item of items || []) {
+                if (item.area && !seen.has(item.area)) {
+                    seen.add(item.area);
+                    extra.push(item.area);
+                }
+                if (item.type === "folder") walk(item.children);
+            }
+        })(tree && tree.items);
+        extra.sort((a, b) => {
+            const na = /^AR\d+$/.test(a) ? parseInt(a.slice(2), 10) : Infinity;
+            const nb = /^AR\d+$/.test(b) ? parseInt(b.slice(2), 10) : Infinity;
+            return na - nb || 0;
+        });
+        return cycle.concat(extra);
+    }
+
+    function nextArea(current, tree) {
+        const cycle = areaCycle(tree);
+        const idx = cycle.indexOf(current || "ALL");
         if (idx < 0) return "ALL";
-        return AREAS[(idx + 1) % AREAS.length];
+        return cycle[(idx + 1) % cycle.length];
+    }
+
+    // ------------------- COMPACT pf_json -------------------
+    // Format 1, shared with nodes/fp_tree.py (encode_tree / decode_tree):
+    //   { fp: 1, areas: ["AR2", ...], en: "<base64 bitset>", items: [...], x: {...} }
+    //   "text"                                 line with default area/weight/id
+    //   { t, a, w, i, x }                      line with non-default fields
+    //   [title, [children], { a, e, i, x }]    folder (options only when non-default)
+    //   { r: node }                            node kept verbatim
+    // "en" has one bit per compact line in document order (LSB first).
+    // Derived folder fields are recomputed by rebuildFlat and never stored.
+    // "e" (expanded) is view state: it is only written for imports, never to
+    // the pf_json widget, whose value is part of ComfyUI's cache signature.
+    // The node keeps expanded folders in its EXPANDED_PROPERTY instead.
+
+    const PF_COMPACT_VERSION = 1;
+    const PF_DERIVED_FIELDS = ["_hasAnyEnabled", "_hasAnyDisabled", "_partialSelected", "_derivedEnabled"];
+    const PF_LINE_KEYS = ["type", "id", "enabled", "area", "text", "weight"];
+    const PF_FOLDER_KEYS = ["type", "id", "title", "expanded", "area", "children"];
+    const PF_LINE_ID_RE = /^line-(0|[1-9][0-9]{0,14})$/;
+
+    function isCompactTree(doc) {
+        return !!doc && typeof doc === "object" && !Array.isArray(doc) && "fp" in doc;
+    }
+
+    function stripDerived(node) {
+        if (Array.isArray(node)) return node.map(stripDerived);
+        if (node && typeof node === "object") {
+            const out = {};
+            for (const k of Object.keys(node)) {
+                if (!PF_DERIVED_FIELDS.includes(k) && node[k] !== undefined) {
+                    out[k] = stripDerived(node[k]);
+                }
+            }
+            return out;
+        }
+        return node;
+    }
+
+    function pickExtras(item, knownKeys) {
+        let extras = null;
+        for (const k of Object.keys(item)) {
+            if (knownKeys.includes(k) || PF_DERIVED_FIELDS.includes(k) || item[k] === undefined) continue;
+            extras = extras || {};
+            extras[k] = item[k];
+        }
+        return extras;
+    }
+
+    function nextLineId(lineId, expected) {
+        const m = PF_LINE_ID_RE.exec(lineId);
+        return m ? parseInt(m[1], 10) + 1 : expected + 1;
+    }
+
+    function encodeTree(tree, viewState = false) {
+        if (isCompactTree(tree) || !tree || typeof tree !== "object" || !Array.isArray(tree.items)) {
+            return tree;
+        }
+        const areas = [];
+        const bits = [];
+        let nextId = 1;
+
+        function areaRef(area) {
+            let idx = areas.indexOf(area);
+            if (idx < 0) {
+                areas.push(area);
+                idx = areas.length - 1;
+            }
+            return idx + 1;
+        }
+
+        function enc(item, path) {
+            if (!item || typeof item !== "object" || Array.isArray(item)) {
+                return { r: stripDerived(item) };
+            }
+            if (item.type === "line") {
+                const { text, weight, id } = item;
+                if (
+                    typeof text !== "string" || typeof item.enabled !== "boolean" ||
+                    typeof item.area !== "string" || typeof id !== "string" ||
+                    weight === undefined
+                ) {
+                    return { r: stripDerived(item) };
+                }
+                const out = {};
+                if (item.area !== "ALL") out.a = areaRef(item.area);
+                if (!(typeof weight === "number" && Number.isFinite(weight) &&
+                      weight === detectLineWeightFromText(text))) {
+                    out.w = weight;
+                }
+                if (id !== "line-" + nextId) out.i = id;
+                nextId = nextLineId(id, nextId);
+                const extras = pickExtras(item, PF_LINE_KEYS);
+                if (extras) out.x = extras;
+                bits.push(item.enabled);
+                return Object.keys(out).length ? { t: text, ...out } : text;
+            }
+            if (item.type === "folder") {
+                const { title, children, id } = item;
+                if (
+                    typeof title !== "string" || !Array.isArray(children) ||
+                    typeof item.area !== "string" || typeof item.expanded !== "boolean" ||
+                    typeof id !== "string"
+                ) {
+                    return { r: stripDerived(item) };
+                }
+                const subPath = [...path, title];
+                const encoded = [title, children.map((child) => enc(child, subPath))];
+                const opts = {};
+                if (item.area !== "ALL") opts.a = areaRef(item.area);
+                if (viewState && item.expanded) opts.e = 1;
+                if (id !== "folder-" + subPath.join("_")) opts.i = id;
+                const extras = pickExtras(item, PF_FOLDER_KEYS);
+                if (extras) opts.x = extras;
+                if (Object.keys(opts).length) encoded.push(opts);
+                return encoded;
+            }
+            return { r: stripDerived(item) };
+        }
+
+        const items = tree.items.map((item) => enc(item, []));
+        const packed = new Uint8Array((bits.length + 7) >> 3);
+        bits.forEach((bit, i) => {
+            if (bit) packed[i >> 3] |= 1 << (i & 7);
+        });
+        let binary = "";
+        for (let i = 0; i < packed.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, packed.subarray(i, i + 0x8000));
+        }
+
+        const doc = { fp: PF_COMPACT_VERSION, areas, en: btoa(binary), items };
+        const extras = pickExtras(tree, ["items"]);
+        if (extras) doc.x = extras;
+        return doc;
+    }
+
+    function decodeTree(doc) {
+        if (!isCompactTree(doc)) return stripDerived(doc);
+        if (doc.fp !== PF_COMPACT_VERSION) {
+            throw new Error("unsupported pf_json format version: " + doc.fp);
+        }
+        const areas = doc.areas || [];
+        const binary = atob(doc.en || "");
+        let lineIndex = 0;
+        let nextId = 1;
+
+        function areaOf(ref) {
+            return Number.isInteger(ref) && ref > 0 && ref <= areas.length ? areas[ref - 1] : "ALL";
+        }
+
+        function dec(node, path) {
+            if (Array.isArray(node)) {
+                const [title, children] = node;
+                const opts = node[2] || {};
+                const subPath = [...path, title];
+                const folder = {
+                    type: "folder",
+                    id: "i" in opts ? opts.i : "folder-" + subPath.join("_"),
+                    title,
+                    expanded: !!opts.e,
+                    area: areaOf(opts.a),
+                    children: children.map((child) => dec(child, subPath)),
+                };
+                return Object.assign(folder, opts.x || {});
+            }
+            if (node && typeof node === "object" && "r" in node) {
+                return node.r;
+            }
+            const fields = typeof node === "string" ? { t: node } : node;
+            const text = fields.t;
+            const lineId = "i" in fields ? fields.i : "line-" + nextId;
+            nextId = nextLineId(lineId, nextId);
+            const i = lineIndex++;
+            const byte = (i >> 3) < binary.length ? binary.charCodeAt(i >> 3) : 0;
+            const line = {
+                type: "line",
+                id: lineId,
+                enabled: !!(byte & (1 << (i & 7))),
+                area: areaOf(fields.a),
+                text,
+                weight: "w" in fields ? fields.w : detectLineWeightFromText(text),
+            };
+            return Object.assign(line, fields.x || {});
+        }
+
+        const tree = { items: (doc.items || []).map((node) => dec(node, [])) };
+        return Object.assign(tree, doc.x || {});
+    }
+
+    // ------------------- VIEW STATE -------------------
+
+    const EXPANDED_PROPERTY = "fp_expanded";
+
+    function forEachFolder(items, fn) {
+        for (const item of items || []) {
+            if (!item || typeof item !== "object" || item.type !== "folder") continue;
+            fn(item);
+            forEachFolder(item.children, fn);
+        }
+    }
+
+    // Expanded folder ids -> node property (saved with the workflow, but not
+    // sent with the prompt).
+    function storeExpandedState(node) {
+        const s = node._pf;
+        if (!s || !s.tree) return;
+        const ids = [];
+        forEachFolder(s.tree.items, (folder) => {
+            if (folder.expanded) ids.push(folder.id);
+        });
+        if (!node.properties) node.properties = {};
+        node.properties[EXPANDED_PROPERTY] = ids;
+    }
+
+    // Applies the stored state to a freshly decoded tree. Without a stored
+    // state (older workflows) the tree's own expanded flags are kept.
+    function restoreExpandedState(node, tree) {
+        const ids = node.properties?.[EXPANDED_PROPERTY];
+        if (!Array.isArray(ids)) return;
+        const expanded = new Set(ids);
+        forEachFolder(tree.items, (folder) => {
+            folder.expanded = expanded.has(folder.id);
+        });
     }
 
     // ------------------- MODE / SYNC helpers -------------------
 
+    // ------------------- PATCHES -------------------
+    // Tree-mode edits mutate the tree in place, bump s.version and queue a
+    // small patch. Derived folder flags are fixed up immediately (only the
+    // edited item and its ancestors); the text/pf_json widgets are rewritten
+    // later by flushTreeSync, which re-renders only folders touched by the
+    // queued patches. Flushing is debounced and forced before serialization.
+
+    const TREE_SYNC_DEBOUNCE_MS = 300;
+    const TREE_PATCH_LOG_LIMIT = 256;
+
+    function ensureParentIndex(s) {
+        if (s._parentsTree === s.tree && s._parents) return s._parents;
+        const parents = new WeakMap();
+        function walk(items, parent) {
+            for (const item of items || []) {
+                if (!item || typeof item !== "object") continue;
+                parents.set(item, parent);
+                if (item.type === "folder") walk(item.children, item);
+            }
+        }
+        walk(s.tree && s.tree.items, null);
+        s._parents = parents;
+        s._parentsTree = s.tree;
+        return parents;
+    }
+
+    function forEachFolderInSubtree(folder, fn) {
+        fn(folder);
+        for (const child of folder.children || []) {
+            if (child && child.type === "folder") forEachFolderInSubtree(child, fn);
+        }
+    }
+
+    function applyTreePatch(node, op, item, value) {
+        const s = node._pf;
+        if (!s || !item) return;
+        const parents = ensureParentIndex(s);
+        const isFolder = item.type === "folder";
+
+        switch (op) {
+            case "enabled":
+                if (isFolder) {
+                    toggleFolderEnabled(item, value);
+                    computeFolderEnabled(item);
+                } else {
+                    item.enabled = value;
+                }
+                break;
+            case "area":
+                item.area = value;
+                if (isFolder) applyAreaRecursive(item, value);
+                break;
+            case "weight":
+                item.weight = value;
+                item.text = applyWeightToLineText(item.text, value);
+                break;
+            default:
+                console.warn("[FPFoldedPrompts] unknown tree patch:", op);
+                return;
+        }
+
+        if (op === "enabled") {
+            for (let p = parents.get(item); p; p = parents.get(p)) {
+                deriveFolderFlags(p);
+            }
+        }
+
+        s.version = (s.version || 0) + 1;
+        const patch = { v: s.version, op, id: item.id, value, item };
+        (s.pendingPatches = s.pendingPatches || []).push(patch);
+        s.patches = s.patches || [];
+        s.patches.push({ v: patch.v, op, id: patch.id, value });
+        if (s.patches.length > TREE_PATCH_LOG_LIMIT) {
+            s.patches.splice(0, s.patches.length - TREE_PATCH_LOG_LIMIT);
+        }
+        scheduleTreeSync(node);
+    }
+
+    function scheduleTreeSync(node) {
+        const s = node._pf;
+        if (!s) return;
+        if (s._syncTimer) clearTimeout(s._syncTimer);
+        s._syncTimer = setTimeout(() => {
+            s._syncTimer = null;
+            flushTreeSync(node);
+        }, TREE_SYNC_DEBOUNCE_MS);
+    }
+
+    function cancelTreeSync(s) {
+        if (s && s._syncTimer) {
+            clearTimeout(s._syncTimer);
+            s._syncTimer = null;
+        }
+    }
+
+    // Write pending patches to the widgets now (no-op when nothing is pending).
+    function flushTreeSync(node) {
+        const s = node._pf;
+        if (!s) return;
+        cancelTreeSync(s);
+        const pending = s.pendingPatches;
+        if (!pending || pending.length === 0) return;
+        s.pendingPatches = [];
+
+        const cache = s.textCache || (s.textCache = new WeakMap());
+        const parents = ensureParentIndex(s);
+        for (const patch of pending) {
+            const item = patch.item;
+            if (item.type === "folder") {
+                forEachFolderInSubtree(item, (f) => cache.delete(f));
+            }
+            for (let p = parents.get(item); p; p = parents.get(p)) {
+                cache.delete(p);
+            }
+        }
+        writeTreeWidgets(node);
+    }
+
+    // Full resync after the tree was replaced or changed wholesale.
     function syncJsonWidget(node) {
+        const s = node._pf;
+        if (!s) return;
+        cancelTreeSync(s);
+        s.pendingPatches = [];
+        s.textCache = new WeakMap();
+        writeTreeWidgets(node);
+    }
+
+    function writeTreeWidgets(node) {
         const s = node._pf;
         if (!s || !s.pfJsonWidget) return;
 
         if (s.textWidget) {
-            s.textWidget.value = treeToText(s.tree);
+            s.textWidget.value = treeToText(s.tree, s.textCache);
         }
 
         try {
-            const json = JSON.stringify(s.tree);
+            const json = JSON.stringify(encodeTree(s.tree));
             s.pfJsonWidget.value = json;
-            log("syncJsonWidget() ok, length:", json.length);
-            console.log("[FPFoldedPrompts] syncJsonWidget pf_json:", json);
+            storeExpandedState(node);
+            log("syncJsonWidget() ok, length:", json.length, "version:", s.version || 0);
         } catch (e) {
             console.warn("[FPFoldedPrompts] syncJsonWidget() failed:", e);
         }
+        s.syncedVersion = s.version || 0;
 
         if (s.textWidget && typeof s.textWidget.callback === "function") {
             s.textWidget.callback(s.textWidget.value, s.textWidget, node, app);
@@ -758,8 +1208,7 @@ import { app } from "../../../scripts/app.js";
                 treeWidget.computeSize = function (width) {
                     const lineH = TREE_LINE_HEIGHT;
                     const paddingTop = 8;
-                    const s2 = node._pf;
-                    const count = (s2 && s2.flat && s2.flat.length) || 1;
+                    const count = treeViewportRows(node._pf);
                     const h = paddingTop + count * lineH + 4;
                     return [width, h];
                 };
@@ -776,26 +1225,76 @@ import { app } from "../../../scripts/app.js";
         // node.graph?.setDirtyCanvas(true, true);
     }
 
+    // Texts this long are parsed by the server (POST /fp/import, a port of
+    // parseFolderTextToTree) instead of on the UI thread. The local parser
+    // stays the fallback when the server can't be reached.
+    const SERVER_IMPORT_MIN_CHARS = 256 * 1024;
+
+    async function parseFolderTextOnServer(raw) {
+        const resp = await api.fetchApi("/fp/import", {
+            method: "POST",
+            headers: { "Content-Type": "text/plain; charset=utf-8" },
+            body: raw,
+        });
+        if (!resp.ok) throw new Error("HTTP " + resp.status);
+        const data = await resp.json();
+        return decodeTree(data.tree);  // carries "e": imports start with the parser's view
+    }
+
+    function applyParsedTree(node, tree) {
+        const s = node._pf;
+        s.tree = tree;
+        rebuildFlat(s);
+        syncJsonWidget(node);
+        savePromptText(node);
+    }
+
+    async function importLargeText(node, raw) {
+        const s = node._pf;
+        if (s._importing) return;
+        s._importing = true;
+        let tree;
+        try {
+            tree = await parseFolderTextOnServer(raw);
+        } catch (e) {
+            console.warn("[FPFoldedPrompts] Server import failed, parsing locally:", e);
+            tree = parseFolderTextToTree(raw);
+        } finally {
+            s._importing = false;
+        }
+        // Ignore the result if the user switched modes meanwhile.
+        if (s.mode !== "text") return;
+        applyParsedTree(node, tree);
+        s.mode = "tree";
+        if (s.textWidget) {
+            s.textWidget.value = treeToText(s.tree, s.textCache);
+        }
+        updateModeUI(node);
+        node.graph?.setDirtyCanvas(true, true);
+    }
+
     function handleMainButton(node) {
         const s = node._pf;
         if (!s) return;
         log("handleMainButton(), current mode:", s.mode);
+        flushTreeSync(node);
 
         const textWidget = s.textWidget;
 
         if (s.mode === "text") {
             const raw = (textWidget && textWidget.value) || "";
             if (raw !== s._textSnapshot) {
-                s.tree = parseFolderTextToTree(raw);
-                rebuildFlat(s);
-                syncJsonWidget(node);
-                savePromptText(node);
+                if (raw.length >= SERVER_IMPORT_MIN_CHARS) {
+                    importLargeText(node, raw);
+                    return;
+                }
+                applyParsedTree(node, parseFolderTextToTree(raw));
             }
 
             s.mode = "tree";
         } else {
             log("Converting tree -> text (from current tree)");
-            const restore = treeToText(s.tree);
+            const restore = treeToText(s.tree, s.textCache);
             if (textWidget) {
                 textWidget.value = restore;
             }
@@ -804,12 +1303,49 @@ import { app } from "../../../scripts/app.js";
         }
 
         if (s.textWidget) {
-            s.textWidget.value = treeToText(s.tree);
+            s.textWidget.value = treeToText(s.tree, s.textCache);
         }
         updateModeUI(node);
     }
     // ------------------- DRAW TREE WIDGET -------------------
 
+    function treeViewportRows(s) {
+        const count = (s && s.flat && s.flat.length) || 0;
+        return Math.max(1, Math.min(count, TREE_MAX_VISIBLE_ROWS));
+    }
+
+    function clampTreeScroll(s) {
+        const count = (s.flat && s.flat.length) || 0;
+        const maxScroll = Math.max(0, count - treeViewportRows(s));
+        s.scrollRow = Math.min(Math.max(0, Math.round(s.scrollRow || 0)), maxScroll);
+        return maxScroll;
+    }
+
+    // Slot range [first, last) of the viewport that is on screen. LiteGraph
+    // keeps the visible graph rectangle in canvas.visible_area.
+    function visibleSlotRange(node, y, contentStartY, lineH, slots) {
+        const canvas = app.canvas;
+        const area = canvas && (canvas.visible_area || (canvas.ds && canvas.ds.visible_area));
+        if (!area || !node.pos) return [0, slots];
+        const top = node.pos[1] + y + contentStartY;
+        const first = Math.floor((area[1] - top) / lineH);
+        const last = Math.ceil((area[1] + area[3] - top) / lineH);
+        return [Math.max(0, first), Math.min(slots, last)];
+    }
+
+    function scrollbarGeometry(s, widgetWidth) {
+        const layout = s._layout;
+        const slots = layout.slots;
+        const count = layout.rowCount;
+        const trackX = widgetWidth - TREE_SCROLLBAR_WIDTH - 2;
+        const trackY = layout.contentStartY;
+        const trackH = slots * layout.lineH;
+        const thumbH = Math.max(TREE_SCROLLBAR_MIN_THUMB, trackH * slots / count);
+        const maxScroll = Math.max(1, count - slots);
+        const thumbY = trackY + (trackH - thumbH) * (s.scrollRow / maxScroll);
+        return { trackX, trackY, trackH, thumbY, thumbH, maxScroll };
+    }
+
     function drawTreeWidget(ctx, node, widgetWidth, y, height) {
         const s = node._pf;
         if (!s || s.mode !== "tree") return;
@@ -821,6 +1357,24 @@ import { app } from "../../../scripts/app.js";
         s._widgetY = y;
         const contentStartY = 4;
 
+        const slots = treeViewportRows(s);
+        const maxScroll = clampTreeScroll(s);
+        const scrollable = maxScroll > 0;
+        const scrollRow = s.scrollRow;
+        const fullWidth = widgetWidth;
+        if (scrollable) widgetWidth -= TREE_SCROLLBAR_WIDTH + 4;
+
+        s._layout = {
+            lineH,
+            paddingX,
+            contentStartY,
+            rowCount: flat.length,
+            widgetWidth,
+            fullWidth,
+            slots,
+            scrollable,
+        };
+
         ctx.save();
         // ctx.fillStyle = "#111";
         // ctx.fillRect(0, y, widgetWidth, height);
@@ -829,8 +1383,9 @@ import { app } from "../../../scripts/app.js";
         ctx.font = TREE_FONT_SIZE_LINE + "px " + TREE_FONT_FAMILY;
         ctx.textBaseline = "alphabetic";
 
-        for (let i = 0; i < flat.length; i++) {
-            const row = flat[i];
+        const [firstSlot, lastSlot] = visibleSlotRange(node, y, contentStartY, lineH, slots);
+        for (let i = firstSlot; i < lastSlot && scrollRow + i < flat.length; i++) {
+            const row = flat[scrollRow + i];
             const item = row.item;
             const depth = row.depth || 0;
 
@@ -901,8 +1456,7 @@ import { app } from "../../../scripts/app.js";
                 ctx.fillStyle = "#ffff00";
             }
 
-            const textMetrics = ctx.measureText(symbol);
-            const textWidth = textMetrics.width;
+            const textWidth = measureSymbol(ctx, symbol);
             const textX = areaX + (areaW - textWidth) / 2;
             const textY = cbYCanvas + areaH / 2 + 1.5;
 
@@ -942,7 +1496,7 @@ import { app } from "../../../scripts/app.js";
                 reservedRight += TREE_WEIGHT_COL_WIDTH;
             }
             const maxTextWidth = widgetWidth - (labelX + 2) - reservedRight;
-            const clippedLabel = clipTextToWidth(ctx, label, maxTextWidth);
+            const clippedLabel = clipRowLabel(ctx, item, label, maxTextWidth);
 
             ctx.fillText(clippedLabel, labelX + 2, rowCenterCanvas + 4);
 
@@ -999,15 +1553,46 @@ import { app } from "../../../scripts/app.js";
             }
         }
 
+        if (scrollable) {
+            const g = scrollbarGeometry(s, fullWidth);
+            ctx.fillStyle = "#1a1a1a";
+            ctx.fillRect(g.trackX, y + g.trackY, TREE_SCROLLBAR_WIDTH, g.trackH);
+            ctx.fillStyle = s._scrollDrag ? "#aaa" : "#666";
+            ctx.fillRect(g.trackX + 1, y + g.thumbY, TREE_SCROLLBAR_WIDTH - 2, g.thumbH);
+        }
+
         ctx.restore();
+    }
 
-        s._layout = {
-            lineH,
-            paddingX,
-            contentStartY,
-            rowCount: flat.length,
-            widgetWidth,
-        };
+    // Scrollbar: drag the thumb, click the track to page.
+    function handleTreeScrollbar(event, localX, localY, node) {
+        const s = node._pf;
+        const layout = s._layout;
+        const g = scrollbarGeometry(s, layout.fullWidth);
+
+        if (event.type === "pointermove" || event.type === "mousemove") {
+            if (!s._scrollDrag) return false;
+            const rowsPerPx = g.maxScroll / Math.max(1, g.trackH - g.thumbH);
+            s.scrollRow = s._scrollDrag.startRow + (localY - s._scrollDrag.startY) * rowsPerPx;
+            clampTreeScroll(s);
+            node.setDirtyCanvas && node.setDirtyCanvas(true, false);
+            return true;
+        }
+        if (event.type === "pointerup" || event.type === "mouseup") {
+            const wasDragging = !!s._scrollDrag;
+            s._scrollDrag = null;
+            return wasDragging;
+        }
+
+        if (localX < g.trackX || localY < g.trackY || localY > g.trackY + g.trackH) return false;
+        if (localY >= g.thumbY && localY <= g.thumbY + g.thumbH) {
+            s._scrollDrag = { startY: localY, startRow: s.scrollRow };
+        } else {
+            s.scrollRow += (localY < g.thumbY ? -1 : 1) * (layout.slots - 1);
+            clampTreeScroll(s);
+        }
+        node.setDirtyCanvas && node.setDirtyCanvas(true, false);
+        return true;
     }
 
     // ------------------- MOUSE HANDLING -------------------
@@ -1017,7 +1602,6 @@ import { app } from "../../../scripts/app.js";
         if (!s) return;
 
         if (s.mode !== "tree") return;
-        if (event.type !== "mousedown" && event.type !== "pointerdown") return;
 
         const flat = s.flat || [];
         const layout = s._layout;
@@ -1027,15 +1611,23 @@ import { app } from "../../../scripts/app.js";
         const localX = pos[0];
         const localY = pos[1] - widgetY;
 
-        const { lineH, paddingX, contentStartY, rowCount, widgetWidth } = layout;
+        if (layout.scrollable || s._scrollDrag) {
+            if (handleTreeScrollbar(event, localX, localY, node)) return true;
+        }
+        if (event.type !== "mousedown" && event.type !== "pointerdown") return;
+
+        const { lineH, paddingX, contentStartY, rowCount, widgetWidth, slots } = layout;
 
         const relY = localY - contentStartY;
         if (relY < 0) return false;
 
+        // Slot on screen -> row in s.flat
         const index = Math.floor(relY / lineH);
-        if (index < 0 || index >= rowCount || index >= flat.length) return false;
+        if (index < 0 || index >= slots) return false;
+        const rowIndex = index + (s.scrollRow || 0);
+        if (rowIndex >= rowCount || rowIndex >= flat.length) return false;
 
-        const row = flat[index];
+        const row = flat[rowIndex];
         const item = row.item;
         const depth = row.depth || 0;
 
@@ -1075,15 +1667,8 @@ import { app } from "../../../scripts/app.js";
             localY >= cbYLocal &&
             localY <= cbYLocal + cbSize
         ) {
-            if (row.type === "folder") {
-                const derived = !!item._derivedEnabled;
-                const newEnabled = !derived;
-                toggleFolderEnabled(item, newEnabled);
-            } else {
-                item.enabled = !item.enabled;
-            }
-            rebuildFlat(s);
-            syncJsonWidget(node);
+            const newEnabled = row.type === "folder" ? !item._derivedEnabled : !item.enabled;
+            applyTreePatch(node, "enabled", item, newEnabled);
             // node.graph?.setDirtyCanvas(true, true);
             return true;
         }
@@ -1099,14 +1684,13 @@ import { app } from "../../../scripts/app.js";
             localY <= cbYLocal + areaH
         ) {
             const oldArea = item.area || "ALL";
-            const newArea = nextArea(oldArea);
+            const newArea = nextArea(oldArea, s.tree);
 
-            item.area = newArea;
+            applyTreePatch(node, "area", item, newArea);
             if (row.type === "folder") {
-                applyAreaRecursive(item, newArea);
+                // area locks of descendant rows depend on it
+                rebuildFlat(s);
             }
-            rebuildFlat(s);
-            syncJsonWidget(node);
             // node.graph?.setDirtyCanvas(true, true);
             return true;
         }
@@ -1130,12 +1714,8 @@ import { app } from "../../../scripts/app.js";
                 if (w < TREE_WEIGHT_MIN) w = TREE_WEIGHT_MIN;
                 // round to 2 decimals to avoid FP noise
                 w = Math.round(w * 100) / 100;
-                item.weight = w;
-
                 // сразу обновляем текст строки с новым весом
-                item.text = applyWeightToLineText(item.text, w);
-
-                syncJsonWidget(node);
+                applyTreePatch(node, "weight", item, w);
                 // node.graph?.setDirtyCanvas(true, true);
                 return true;
             }
@@ -1154,12 +1734,8 @@ import { app } from "../../../scripts/app.js";
                 w += TREE_WEIGHT_STEP;
                 // round to 2 decimals
                 w = Math.round(w * 100) / 100;
-                item.weight = w;
-
                 // сразу обновляем текст строки с новым весом
-                item.text = applyWeightToLineText(item.text, w);
-
-                syncJsonWidget(node);
+                applyTreePatch(node, "weight", item, w);
                 // node.graph?.setDirtyCanvas(true, true);
                 return true;
             }
@@ -1181,7 +1757,8 @@ import { app } from "../../../scripts/app.js";
             if (overIcon || overLabel) {
                 item.expanded = !item.expanded;
                 rebuildFlat(s);
-                // syncJsonWidget(node); // no need to sync JSON on expand/collapse
+                // View state only: pf_json stays as is, see EXPANDED_PROPERTY.
+                storeExpandedState(node);
                 // node.graph?.setDirtyCanvas(true, true);
                 return true;
             }
@@ -1256,6 +1833,9 @@ import { app } from "../../../scripts/app.js";
 
     app.registerExtension({
         name: "FPFoldedPromptsExtension",
+        setup() {
+            registerRegionCountSetting();
+        },
         beforeRegisterNodeDef(nodeType, nodeData, appInstance) {
             // Patch global node context menu once
             patchFPFoldedPromptsContextMenu();
@@ -1263,6 +1843,19 @@ import { app } from "../../../scripts/app.js";
 
             const origOnNodeCreated = nodeType.prototype.onNodeCreated;
             const origOnConfigure = nodeType.prototype.onConfigure; // keep original onConfigure handler
+            const origSerialize = nodeType.prototype.serialize;
+            const origOnRemoved = nodeType.prototype.onRemoved;
+
+            // Workflow save / autosave reads widget values here
+            nodeType.prototype.serialize = function () {
+                flushTreeSync(this);
+                return origSerialize.apply(this, arguments);
+            };
+
+            nodeType.prototype.onRemoved = function () {
+                cancelTreeSync(this._pf);
+                return origOnRemoved && origOnRemoved.apply(this, arguments);
+            };
 
             nodeType.prototype.onNodeCreated = function () {
                 const node = this;
@@ -1290,6 +1883,16 @@ import { app } from "../../../scripts/app.js";
                 s.pfJsonWidget = pfJsonWidget;
                 s.pfNodeIdWidget = pfNodeIdWidget;
 
+                // Debounced edits must land before the prompt is built
+                for (const w of [textWidget, pfJsonWidget]) {
+                    if (!w) continue;
+                    const origSerializeValue = w.serializeValue;
+                    w.serializeValue = async function () {
+                        flushTreeSync(node);
+                        return origSerializeValue ? origSerializeValue.apply(this, arguments) : w.value;
+                    };
+                }
+
                 if (pfJsonWidget) {
                     pfJsonWidget.hidden = true;
                     pfJsonWidget.computeSize = function (w) {
@@ -1361,8 +1964,7 @@ import { app } from "../../../scripts/app.js";
                 treeWidget.computeSize = function (width) {
                     const lineH = TREE_LINE_HEIGHT;
                     const paddingTop = 8;
-                    const s2 = node._pf;
-                    const count = (s2 && s2.flat && s2.flat.length) || 1;
+                    const count = treeViewportRows(node._pf);
                     const h = paddingTop + count * lineH + 4;
                     return [width, h];
                 };
@@ -1444,7 +2046,16 @@ import { app } from "../../../scripts/app.js";
                     pfJsonWidget.value.trim() !== ""
                 ) {
                     try {
-                        s.tree = JSON.parse(pfJsonWidget.value);
+                        const stored = JSON.parse(pfJsonWidget.value);
+                        s.tree = decodeTree(stored);
+                        restoreExpandedState(node, s.tree);
+                        // Upgrade workflows saved with the verbose format or
+                        // with expanded flags inside pf_json.
+                        const upgraded = JSON.stringify(encodeTree(s.tree));
+                        if (upgraded !== pfJsonWidget.value) {
+                            storeExpandedState(node);
+                            pfJsonWidget.value = upgraded;
+                        }
                         rebuildFlat(s);
                         s.mode = "tree";
                         restoredFromJson = true;
@@ -1,19 +1,149 @@
 import { app } from "../../scripts/app.js";
+import { forgetTextRefs, textRef } from "./fp_text_ref.js";
 
 const FP_TAB_CLASS = "FPTab";
 const FP_SOURCE_CLASS = "FPTabbedTextArea";
 const STORE_KEY = "fp_tabbed_text_area";
 const OWNER_WIDGET = "owner_id";
 const TAB_WIDGET = "tab_name";
-const TEXT_WIDGET = "__fp_tab_text__";
+const TEXT_WIDGET = "__fp_tab_text__";   // "fpt:<digest>" reference, resolved by the server
 const EMPTY_OPT = "—";
 
+// Dispatched on window by FPTabbedTextArea.js: detail = { ownerId, tab },
+// tab being null when the tab list itself changed.
+const TABS_CHANGED_EVENT = "fp-tabbed-text-area:change";
+
+// ── reader index ──────────────────────────────────────────────────────────────
+//
+// Readers and sources are tracked as nodes are created, loaded and removed, and
+// readers are indexed by the (owner, tab) they show, so a tab edit reaches
+// only the readers of that tab. Updates are queued and applied once per frame.
+
+const sourceNodes = new Map();   // owner id -> FPTabbedTextArea node
+const readers = new Set();       // every FPTab node
+const readerIndex = new Map();   // owner id -> Map(tab name -> Set(FPTab node))
+const readerKeys = new WeakMap();// FPTab node -> [owner id, tab name] it is indexed under
+
+const SYNC_TEXT = 1;             // re-resolve the text reference
+const SYNC_FULL = 2;             // owner and tab lists too
+const pending = new Map();       // FPTab node -> SYNC_*
+let frameRequested = false;
+
+function unindexReader(node) {
+    const key = readerKeys.get(node);
+    if (!key) return;
+    readerKeys.delete(node);
+    const tabs = readerIndex.get(key[0]);
+    const set = tabs?.get(key[1]);
+    if (!set) return;
+    set.delete(node);
+    if (!set.size) tabs.delete(key[1]);
+    if (!tabs.size) readerIndex.delete(key[0]);
+}
+
+function indexReader(node) {
+    const ownerId = findRawId(getWidgetValue(node, OWNER_WIDGET));
+    const tabName = getWidgetValue(node, TAB_WIDGET);
+    const key = readerKeys.get(node);
+    if (key && key[0] === ownerId && key[1] === tabName) return;
+    unindexReader(node);
+    if (!ownerId || !tabName || tabName === EMPTY_OPT) return;
+    let tabs = readerIndex.get(ownerId);
+    if (!tabs) readerIndex.set(ownerId, tabs = new Map());
+    let set = tabs.get(tabName);
+    if (!set) tabs.set(tabName, set = new Set());
+    set.add(node);
+    readerKeys.set(node, [ownerId, tabName]);
+}
+
+function scheduleSync(node, level) {
+    if ((pending.get(node) || 0) >= level) return;
+    pending.set(node, level);
+    if (frameRequested) return;
+    frameRequested = true;
+    const raf = globalThis.requestAnimationFrame || (cb => setTimeout(cb, 16));
+    raf(flushPending);
+}
+
+function flushPending() {
+    frameRequested = false;
+    const jobs = [...pending];
+    pending.clear();
+    if (!jobs.length) return;
+    const owners = getOwnerOptions();
+    for (const [node, level] of jobs) {
+        if (!readers.has(node)) continue;
+        if (level === SYNC_FULL) syncFPTab(node, owners);
+        else refreshText(node);
+        indexReader(node);
+    }
+}
+
+function scheduleAllReaders(level) {
+    for (const node of readers) scheduleSync(node, level);
+}
+
+function onTabsChanged(e) {
+    const { ownerId, tab } = e.detail || {};
+    const tabs = readerIndex.get(String(ownerId));
+    if (!tabs) return;
+    if (tab == null) {
+        for (const set of tabs.values()) for (const node of set) scheduleSync(node, SYNC_FULL);
+    } else {
+        for (const node of tabs.get(tab) || []) scheduleSync(node, SYNC_TEXT);
+    }
+}
+
+function trackNode(node) {
+    const cls = node?.comfyClass;
+    if (cls !== FP_SOURCE_CLASS && cls !== FP_TAB_CLASS) return;
+    if (cls === FP_SOURCE_CLASS) {
+        sourceNodes.set(String(node.id), node);
+        scheduleAllReaders(SYNC_FULL);
+    } else {
+        readers.add(node);
+    }
+    if (node.__fp_tab_tracked) return;
+    node.__fp_tab_tracked = true;
+    const origOnRemoved = node.onRemoved;
+    node.onRemoved = function () {
+        origOnRemoved?.apply(this, arguments);
+        untrackNode(node);
+    };
+}
+
+function untrackNode(node) {
+    if (node.comfyClass === FP_SOURCE_CLASS) {
+        const id = String(node.id);
+        if (sourceNodes.get(id) === node) sourceNodes.delete(id);
+        forgetTextRefs(`${id}/`);
+        scheduleAllReaders(SYNC_FULL);
+    } else {
+        readers.delete(node);
+        pending.delete(node);
+        unindexReader(node);
+    }
+}
+
 // ── graph helpers ─────────────────────────────────────────────────────────────
 
 function getAllSourceNodes() {
     const g = app?.graph;
-    const nodes = g?._nodes || g?.nodes || [];
-    return nodes.filter(n => n?.comfyClass === FP_SOURCE_CLASS);
+    const nodes = [];
+    for (const [id, node] of sourceNodes) {
+        // Graphs replaced wholesale may not report their nodes' removal.
+        if (g?.getNodeById && g.getNodeById(id) !== node) {
+            sourceNodes.delete(id);
+            continue;
+        }
+        nodes.push(node);
+    }
+    return nodes;
+}
+
+function getOwnerOptions() {
+    const sources = getAllSourceNodes();
+    return sources.length ? sources.map(n => getSourceNodeLabel(n)) : [EMPTY_OPT];
 }
 
 function getSourceNodeLabel(node) {
@@ -79,12 +209,7 @@ function collapseWidget(w) {
 
 // ── core sync ─────────────────────────────────────────────────────────────────
 
-function refreshOwnerList(node) {
-    const sources = getAllSourceNodes();
-    const options = sources.length
-        ? sources.map(n => getSourceNodeLabel(n))
-        : [EMPTY_OPT];
-
+function refreshOwnerList(node, options = getOwnerOptions()) {
     setComboOptions(node, OWNER_WIDGET, options, true);
 }
 
@@ -104,26 +229,16 @@ function refreshText(node) {
         setWidgetValue(node, TEXT_WIDGET, "");
         return;
     }
-    const text = getTabText(rawId, tabName);
-    setWidgetValue(node, TEXT_WIDGET, text);
+    // Only the reference travels with the prompt; the text itself is sent
+    // once, in the workflow's graph.extra.
+    const ref = textRef(getTabText(rawId, tabName), `${rawId}/${tabName}`);
+    if (getWidgetValue(node, TEXT_WIDGET) !== ref) setWidgetValue(node, TEXT_WIDGET, ref);
 }
 
-function syncFPTab(node) {
-    console.log(`[FPTab] syncFPTab id=${node.id} before: owner=${getWidgetValue(node, OWNER_WIDGET)} tab=${getWidgetValue(node, TAB_WIDGET)}`);
-    refreshOwnerList(node);
+function syncFPTab(node, owners) {
+    refreshOwnerList(node, owners);
     refreshTabList(node);
     refreshText(node);
-    console.log(`[FPTab] syncFPTab id=${node.id} after: owner=${getWidgetValue(node, OWNER_WIDGET)} tab=${getWidgetValue(node, TAB_WIDGET)} options=${node.widgets?.find(w=>w.name===TAB_WIDGET)?.options?.values}`);
-}
-
-function syncAllFPTabs() {
-    const g = app?.graph;
-    const nodes = g?._nodes || g?.nodes || [];
-    for (const node of nodes) {
-        if (node?.comfyClass === FP_TAB_CLASS) {
-            syncFPTab(node);
-        }
-    }
 }
 
 // ── init node ─────────────────────────────────────────────────────────────────
@@ -161,6 +276,7 @@ function initFPTabNode(node) {
             origCb?.call(this, value);
             refreshTabList(node);
             refreshText(node);
+            indexReader(node);
             // if (app.graph?.change) app.graph.change();
             // node.setDirtyCanvas(true, true);
         };
@@ -173,20 +289,15 @@ function initFPTabNode(node) {
         tabW.callback = function (value) {
             origCb?.call(this, value);
             refreshText(node);
+            indexReader(node);
             // if (app.graph?.change) app.graph.change();
             // node.setDirtyCanvas(true, true);
         };
     }
 
     // Initial sync
-    queueMicrotask(() => syncFPTab(node));
-
-    // mousemove on node — update on hover
-    const origOnMouseMove = node.onMouseMove;
-    node.onMouseMove = function (e, pos, canvas) {
-        origOnMouseMove?.apply(this, arguments);
-        syncFPTab(node);
-    };
+    trackNode(node);
+    scheduleSync(node, SYNC_FULL);
 }
 
 // ── extension ─────────────────────────────────────────────────────────────────
@@ -195,21 +306,34 @@ app.registerExtension({
     name: "FP.Tab",
 
     async nodeCreated(node) {
+        if (node?.comfyClass === FP_SOURCE_CLASS) {
+            // The id may still change while a graph is being configured.
+            queueMicrotask(() => trackNode(node));
+            return;
+        }
         if (node?.comfyClass !== FP_TAB_CLASS) return;
         queueMicrotask(() => initFPTabNode(node));
     },
 
     loadedGraphNode(node) {
+        if (node?.comfyClass === FP_SOURCE_CLASS) {
+            trackNode(node);
+            return;
+        }
         if (node?.comfyClass !== FP_TAB_CLASS) return;
         initFPTabNode(node);
     },
 
     setup() {
-        window.addEventListener("mouseup", () => syncAllFPTabs(), true);
+        window.addEventListener(TABS_CHANGED_EVENT, onTabsChanged);
+
+        // Source renames and graph edits don't emit events; refresh the
+        // readers (not the whole graph) once after them.
+        window.addEventListener("mouseup", () => scheduleAllReaders(SYNC_FULL), true);
 
         window.addEventListener("keydown", (e) => {
             if (e.key === "Enter" || e.key === "Delete") {
-                syncAllFPTabs();
+                scheduleAllReaders(SYNC_FULL);
             }
         }, true);
     },
@@ -1,12 +1,17 @@
 import { app } from "../../scripts/app.js";
+import { textRef } from "./fp_text_ref.js";
 
 const NODE_CLASS = "FPTabbedTextArea";
 const STORE_KEY = "fp_tabbed_text_area";
 const META_WIDGET = "node_data_json";   // stores mode/active_tab/tab_order — NO texts
 const TEXT_WIDGET = "__fp_text__";      // output "text"
+const TABS_WIDGET = "__fp_tabs_json__"; // outputs tab1..tab9: text refs only
 const DEFAULT_TABS = "First";
 const DEFAULT_MODE = "separate_tabs";
 const MAX_TAB_OUTPUTS = 9;
+// Tells FP Tab readers what changed: detail = { ownerId, tab }, tab being
+// null when the tab list changed. Listened to in FPTab.js.
+const TABS_CHANGED_EVENT = "fp-tabbed-text-area:change";
 
 // ── graph.extra storage (UI state: texts + active_tab) ───────────────────────
 
@@ -69,6 +74,31 @@ function computeTextOutput(store, before, after) {
     }
 }
 
+// One text ref per tab output. The texts themselves travel once, in
+// graph.extra; the slots are the ones FP Tab readers of these tabs use, so
+// each edit is hashed once.
+function computeTabOutputs(store, nodeId) {
+    const texts = store.texts || {};
+    return (store.tab_order || []).slice(0, MAX_TAB_OUTPUTS).map(
+        name => textRef(texts[name] ?? "", `${nodeId}/${name}`)
+    );
+}
+
+// Output 0 is "text"; outputs 1..9 carry the tab texts and show the tab names.
+function labelTabOutputs(node, store) {
+    const order = store.tab_order || [];
+    for (let i = 1; i <= MAX_TAB_OUTPUTS; i++) {
+        const out = node.outputs?.[i];
+        if (!out) continue;
+        const label = order[i - 1] ? `tab${i}: ${order[i - 1]}` : `tab${i}`;
+        if (out.label !== label) out.label = label;
+    }
+}
+
+function notifyTabsChanged(nodeId, tab = null) {
+    window.dispatchEvent(new CustomEvent(TABS_CHANGED_EVENT, { detail: { ownerId: String(nodeId), tab } }));
+}
+
 // ── sync all hidden widgets from store ───────────────────────────────────────
 
 function syncAllWidgets(node) {
@@ -88,6 +118,12 @@ function syncAllWidgets(node) {
     // __fp_text__ widget
     const textW = node.widgets?.find(w => w.name === TEXT_WIDGET);
     if (textW) textW.value = computeTextOutput(store, "", "");
+
+    // __fp_tabs_json__ widget: one entry per tab output
+    const tabsW = node.widgets?.find(w => w.name === TABS_WIDGET);
+    if (tabsW) tabsW.value = JSON.stringify({ tabs: computeTabOutputs(store, String(node.id)) });
+
+    labelTabOutputs(node, store);
 }
 
 
@@ -111,6 +147,7 @@ function getInternalWidgetNames() {
     return [
         META_WIDGET,
         TEXT_WIDGET,
+        TABS_WIDGET,
     ];
 }
 
@@ -179,6 +216,7 @@ function buildTabbedWidget(node) {
     store.tab_order = tabs;
     saveNodeStore(nodeId, store);
     syncAllWidgets(node);
+    notifyTabsChanged(nodeId);
 
     // If widget already exists, just rebuild tabs in-place
     const existing = node.widgets?.find(w => w.name === "__fp_tabs__");
@@ -217,6 +255,7 @@ function buildTabbedWidget(node) {
         store.texts[store.active_tab] = textarea.value;
         saveNodeStore(nodeId, store);
         syncAllWidgets(node);
+        notifyTabsChanged(nodeId, store.active_tab);
     });
 
     textarea.addEventListener("keydown", (e) => e.stopPropagation());
@@ -235,6 +274,7 @@ function buildTabbedWidget(node) {
             textarea.value = store.texts[store.active_tab];
             saveNodeStore(nodeId, store);
             syncAllWidgets(node);
+            notifyTabsChanged(nodeId, store.active_tab);
         },
     });
 
@@ -1,10 +1,82 @@
+import os
+import sys
+import logging
+
 from comfy_execution.graph import ExecutionBlocker
 from comfy_api.latest import ComfyExtension, io
 
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    web = None
+    PromptServer = None
 
-class ExecutionBlockerBreaker(io.ComfyNode):
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+from .fp_store import workflow_id
+
+logger = logging.getLogger(__name__)
+
+SCOPE_GLOBAL   = "global"
+SCOPE_WORKFLOW = "workflow"
+
+
+def estimate_size(value, _depth: int = 0) -> int:
+    """Rough memory footprint; exact for tensors and numpy arrays."""
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        try:
+            return int(value.element_size() * value.nelement())
+        except Exception:
+            pass
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if _depth < 4:
+        if isinstance(value, dict):
+            return sum(estimate_size(v, _depth + 1) for v in value.values()) + 64
+        if isinstance(value, (list, tuple)):
+            return sum(estimate_size(v, _depth + 1) for v in value) + 8 * len(value)
+    return sys.getsizeof(value)
+
+
+class BlockerValueStore(ByteBudgetLRU):
+    """LRU of the last real value per (scope, unique_id), bounded by an
+    estimated byte budget. The most recently stored value is always kept."""
+
+    keep_newest = True
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes, sizeof=estimate_size)
+
+    def clear(self, scope: str | None = None, unique_id: str | None = None) -> int:
+        with self._lock:
+            keys = [
+                k for k in self._data
+                if (scope is None or k[0] == scope) and (unique_id is None or k[1] == unique_id)
+            ]
+            for k in keys:
+                self.bytes -= self._data.pop(k)[1]
+            return len(keys)
 
-    _prev_values: dict = {}
+    def entries(self) -> list[dict]:
+        """Stored values, least recently used first."""
+        with self._lock:
+            return [
+                {"scope": scope, "unique_id": uid, "type": type(value).__name__, "bytes": size}
+                for (scope, uid), (value, size) in self._data.items()
+            ]
+
+
+STORE = BlockerValueStore(
+    int(os.environ.get("FP_BLOCKER_CACHE_BYTES", 256 * 1024 * 1024))
+)
+fp_metrics.register_cache("blocker_store", STORE)
+
+
+class ExecutionBlockerBreaker(io.ComfyNode):
 
     @classmethod
     def define_schema(cls) -> io.Schema:
@@ -21,26 +93,64 @@ class ExecutionBlockerBreaker(io.ComfyNode):
             ),
             inputs=[
                 io.MatchType.Input("value", template=template),
+                io.Combo.Input(
+                    "cache_scope",
+                    options=[SCOPE_GLOBAL, SCOPE_WORKFLOW],
+                    default=SCOPE_GLOBAL,
+                    optional=True,
+                    tooltip="'workflow' keeps separate cached values per workflow id.",
+                ),
             ],
             outputs=[
                 io.MatchType.Output(template=template, display_name="value"),
             ],
-            hidden=[io.Hidden.unique_id],
+            hidden=[io.Hidden.unique_id, io.Hidden.extra_pnginfo],
         )
 
     @classmethod
-    def execute(cls, value=None, **kwargs) -> io.NodeOutput:
+    @fp_metrics.instrument("ExecutionBlockerBreaker")
+    def execute(cls, value=None, cache_scope: str = SCOPE_GLOBAL, **kwargs) -> io.NodeOutput:
         unique_id = str(cls.hidden.unique_id) if cls.hidden else ""
-        print(f"[ExecutionBlockerBreaker] execute: id={unique_id} value type={type(value).__name__} is_blocker={isinstance(value, ExecutionBlocker) if value is not None else 'N/A'}")
+        scope = SCOPE_GLOBAL
+        if cache_scope == SCOPE_WORKFLOW and cls.hidden:
+            scope = workflow_id(cls.hidden.extra_pnginfo)
+        key = (scope, unique_id)
+
         if value is None or isinstance(value, ExecutionBlocker):
-            cached = cls._prev_values.get(unique_id)
-            print(f"[ExecutionBlockerBreaker] execute: got blocker/None → returning cached type={type(cached).__name__ if cached is not None else 'NoneType'}")
+            cached = STORE.get(key)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "[ExecutionBlockerBreaker] id=%s scope=%s blocked -> cached %s (hits=%d misses=%d)",
+                    unique_id, scope, type(cached).__name__, STORE.hits, STORE.misses,
+                )
             return io.NodeOutput(cached)
-        cls._prev_values[unique_id] = value
-        print(f"[ExecutionBlockerBreaker] execute: got real value → passing through")
+
+        STORE.put(key, value)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[ExecutionBlockerBreaker] id=%s scope=%s stored %s (entries=%d bytes=%d)",
+                unique_id, scope, type(value).__name__, len(STORE), STORE.bytes,
+            )
         return io.NodeOutput(value)
 
 
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/fp/execution_blocker_breaker/cache")
+    async def _fp_blocker_cache_info(request):
+        return web.json_response({"stats": STORE.stats(), "entries": STORE.entries()})
+
+    @PromptServer.instance.routes.post("/fp/execution_blocker_breaker/cache/clear")
+    async def _fp_blocker_cache_clear(request):
+        try:
+            body = await request.json()
+        except Exception:
+            body = None
+        if not isinstance(body, dict):
+            body = {}
+        removed = STORE.clear(body.get("scope"), body.get("unique_id"))
+        return web.json_response({"removed": removed, "stats": STORE.stats()})
+
+
 class ExecutionBlockerBreakerExtension(ComfyExtension):
     async def get_node_list(self) -> list[type[io.ComfyNode]]:
         return [ExecutionBlockerBreaker]
@@ -1,57 +1,139 @@
 import os
 import json
+import codecs
+import asyncio
+import hashlib
 import traceback
 
 from comfy_api.latest import ComfyExtension, io
 
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    web = None
+    PromptServer = None
 
-def _merge_before(before_text: str, main_text: str) -> str:
-    before_text = before_text or ""
-    main_text   = main_text   or ""
-    if before_text and main_text:
-        return before_text.rstrip("\n") + "\n" + main_text.lstrip("\n")
-    return before_text or main_text
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+from .fp_index import PromptIndex
+from .fp_persist import WriteBehindPersister
+from .fp_prompt_doc import TYPE_NAME as PROMPT_DOC, PromptDoc, doc_merge_before, merge_before
+from .fp_settings import COMMENT_PREFIX
+from .fp_store import TreeStore, workflow_id
+from .fp_tags import canonicalize_tags
+from .fp_tokens import dump_stats, render_packed, text_token_stats, tree_token_stats
+from .fp_tree import FolderTextParser, encode_tree, load_tree, render_tree
 
+_PF_DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "pf_data"))
+_STORE       = TreeStore(_PF_DATA_DIR)
+# Keys are (workflow id, node id); GC runs on the writer thread when due.
+_PERSISTER   = WriteBehindPersister(
+    write=lambda key, content: _STORE.put(key[0], key[1], content),
+    after_batch=_STORE.maybe_gc,
+)
+_INDEX       = PromptIndex(_PF_DATA_DIR, store=_STORE)
+_IMPORT_MAX_BYTES   = int(os.environ.get("FP_IMPORT_MAX_BYTES", 256 * 1024 * 1024))
+_IMPORT_CHUNK_BYTES = 1 << 20
 
-def _build_output_text(pf_json: str, text: str, before_text: str) -> str:
-    if not pf_json or not pf_json.strip():
-        return _merge_before(before_text, text or "")
 
+_TREE_CACHE = ByteBudgetLRU(int(os.environ.get("FP_TREE_CACHE_BYTES", 32 * 1024 * 1024)))
+_COMPILE_FAILED = object()
+fp_metrics.register_cache("fp_tree", _TREE_CACHE)
+
+
+def _pf_digest(pf_json: str) -> str:
+    return hashlib.sha256(pf_json.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+# What _compile_tree can build from a tree: the prompt, the prompt packed into
+# as few CLIP chunks as possible, the per-folder/region token counts, and
+# both prompts as FP_PROMPT_DOC lines.
+_RENDERERS = {
+    "text":       render_tree,
+    "packed":     render_packed,
+    "tokens":     lambda tree: dump_stats(tree_token_stats(tree)),
+    "doc":        lambda tree: PromptDoc.from_tree(tree),
+    "doc_packed": lambda tree: PromptDoc.from_tree(tree, packed=True),
+}
+
+
+def _compile_tree(pf_json: str, kind: str = "text") -> str | PromptDoc | None:
+    """Return the effective text of a tree (or another _RENDERERS view of
+    it), or None if it can't be built.
+
+    Line weights, areas and enabled state follow the browser widget (see
+    fp_tree). Results are cached by a digest of pf_json, so UI-only edits
+    that produce an identical document are never parsed twice."""
+    key = f"{kind}:{_pf_digest(pf_json)}"
+    cached = _TREE_CACHE.get(key, _COMPILE_FAILED)
+    if cached is not _COMPILE_FAILED:
+        return cached
+
+    compiled = None
     try:
-        tree = json.loads(pf_json)
+        tree = load_tree(pf_json)
     except Exception as e:
         print(f"[FPFoldedPrompts] Failed to parse pf_json: {e}")
-        return _merge_before(before_text, text or "")
+        fp_metrics.parse_failure("pf_json", e)
+        tree = None
 
-    try:
-        result_lines = []
-
-        def walk(items_list, parent_area="ALL"):
-            for item in items_list:
-                itype    = item.get("type")
-                area     = item.get("area", "ALL") or "ALL"
-                current_area = parent_area if parent_area != "ALL" else area
-
-                if itype == "folder":
-                    walk(item.get("children") or [], current_area)
-                elif itype == "line":
-                    if not bool(item.get("enabled", True)):
-                        continue
-                    raw_line = item.get("text", "")
-                    eff_area = current_area
-                    if eff_area and eff_area != "ALL":
-                        result_lines.append(f"<{eff_area}>{raw_line}</>")
-                    else:
-                        result_lines.append(raw_line)
-
-        walk(tree.get("items") or [], parent_area="ALL")
-        final_text = "\n".join(result_lines)
-    except Exception as e:
-        print(f"[FPFoldedPrompts] Error building output: {e}")
-        traceback.print_exc()
-        final_text = text or ""
+    if tree is not None:
+        try:
+            compiled = _RENDERERS[kind](tree)
+        except Exception as e:
+            print(f"[FPFoldedPrompts] Error building output: {e}")
+            traceback.print_exc()
 
-    return _merge_before(before_text, final_text)
+    _TREE_CACHE.put(key, compiled)
+    return compiled
+
+
+def _build_output_text(
+    pf_json: str,
+    text: str,
+    before_text: str,
+    dedup_tags: bool = False,
+    pack_chunks: bool = False,
+) -> str:
+    if not pf_json or not pf_json.strip():
+        result = merge_before(before_text, text or "")
+    else:
+        final_text = _compile_tree(pf_json, "packed" if pack_chunks else "text")
+        if final_text is None:
+            final_text = text or ""
+        result = merge_before(before_text, final_text)
+
+    if dedup_tags:
+        result = canonicalize_tags(result, COMMENT_PREFIX.get())
+    return result
+
+
+def _build_output_doc(
+    pf_json: str,
+    before_text: str,
+    result: str,
+    dedup_tags: bool = False,
+    pack_chunks: bool = False,
+) -> PromptDoc:
+    """_build_output_text()'s `result` as an FP_PROMPT_DOC: the tree's lines
+    when there is a tree, otherwise (and after tag dedup, which rewrites
+    the text) the text alone."""
+    if pf_json and pf_json.strip() and not dedup_tags:
+        doc = _compile_tree(pf_json, "doc_packed" if pack_chunks else "doc")
+        if doc is not None:
+            return doc_merge_before(before_text, doc, result)
+    return PromptDoc.from_text(result)
+
+
+def _token_stats(pf_json: str, result: str) -> str:
+    """Token totals of the output text, plus per-folder totals of the tree."""
+    stats = text_token_stats(result, COMMENT_PREFIX.get())
+    if pf_json and pf_json.strip():
+        tree_stats = _compile_tree(pf_json, "tokens")
+        if tree_stats is not None:
+            stats["folders"] = json.loads(tree_stats)["folders"]
+    return dump_stats(stats)
 
 
 class FPFoldedPrompts(io.ComfyNode):
@@ -93,36 +175,169 @@ class FPFoldedPrompts(io.ComfyNode):
                     force_input=True,
                     optional=True,
                 ),
+                io.Boolean.Input(
+                    "dedup_tags",
+                    default=False,
+                    optional=True,
+                    tooltip="Drop repeated comma-separated tags (per region), merging their weights.",
+                ),
+                io.Boolean.Input(
+                    "pack_chunks",
+                    default=False,
+                    optional=True,
+                    tooltip=(
+                        "Group enabled lines outside regions into as few 75-token CLIP "
+                        "chunks as possible, separated by BREAK. For BREAK-aware encoders."
+                    ),
+                ),
             ],
             outputs=[
                 io.String.Output(display_name="text"),
+                io.String.Output(
+                    display_name="pf_json",
+                    tooltip="The tree itself, e.g. for FP Folded Prompts Variants.",
+                ),
+                io.String.Output(
+                    display_name="token_stats",
+                    tooltip="JSON: CLIP token and chunk counts in total, per region and per folder.",
+                ),
+                io.Custom(PROMPT_DOC).Output(
+                    display_name="doc",
+                    tooltip=(
+                        "The same prompt as structured lines (area, weight, enabled). "
+                        "FP Text Clean And Splitt reads regions from it without parsing text."
+                    ),
+                ),
             ],
-            hidden=[io.Hidden.unique_id],
+            hidden=[io.Hidden.unique_id, io.Hidden.extra_pnginfo],
         )
 
     @classmethod
+    @fp_metrics.instrument("FPFoldedPrompts", "fingerprint")
+    def fingerprint_inputs(
+        cls,
+        text: str = "",
+        pf_json: str = "",
+        before_text: str = "",
+        dedup_tags: bool = False,
+        pack_chunks: bool = False,
+        **kwargs,
+    ) -> str:
+        # Keyed on the effective output. ComfyUI's cache signature also holds
+        # the pf_json widget value itself, so any pf_json change re-runs the
+        # node; the widget therefore keeps view state (expanded folders) and
+        # derived flags out of pf_json.
+        result = _build_output_text(pf_json, text, before_text, dedup_tags, pack_chunks)
+        return hashlib.sha256(result.encode("utf-8", "surrogatepass")).hexdigest()
+
+    @classmethod
+    @fp_metrics.instrument("FPFoldedPrompts")
     def execute(
         cls,
         text: str = "",
         pf_json: str = "",
         pf_node_id: str = "",
         before_text: str = "",
+        dedup_tags: bool = False,
+        pack_chunks: bool = False,
     ) -> io.NodeOutput:
         unique_id = str(cls.hidden.unique_id) if cls.hidden else ""
 
-        # Save pf_json to file if node_id present
+        # Save pf_json to the store if node_id present (written in the background)
         if pf_json and pf_node_id:
-            try:
-                data_dir = os.path.join(os.path.dirname(__file__), "..", "pf_data")
-                os.makedirs(data_dir, exist_ok=True)
-                filename = os.path.join(data_dir, f"pf_{pf_node_id}.json")
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(pf_json)
-            except Exception as e:
-                print(f"[FPFoldedPrompts] Failed to save JSON: {e}")
-
-        result = _build_output_text(pf_json, text, before_text)
-        return io.NodeOutput(result)
+            extra_pnginfo = cls.hidden.extra_pnginfo if cls.hidden else None
+            _PERSISTER.submit((workflow_id(extra_pnginfo), pf_node_id), pf_json)
+
+        result = _build_output_text(pf_json, text, before_text, dedup_tags, pack_chunks)
+        return io.NodeOutput(
+            result,
+            pf_json or "",
+            _token_stats(pf_json, result),
+            _build_output_doc(pf_json, before_text, result, dedup_tags, pack_chunks),
+        )
+
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/fp/pf_index/search")
+    async def _fp_pf_index_search(request):
+        q = request.query.get("q", "")
+        prefix = request.query.get("prefix", "").lower() in ("1", "true", "yes")
+        enabled = request.query.get("enabled")
+        try:
+            limit = int(request.query.get("limit", 50))
+        except ValueError:
+            limit = 50
+        try:
+            matches = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: _INDEX.search(
+                    q,
+                    prefix=prefix,
+                    limit=min(limit, 1000),
+                    area=request.query.get("area") or None,
+                    enabled=None if enabled is None else enabled.lower() in ("1", "true", "yes"),
+                ),
+            )
+        except Exception as e:
+            print(f"[FPFoldedPrompts] pf_index search failed: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+        return web.json_response({"query": q, "prefix": prefix, "matches": matches})
+
+    @PromptServer.instance.routes.get("/fp/pf_index/stats")
+    async def _fp_pf_index_stats(request):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _INDEX.refresh)
+        return web.json_response(await loop.run_in_executor(None, _INDEX.stats))
+
+
+    @PromptServer.instance.routes.post("/fp/import")
+    async def _fp_import(request):
+        """[Folder/Sub] text (request body, UTF-8) -> tree, parsed while the
+        body streams in. ?format=verbose returns the widget's tree as is,
+        otherwise the compact pf_json format."""
+        loop = asyncio.get_running_loop()
+        parser = FolderTextParser()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        received = 0
+        async for chunk in request.content.iter_chunked(_IMPORT_CHUNK_BYTES):
+            received += len(chunk)
+            if received > _IMPORT_MAX_BYTES:
+                return web.json_response(
+                    {"error": f"text larger than {_IMPORT_MAX_BYTES} bytes"}, status=413
+                )
+            await loop.run_in_executor(None, parser.feed_text, decoder.decode(chunk))
+        parser.feed_text(decoder.decode(b"", final=True))
+        verbose = request.query.get("format") == "verbose"
+
+        def build() -> str:
+            tree = parser.finish()
+            return json.dumps(
+                {"tree": tree if verbose else encode_tree(tree, view_state=True), "lines": parser.lines},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+
+        try:
+            body = await loop.run_in_executor(None, build)
+        except Exception as e:
+            print(f"[FPFoldedPrompts] import failed: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+        return web.Response(text=body, content_type="application/json")
+
+    @PromptServer.instance.routes.get("/fp/store/stats")
+    async def _fp_store_stats(request):
+        loop = asyncio.get_running_loop()
+        return web.json_response(await loop.run_in_executor(None, _STORE.stats))
+
+    @PromptServer.instance.routes.post("/fp/store/gc")
+    async def _fp_store_gc(request):
+        loop = asyncio.get_running_loop()
+        try:
+            counts = await loop.run_in_executor(None, _STORE.gc)
+        except Exception as e:
+            print(f"[FPFoldedPrompts] store gc failed: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+        return web.json_response(counts)
 
 
 class FPFoldedPromptsExtension(ComfyExtension):
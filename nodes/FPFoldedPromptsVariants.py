@@ -0,0 +1,140 @@
+import os
+import hashlib
+
+from comfy_api.latest import ComfyExtension, io
+
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+from .fp_prompt_doc import merge_before
+from .fp_variants import VariantSpace
+
+MODE_SEQUENTIAL = "sequential"
+MODE_SHUFFLED   = "shuffled"
+MAX_CHUNK       = 4096
+
+# Compiled spaces keyed by pf_json digest; sized by a rough multiple of the source.
+_SPACE_CACHE = ByteBudgetLRU(
+    int(os.environ.get("FP_VARIANT_CACHE_BYTES", 64 * 1024 * 1024)),
+    sizeof=lambda entry: entry[1],
+)
+fp_metrics.register_cache("variant_space", _SPACE_CACHE)
+
+
+def get_variant_space(pf_json: str) -> VariantSpace:
+    key = hashlib.sha256(pf_json.encode("utf-8", "surrogatepass")).hexdigest()
+    entry = _SPACE_CACHE.get(key)
+    if entry is None:
+        try:
+            space = VariantSpace.from_json(pf_json)
+        except Exception as e:
+            print(f"[FPFoldedPromptsVariants] Failed to parse pf_json: {e}")
+            fp_metrics.parse_failure("pf_json", e)
+            raise ValueError(f"FP Folded Prompts Variants: invalid pf_json ({e})") from e
+        entry = (space, 8 * len(pf_json))
+        _SPACE_CACHE.put(key, entry)
+    return entry[0]
+
+
+class FPFoldedPromptsVariants(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="FPFoldedPromptsVariants",
+            display_name="FP Folded Prompts Variants",
+            category="AK/Folded Prompts",
+            description=(
+                "Expands a FP Folded Prompts tree into prompt variants. "
+                "Folders titled '... [pick]' or '... [pick k]' contribute k of their "
+                "enabled lines/sub-folders; other folders contribute everything. "
+                "Outputs one chunk of variants per run, by index or from a seeded "
+                "shuffle. Variants are built on demand, never enumerated."
+            ),
+            inputs=[
+                io.String.Input(
+                    "pf_json",
+                    default="",
+                    multiline=False,
+                    force_input=True,
+                    tooltip="Connect the pf_json output of FP Folded Prompts.",
+                ),
+                io.Combo.Input(
+                    "mode",
+                    options=[MODE_SEQUENTIAL, MODE_SHUFFLED],
+                    default=MODE_SEQUENTIAL,
+                    tooltip="sequential: variants start..start+count-1. "
+                            "shuffled: the same positions of a seeded shuffle (no repeats).",
+                ),
+                io.Int.Input(
+                    "start",
+                    default=0,
+                    min=0,
+                    max=0xffffffffffffffff,
+                    tooltip="First variant (or shuffle position) of this chunk.",
+                ),
+                io.Int.Input(
+                    "count",
+                    default=1,
+                    min=1,
+                    max=MAX_CHUNK,
+                    tooltip="Variants per run (chunk size).",
+                ),
+                io.Int.Input(
+                    "seed",
+                    default=0,
+                    min=0,
+                    max=0xffffffffffffffff,
+                    tooltip="Shuffle seed (shuffled mode).",
+                ),
+                io.String.Input(
+                    "before_text",
+                    default="",
+                    multiline=True,
+                    force_input=True,
+                    optional=True,
+                ),
+            ],
+            outputs=[
+                io.String.Output(display_name="text", is_output_list=True),
+                io.Int.Output(display_name="index", is_output_list=True),
+                io.String.Output(display_name="total"),
+            ],
+        )
+
+    @classmethod
+    @fp_metrics.instrument("FPFoldedPromptsVariants")
+    def execute(
+        cls,
+        pf_json: str = "",
+        mode: str = MODE_SEQUENTIAL,
+        start: int = 0,
+        count: int = 1,
+        seed: int = 0,
+        before_text: str = "",
+    ) -> io.NodeOutput:
+        space = get_variant_space(pf_json or "{}")
+        count = max(1, min(int(count), MAX_CHUNK))
+        if mode == MODE_SHUFFLED:
+            indices = space.shuffled_indices(int(start), count, int(seed))
+        else:
+            indices = list(space.indices(int(start), count))
+
+        texts = [merge_before(before_text, text) for _, text in space.iter_variants(indices)]
+        return io.NodeOutput(texts, indices, str(space.count))
+
+
+class FPFoldedPromptsVariantsExtension(ComfyExtension):
+    async def get_node_list(self) -> list[type[io.ComfyNode]]:
+        return [FPFoldedPromptsVariants]
+
+
+async def comfy_entrypoint() -> FPFoldedPromptsVariantsExtension:
+    return FPFoldedPromptsVariantsExtension()
+
+
+NODE_CLASS_MAPPINGS = {
+    "FPFoldedPromptsVariants": FPFoldedPromptsVariants,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "FPFoldedPromptsVariants": "FP Folded Prompts Variants",
+}
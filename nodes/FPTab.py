@@ -1,5 +1,8 @@
 from comfy_api.latest import ComfyExtension, io
 
+from . import fp_metrics
+from .fp_text_store import STORE, is_ref, make_ref
+
 
 class FPTab(io.ComfyNode):
     @classmethod
@@ -30,9 +33,10 @@ class FPTab(io.ComfyNode):
                     "__fp_tab_text__",
                     default="",
                     multiline=False,
-                    tooltip="Internal: tab text. Managed by JS.",
+                    tooltip="Internal: tab text reference (fpt:<digest>). Managed by JS.",
                 ),
             ],
+            hidden=[io.Hidden.extra_pnginfo],
             outputs=[
                 io.String.Output(display_name="text"),
             ],
@@ -43,17 +47,21 @@ class FPTab(io.ComfyNode):
         return True
 
     @classmethod
+    @fp_metrics.instrument("FPTab", "fingerprint")
     def fingerprint_inputs(cls, __fp_tab_text__: str = "", **kwargs) -> str:
-        return __fp_tab_text__ or ""
+        # Older workflows carry the text itself; key those by its reference too.
+        return __fp_tab_text__ if is_ref(__fp_tab_text__) else make_ref(__fp_tab_text__ or "")
 
     @classmethod
+    @fp_metrics.instrument("FPTab")
     def execute(
         cls,
         owner_id: str = "",
         tab_name: str = "",
         __fp_tab_text__: str = "",
     ) -> io.NodeOutput:
-        return io.NodeOutput(__fp_tab_text__ or "")
+        extra_pnginfo = cls.hidden.extra_pnginfo if cls.hidden else None
+        return io.NodeOutput(STORE.resolve(__fp_tab_text__, extra_pnginfo))
 
 
 class FPTabExtension(ComfyExtension):
@@ -1,7 +1,38 @@
+import json
 import hashlib
 
 from comfy_api.latest import ComfyExtension, io
 
+from . import fp_metrics
+from .fp_prompt_doc import TYPE_NAME as PROMPT_DOC, PromptDoc
+from .fp_text_store import STORE
+
+MAX_TAB_OUTPUTS = 9
+
+
+def _join_parts(before: str, text: str, after: str) -> str:
+    return "\n".join(p for p in [before or "", text or "", after or ""] if p)
+
+
+def parse_tab_texts(tabs_json: str, extra_pnginfo=None) -> list[str]:
+    """Tab texts in tab order from the `__fp_tabs_json__` widget, at most
+    MAX_TAB_OUTPUTS. The widget holds {"tabs": [ref, ...]}, text refs
+    resolved through the shared text store (see fp_text_store); entries
+    that are plain text or {"name": ..., "text": ...} are taken as is."""
+    entries: list = []
+    if tabs_json and tabs_json.strip():
+        try:
+            entries = (json.loads(tabs_json).get("tabs") or [])[:MAX_TAB_OUTPUTS]
+        except Exception as e:
+            print(f"[FPTabbedTextArea] Failed to parse __fp_tabs_json__: {e}")
+            fp_metrics.parse_failure("fp_tabs_json", e)
+            entries = []
+    texts: list[str] = []
+    for entry in entries:
+        value = entry.get("text") if isinstance(entry, dict) else entry
+        texts.append(STORE.resolve(value, extra_pnginfo) if isinstance(value, str) else "")
+    return texts
+
 
 class FPTabbedTextArea(io.ComfyNode):
     @classmethod
@@ -31,6 +62,13 @@ class FPTabbedTextArea(io.ComfyNode):
                     multiline=False,
                     tooltip="Internal: combined text output. Managed by JS.",
                 ),
+                io.String.Input(
+                    "__fp_tabs_json__",
+                    default="",
+                    multiline=False,
+                    optional=True,
+                    tooltip="Internal: per-tab text references for outputs tab1..tab9. Managed by JS.",
+                ),
                 io.String.Input(
                     "before_text",
                     default="",
@@ -47,30 +85,43 @@ class FPTabbedTextArea(io.ComfyNode):
                     optional=True,
                     tooltip="Text appended to the output.",
                 ),
+                io.Custom(PROMPT_DOC).Input(
+                    "doc",
+                    optional=True,
+                    tooltip="FP Folded Prompts' doc output, placed between before_text and the tab text.",
+                ),
             ],
-            hidden=[io.Hidden.unique_id],
+            hidden=[io.Hidden.unique_id, io.Hidden.extra_pnginfo],
             outputs=[
                 io.String.Output(display_name="text"),
+                *[io.String.Output(display_name=f"tab{i}") for i in range(1, MAX_TAB_OUTPUTS + 1)],
             ],
         )
 
     @classmethod
+    @fp_metrics.instrument("FPTabbedTextArea", "fingerprint")
     def fingerprint_inputs(cls, __fp_text__: str = "", **kwargs) -> str:
-        return hashlib.sha256((__fp_text__ or "").encode()).hexdigest()
+        return hashlib.sha256((__fp_text__ or "").encode("utf-8", "surrogatepass")).hexdigest()
 
     @classmethod
+    @fp_metrics.instrument("FPTabbedTextArea")
     def execute(
         cls,
         node_data_json: str = "",
         __fp_text__: str = "",
+        __fp_tabs_json__: str = "",
         before_text: str = "",
         after_text: str = "",
+        doc: PromptDoc | None = None,
     ) -> io.NodeOutput:
         unique_id = str(cls.hidden.unique_id) if cls.hidden else ""
-        before = before_text or ""
+        before = _join_parts(before_text, doc.text if doc is not None else "", "")
         after  = after_text or ""
-        main_text = "\n".join(p for p in [before, __fp_text__, after] if p)
-        return io.NodeOutput(main_text)
+        main_text = _join_parts(before, __fp_text__, after)
+        extra_pnginfo = cls.hidden.extra_pnginfo if cls.hidden else None
+        tab_texts = [_join_parts(before, t, after) for t in parse_tab_texts(__fp_tabs_json__, extra_pnginfo)]
+        tab_texts += [""] * (MAX_TAB_OUTPUTS - len(tab_texts))
+        return io.NodeOutput(main_text, *tab_texts)
 
 
 class FPTabbedTextAreaExtension(ComfyExtension):
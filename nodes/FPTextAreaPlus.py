@@ -1,5 +1,10 @@
 from comfy_api.latest import ComfyExtension, io
 
+from . import fp_metrics
+from .fp_prompt_doc import TYPE_NAME as PROMPT_DOC, PromptDoc
+from .fp_settings import COMMENT_PREFIX
+from .fp_tags import canonicalize_tags
+
 
 class FPTextAreaPlus(io.ComfyNode):
     @classmethod
@@ -28,21 +33,48 @@ class FPTextAreaPlus(io.ComfyNode):
                     force_input=True,
                     optional=True,
                 ),
+                io.Custom(PROMPT_DOC).Input(
+                    "doc",
+                    optional=True,
+                    tooltip="FP Folded Prompts' doc output, placed between before_text and text.",
+                ),
+                io.Boolean.Input(
+                    "dedup_tags",
+                    default=False,
+                    optional=True,
+                    tooltip="Drop repeated comma-separated tags (per region), merging their weights.",
+                ),
             ],
             outputs=[
                 io.String.Output(display_name="text"),
+                io.Custom(PROMPT_DOC).Output(
+                    display_name="doc",
+                    tooltip="The same text, keeping the lines of an input doc.",
+                ),
             ],
         )
 
     @classmethod
+    @fp_metrics.instrument("FPTextAreaPlus")
     def execute(
         cls,
         text: str = "",
         before_text: str = "",
         after_text: str = "",
+        doc: PromptDoc | None = None,
+        dedup_tags: bool = False,
     ) -> io.NodeOutput:
-        parts = [p for p in [before_text or "", text or "", after_text or ""] if p]
-        return io.NodeOutput("\n".join(parts))
+        doc_text = doc.text if doc is not None else ""
+        parts = [p for p in [before_text or "", doc_text, text or "", after_text or ""] if p]
+        result = "\n".join(parts)
+        if dedup_tags:
+            result = canonicalize_tags(result, COMMENT_PREFIX.get())
+            out_doc = PromptDoc.from_text(result)
+        elif doc is not None:
+            out_doc = doc.prepend(before_text or "").append("\n".join(p for p in [text or "", after_text or ""] if p))
+        else:
+            out_doc = PromptDoc.from_text(result)
+        return io.NodeOutput(result, out_doc)
 
 
 class FPTextAreaPlusExtension(ComfyExtension):
@@ -1,13 +1,19 @@
 import re
 import os
-import json
 import hashlib
+import functools
+from typing import Callable
 
 from comfy_api.latest import ComfyExtension, io
 
-_AR_BLOCK_RE = re.compile(r"<AR([1-5])>(.*?)</>", re.DOTALL | re.IGNORECASE)
-_AR_OPEN_RE  = re.compile(r"<AR([1-5])>", re.IGNORECASE)
-_AR_CLOSE_RE = re.compile(r"</>",         re.IGNORECASE)
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+from .fp_prompt_doc import TYPE_NAME as PROMPT_DOC, PromptDoc
+from .fp_regions import OPEN_RE, CLOSE_RE, TOKEN_RE, RegionIndex, ordered_keys, positional, region_key, region_number
+from .fp_settings import COMMENT_PREFIX
+from .fp_tokens import dump_stats, region_token_stats
+
+_AR_BLOCK_RE = re.compile(r"(<AR(?:\d+|:[^\s<>/]+)>)(.*?)</>", re.DOTALL | re.IGNORECASE)
 
 
 def collapse_empty_lines(text: str) -> str:
@@ -47,8 +53,8 @@ def get_uncommented_text(full_text: str, comment_prefix: str) -> str:
 def make_all_expt_comments(uncommented_text: str) -> str:
     if not uncommented_text:
         return ""
-    s = _AR_OPEN_RE.sub("", uncommented_text)
-    s = _AR_CLOSE_RE.sub("", s)
+    s = OPEN_RE.sub("", uncommented_text)
+    s = CLOSE_RE.sub("", s)
     return collapse_empty_lines(s)
 
 
@@ -59,30 +65,324 @@ def make_all_expt_areas(uncommented_text: str) -> str:
 
 
 def extract_ar_blocks(text: str) -> dict[str, list[str]]:
-    ar_contents = {f"AR{i}": [] for i in range(1, 6)}
+    ar_contents: dict[str, list[str]] = {}
     for m in _AR_BLOCK_RE.finditer(text):
-        tag_num = int(m.group(1))
         content = (m.group(2) or "").strip()
         if content:
-            ar_contents[f"AR{tag_num}"].append(content)
-    return ar_contents
+            ar_contents.setdefault(region_key(m.group(1)), []).append(content)
+    return {key: ar_contents[key] for key in ordered_keys(ar_contents)}
 
 
-def load_comment_prefix() -> str:
-    try:
-        settings_path = os.path.join(
-            os.path.dirname(__file__), "..", "..", "..", "user", "settings.json"
-        )
-        if os.path.exists(settings_path):
-            with open(settings_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                val = data.get("keybinding_extra.comment_prefix")
-                if val and isinstance(val, str):
-                    # print(f"[FP load_comment_prefix] loaded from settings: {val.strip()!r}")
-                    return val.strip()
-    except Exception as e:
-        print(f"[FP load_comment_prefix] error reading settings: {e}")
-    return "//"
+_COMMA_RE        = re.compile(r"\s*,\s*")
+_COMMA_RUN_RE    = re.compile(r"(?:,\s*){2,}")
+_COMMA_TAIL_RE   = re.compile(r"(?:,\s*)+$")
+# Line boundaries of str.splitlines() other than "\n".
+_LINE_BREAK_RE   = re.compile("[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+
+
+def _strip_comment_lines(full_text: str, comment_prefix: str) -> str:
+    """Same result as get_uncommented_text(), but only visits lines that
+    actually contain the comment prefix."""
+    if not full_text:
+        return ""
+    text = "\n".join(full_text.splitlines())
+    if not comment_prefix or comment_prefix not in text:
+        return text
+    if comment_prefix != comment_prefix.strip() or len(comment_prefix.splitlines()) > 1:
+        return get_uncommented_text(full_text, comment_prefix)
+    if text.count(comment_prefix) * 3 > text.count("\n") + 1:
+        # Comments on most lines: the plain per-line loop is cheaper.
+        return get_uncommented_text(full_text, comment_prefix)
+
+    pieces = []
+    pos    = 0
+    end    = len(text)
+    dropped_last = False
+    p = text.find(comment_prefix)
+    while p != -1:
+        line_start = text.rfind("\n", 0, p) + 1
+        line_end   = text.find("\n", p)
+        if line_end == -1:
+            line_end = end
+        head = text[line_start:p]
+        pieces.append(text[pos:line_start])
+        if head.strip():
+            pieces.append(head.rstrip())
+            pos = line_end
+        else:
+            # Whole-line comment: drop the line together with its newline.
+            pos = line_end + 1
+            dropped_last = line_end == end
+        p = text.find(comment_prefix, line_end)
+    pieces.append(text[pos:])
+
+    result = "".join(pieces)
+    if dropped_last and result.endswith("\n"):
+        result = result[:-1]
+    return result
+
+
+def lex_prompt(full_text: str, comment_prefix: str) -> tuple[str, str, dict[str, list[str]]]:
+    """Single marker scan over the uncommented text.
+
+    Produces the same all_expt_comments, all_expt_areas and region contents
+    as make_all_expt_comments / make_all_expt_areas / extract_ar_blocks, as
+    slices over one RegionIndex instead of a regex pass per output."""
+    text = _strip_comment_lines(full_text, comment_prefix)
+    if not text:
+        return "", "", {}
+    index = RegionIndex(text)
+    return (
+        collapse_empty_lines(index.without_markers()),
+        collapse_empty_lines(index.without_blocks()),
+        index.region_contents(),
+    )
+
+
+def lex_doc(
+    doc: PromptDoc,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+    full_text: str,
+) -> tuple[str, str, dict[str, list[str]]] | None:
+    """lex_prompt(full_text) read from the doc's lines instead of the
+    rendered markers. full_text is build_full_text(before_text, doc.text,
+    after_text). None when the text holds something the lines don't show
+    (comments, marker-like text, other line breaks): lex the text then."""
+    contents = doc.region_contents()
+    if contents is None:
+        return None
+    if (comment_prefix and comment_prefix in full_text) or _LINE_BREAK_RE.search(full_text):
+        return None
+
+    def full(middle: str) -> str:
+        parts = [str(before_text)] if before_text else []
+        if doc.text:
+            parts.append(middle)
+        if after_text:
+            parts.append(str(after_text))
+        return "\n".join(parts)
+
+    without_markers = full(doc.without_markers())
+    if TOKEN_RE.search(without_markers):
+        return None
+    without_blocks = full(doc.without_blocks())
+    if full_text.endswith("\n"):
+        # splitlines() drops a trailing newline.
+        without_markers, without_blocks = without_markers[:-1], without_blocks[:-1]
+    return collapse_empty_lines(without_markers), collapse_empty_lines(without_blocks), contents
+
+
+def _flatten_impact_parts(parts: list[str]) -> str:
+    flat = " ".join(
+        str(p).replace("\r\n", "\n").replace("\r", "\n").strip()
+        for p in parts
+        if p is not None and str(p).strip() != ""
+    )
+    flat = _COMMA_RE.sub(", ", flat)
+    flat = _COMMA_RUN_RE.sub(", ", flat)
+    return _COMMA_TAIL_RE.sub("", flat).strip()
+
+
+def clean_and_split(
+    text: str | None,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> tuple[str, str, list, str, dict]:
+    """Returns all_expt_comments, all_expt_areas, ar_list, impact_wildcard
+    and regions ({key: text} for every region present, see fp_regions)."""
+    full_text = build_full_text(before_text, text, after_text)
+    if not full_text.strip():
+        return "", "", positional({}), "", {}
+    return _split_result(lex_prompt(full_text, comment_prefix), before_text, after_text)
+
+
+def doc_clean_and_split(
+    doc: PromptDoc,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> tuple[str, str, list, str, dict]:
+    """clean_and_split(doc.text, ...), with regions taken from the doc's
+    lines where they can stand in for the text (see lex_doc)."""
+    full_text = build_full_text(before_text, doc.text, after_text)
+    if not full_text.strip():
+        return "", "", positional({}), "", {}
+    lexed = lex_doc(doc, before_text, after_text, comment_prefix, full_text)
+    if lexed is None:
+        lexed = lex_prompt(full_text, comment_prefix)
+    return _split_result(lexed, before_text, after_text)
+
+
+def _split_result(
+    lexed: tuple[str, str, dict[str, list[str]]],
+    before_text: str | None,
+    after_text: str | None,
+) -> tuple[str, str, list, str, dict]:
+    all_expt_comments, all_expt_areas, ar_contents = lexed
+    bt = (before_text or "").strip()
+    at = (after_text  or "").strip()
+
+    regions = {}
+    impact_lines = ["[LAB]"]
+    for key, parts_local in ar_contents.items():
+        combined = "\n".join(parts_local).strip()
+        if combined:
+            regions[key] = f"{bt} {combined} {at}".strip() if bt or at else combined
+        flat = _flatten_impact_parts(parts_local)
+        if not flat:
+            continue
+        if bt or at:
+            impact_lines.append(f"[{key}] {bt} {flat}, {at}".rstrip())
+        else:
+            impact_lines.append(f"[{key}]{flat}, ")
+
+    return all_expt_comments, all_expt_areas, positional(regions), "\n".join(impact_lines), regions
+
+
+_RESULT_CACHE = ByteBudgetLRU(int(os.environ.get("FP_CLEAN_CACHE_BYTES", 64 * 1024 * 1024)))
+
+
+def inputs_digest(
+    text: str | None,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> str:
+    h = hashlib.sha256()
+    for part in (comment_prefix, before_text, text, after_text):
+        data = str(part or "").encode("utf-8", "surrogatepass")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def text_digest(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return hashlib.sha256(value.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _copy_result(result: tuple) -> tuple:
+    # ar_list and regions are mutable; never hand out the cached instances.
+    return result[0], result[1], list(result[2]), result[3], dict(result[4])
+
+
+def _derived_outputs(result: tuple) -> tuple[str, tuple, str, tuple]:
+    """areas_digest, ar_digests and token_stats of a clean_and_split result,
+    plus (key, digest) pairs for "ALL" (all_expt_areas) and every region."""
+    all_expt_areas, ar_list, regions = result[1], result[2], result[4]
+    areas_digest = text_digest(all_expt_areas)
+    ar_digests   = tuple(text_digest(v) for v in ar_list)
+    key_digests  = [("ALL", areas_digest)]
+    for key, value in regions.items():
+        n = region_number(key)
+        key_digests.append((key, ar_digests[n - 1] if n is not None and 0 < n <= len(ar_digests) else text_digest(value)))
+    return (
+        areas_digest,
+        ar_digests,
+        dump_stats(region_token_stats(all_expt_areas, regions)),
+        tuple(key_digests),
+    )
+
+
+def get_cached_result(digest: str) -> tuple | None:
+    result = _RESULT_CACHE.get(digest)
+    return _copy_result(result) if result is not None else None
+
+
+def put_cached_result(digest: str, result: tuple) -> None:
+    _RESULT_CACHE.put(digest, _copy_result(result))
+
+
+def cached_outputs(key: str, compute: Callable[[], tuple]) -> tuple:
+    """The result for `key` followed by areas_digest, ar_digests,
+    token_stats and the key digests changed_regions() compares. Entries put
+    by put_cached_result() get the derived outputs added on first use, so a
+    hit never hashes or tokenizes again."""
+    entry = _RESULT_CACHE.get(key)
+    if entry is None or len(entry) == 5:
+        result = compute() if entry is None else entry
+        entry = _copy_result(result) + _derived_outputs(result)
+        _RESULT_CACHE.put(key, entry)
+    areas_digest, ar_digests, token_stats, key_digests = entry[5:]
+    return (*_copy_result(entry), areas_digest, list(ar_digests), token_stats, key_digests)
+
+
+def cached_clean_and_split(
+    text: str | None,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> tuple[str, str, list, str, dict]:
+    key = inputs_digest(text, before_text, after_text, comment_prefix)
+    result = get_cached_result(key)
+    if result is None:
+        result = clean_and_split(text, before_text, after_text, comment_prefix)
+        put_cached_result(key, result)
+    return result
+
+
+def cached_doc_clean_and_split(
+    doc: PromptDoc,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> tuple[str, str, list, str, dict]:
+    key = doc_inputs_digest(doc, before_text, after_text, comment_prefix)
+    result = get_cached_result(key)
+    if result is None:
+        result = doc_clean_and_split(doc, before_text, after_text, comment_prefix)
+        put_cached_result(key, result)
+    return result
+
+
+def doc_inputs_digest(
+    doc: PromptDoc,
+    before_text: str | None,
+    after_text: str | None,
+    comment_prefix: str,
+) -> str:
+    # Keyed by the doc's digest, so the rendered text is never hashed.
+    return "doc:" + inputs_digest(doc.digest, before_text, after_text, comment_prefix)
+
+
+def result_cache_stats() -> dict:
+    return _RESULT_CACHE.stats()
+
+
+_PREV_DIGESTS = ByteBudgetLRU(4 * 1024 * 1024)
+
+fp_metrics.register_cache("clean_result", _RESULT_CACHE)
+fp_metrics.register_cache("region_digests", _PREV_DIGESTS)
+fp_metrics.register_cache("comment_prefix", COMMENT_PREFIX)
+
+
+def changed_regions(unique_id: str, key_digests: tuple) -> list[str]:
+    """Keys whose output changed since the previous execution of the same
+    node: "ALL" for all_expt_areas, then region keys in ordered_keys() order.
+
+    The first execution of a node reports everything present as changed; a
+    region that disappeared since the previous run is reported as changed
+    too."""
+    current  = dict(key_digests)
+    previous = None
+    if unique_id:
+        previous = _PREV_DIGESTS.get(unique_id)
+        _PREV_DIGESTS.put(unique_id, key_digests)
+    if previous is None:
+        changed = set(current)
+    else:
+        previous = dict(previous)
+        changed = {key for key in current.keys() | previous.keys() if current.get(key) != previous.get(key)}
+    regions = ordered_keys(key for key in changed if key != "ALL")
+    return ["ALL", *regions] if "ALL" in changed else regions
+
+
+def load_comment_prefix(override: str | None = None) -> str:
+    return COMMENT_PREFIX.get(override)
 
 
 class FPTextCleanAndSplitt(io.ComfyNode):
@@ -93,9 +393,10 @@ class FPTextCleanAndSplitt(io.ComfyNode):
             display_name="FP Text Clean And Splitt",
             category="AK/Folded Prompts",
             description=(
-                "Strips comments and splits AR-tagged blocks from prompt text. "
-                "Outputs cleaned text, text without AR areas, per-AR list, "
-                "and an Impact Pack wildcard string."
+                "Strips comments and splits region blocks (<ARn>...</> or <AR:name>...</>) "
+                "from prompt text. Outputs cleaned text, text without regions, the "
+                "numbered regions as a list, every region by key, and an Impact Pack "
+                "wildcard string."
             ),
             inputs=[
                 io.String.Input(
@@ -103,6 +404,15 @@ class FPTextCleanAndSplitt(io.ComfyNode):
                     default="",
                     multiline=True,
                     force_input=True,
+                    optional=True,
+                ),
+                io.Custom(PROMPT_DOC).Input(
+                    "doc",
+                    optional=True,
+                    tooltip=(
+                        "FP Folded Prompts' doc output, used instead of text: regions "
+                        "are read from its lines instead of parsing the rendered text."
+                    ),
                 ),
                 io.String.Input(
                     "before_text",
@@ -118,113 +428,92 @@ class FPTextCleanAndSplitt(io.ComfyNode):
                     force_input=True,
                     optional=True,
                 ),
+                io.String.Input(
+                    "comment_prefix",
+                    default="",
+                    multiline=False,
+                    optional=True,
+                    tooltip=(
+                        "Overrides the comment prefix from Keybinding Extra settings. "
+                        "Leave empty to use settings (or FP_COMMENT_PREFIX env var)."
+                    ),
+                ),
             ],
             outputs=[
                 io.String.Output(display_name="all_expt_comments"),
                 io.String.Output(display_name="all_expt_areas"),
-                io.Custom("LIST").Output(display_name="ar_list"),
+                io.Custom("LIST").Output(
+                    display_name="ar_list",
+                    tooltip="ARn at index n-1 (None where absent); at least 5 entries.",
+                ),
                 io.String.Output(display_name="impact_wildcard"),
+                io.String.Output(
+                    display_name="areas_digest",
+                    tooltip="sha256 of all_expt_areas.",
+                ),
+                io.Custom("LIST").Output(
+                    display_name="ar_digests",
+                    tooltip="sha256 of each ar_list entry (None for empty regions).",
+                ),
+                io.Custom("LIST").Output(
+                    display_name="changed_regions",
+                    tooltip=(
+                        "Outputs changed since this node's previous run: \"ALL\" for "
+                        "all_expt_areas, then region keys (\"AR1\", \"AR:face\", ...)."
+                    ),
+                ),
+                io.String.Output(
+                    display_name="token_stats",
+                    tooltip="JSON: CLIP token and chunk counts of all_expt_areas (ALL) and each region.",
+                ),
+                io.Custom("DICT").Output(
+                    display_name="regions",
+                    tooltip='Every region present, numbered or named: {"AR1": text, "AR:face": text, ...}.',
+                ),
             ],
             hidden=[io.Hidden.unique_id],
         )
 
-    # @classmethod
-    # def fingerprint_inputs(cls, text: str = "", before_text: str = "", after_text: str = "", **kwargs) -> str:
-    #     full = (before_text or "") + (text or "") + (after_text or "")
-    #     h = hashlib.sha256(full.encode()).hexdigest()
-    #     print(f"[FPTextCleanAndSplitt fingerprint_inputs] text={str(text)[:60]!r} => hash={h[:16]}...")
-    #     return h
+    @classmethod
+    @fp_metrics.instrument("FPTextCleanAndSplitt", "fingerprint")
+    def fingerprint_inputs(cls, comment_prefix: str = "", **kwargs) -> str:
+        # ComfyUI passes only widget values here; text, doc, before_text and
+        # after_text are links, and a change to them re-runs the node anyway.
+        # What the fingerprint adds is the effective comment prefix, which
+        # can change in the settings file while no input does.
+        return load_comment_prefix(comment_prefix)
 
     @classmethod
+    @fp_metrics.instrument("FPTextCleanAndSplitt")
     def execute(
         cls,
         text: str = "",
         before_text: str = "",
         after_text: str = "",
+        comment_prefix: str = "",
+        doc: PromptDoc | None = None,
     ) -> io.NodeOutput:
-        unique_id = cls.hidden.unique_id if cls.hidden else "?"
-        # print(f"[FP EXECUTE] id={unique_id} called")
-
-        full_text = build_full_text(before_text, text, after_text)
-
-        if not full_text.strip():
-            # print(f"[FP EXECUTE] id={unique_id} => empty input, returning blanks")
-            return io.NodeOutput("", "", [None] * 5, "")
-
-        prefix = load_comment_prefix()
-        # print(f"[FP EXECUTE] id={unique_id} comment_prefix={prefix!r}")
-        uncommented_text = get_uncommented_text(full_text, prefix)
-
-        ar_contents = extract_ar_blocks(uncommented_text)
-        found_ars   = [k for k, v in ar_contents.items() if v]
-        # print(f"[FP EXECUTE] id={unique_id} AR blocks found: {found_ars if found_ars else 'none'}")
-
-        all_expt_comments = make_all_expt_comments(uncommented_text)
-        all_expt_areas    = make_all_expt_areas(uncommented_text)
-
-        ar_list = []
-        for n in range(1, 6):
-            combined = "\n".join(ar_contents[f"AR{n}"]).strip()
-            ar_list.append(combined if combined else None)
-
-        impact_lines = ["[LAB]"]
-        for n in range(1, 6):
-            parts_local = ar_contents.get(f"AR{n}", [])
-            if not parts_local:
-                continue
-
-            flat = " ".join(
-                str(p).replace("\r\n", "\n").replace("\r", "\n").strip()
-                for p in parts_local
-                if p is not None and str(p).strip() != ""
-            )
-            flat = re.sub(r"\s*,\s*",    ", ", flat)
-            flat = re.sub(r"(?:,\s*){2,}", ", ", flat)
-            flat = re.sub(r"(?:,\s*)+$",   "",   flat).strip()
-
-            if not flat:
-                continue
-
-            if not flat.endswith(","):
-                flat += ","
-            if flat.endswith(","):
-                flat += " "
-
-            impact_lines.append(f"[AR{n}]{flat}")
-
-        bt = (before_text or "").strip()
-        at = (after_text  or "").strip()
-
-        if bt or at:
-            # print(f"[FP EXECUTE] id={unique_id} before_text={bt[:40]!r} after_text={at[:40]!r}")
-            new_ar_list = []
-            for v in ar_list:
-                if v is None:
-                    new_ar_list.append(None)
-                else:
-                    new_ar_list.append(f"{bt} {v} {at}".strip())
-            ar_list = new_ar_list
-
-            new_impact_lines = []
-            for line in impact_lines:
-                if line.startswith("[AR") and "]" in line:
-                    tag, rest = line.split("]", 1)
-                    rest = (rest or "").strip()
-                    new_line = f"{tag}] {bt} {rest} {at}".rstrip() if rest else f"{tag}] {bt} {at}".rstrip()
-                    new_impact_lines.append(new_line)
-                else:
-                    new_impact_lines.append(line)
-            impact_lines = new_impact_lines
-
-        impact_wildcard = "\n".join(impact_lines)
-
-        # print(f"[FP EXECUTE] id={unique_id} all_expt_comments={all_expt_comments[:80]!r}")
-        # print(f"[FP EXECUTE] id={unique_id} all_expt_areas={all_expt_areas[:80]!r}")
-        # print(f"[FP EXECUTE] id={unique_id} ar_list={[v[:40] if v else None for v in ar_list]}")
-        # print(f"[FP EXECUTE] id={unique_id} impact_wildcard={impact_wildcard[:120]!r}")
-        # print(f"[FP EXECUTE] id={unique_id} done")
-
-        return io.NodeOutput(all_expt_comments, all_expt_areas, ar_list, impact_wildcard)
+        prefix = load_comment_prefix(comment_prefix)
+        if doc is not None:
+            key = doc_inputs_digest(doc, before_text, after_text, prefix)
+            compute = functools.partial(doc_clean_and_split, doc, before_text, after_text, prefix)
+        else:
+            key = inputs_digest(text, before_text, after_text, prefix)
+            compute = functools.partial(clean_and_split, text, before_text, after_text, prefix)
+        (all_expt_comments, all_expt_areas, ar_list, impact_wildcard, regions,
+         areas_digest, ar_digests, token_stats, key_digests) = cached_outputs(key, compute)
+        unique_id = str(cls.hidden.unique_id) if cls.hidden else ""
+        return io.NodeOutput(
+            all_expt_comments,
+            all_expt_areas,
+            ar_list,
+            impact_wildcard,
+            areas_digest,
+            ar_digests,
+            changed_regions(unique_id, key_digests),
+            token_stats,
+            regions,
+        )
 
 
 class FPTextCleanAndSplittExtension(ComfyExtension):
@@ -0,0 +1,147 @@
+from comfy_api.latest import ComfyExtension, io
+
+from . import fp_metrics
+from .FPTextCleanAndSplitt import (
+    _copy_result,
+    clean_and_split,
+    get_cached_result,
+    inputs_digest,
+    load_comment_prefix,
+    put_cached_result,
+)
+
+
+def _item(values: list, i: int, default=""):
+    # ComfyUI list broadcasting: shorter lists repeat their last element.
+    if not values:
+        return default
+    return values[i] if i < len(values) else values[-1]
+
+
+def clean_and_split_batch(
+    texts: list[str],
+    before_texts: list[str],
+    after_texts: list[str],
+    comment_prefix: str,
+) -> list[tuple]:
+    """clean_and_split() of every (text, before, after) triple, in this
+    process. Cached results are reused and identical prompts are computed
+    once."""
+    count = max(len(texts), len(before_texts), len(after_texts))
+    jobs = [
+        (_item(texts, i), _item(before_texts, i), _item(after_texts, i))
+        for i in range(count)
+    ]
+
+    digests = [inputs_digest(t, b, a, comment_prefix) for t, b, a in jobs]
+    results = [get_cached_result(d) for d in digests]
+    # Identical prompts inside one batch are computed once.
+    misses: dict[str, int] = {}
+    for i, r in enumerate(results):
+        if r is None:
+            misses.setdefault(digests[i], i)
+
+    fresh = {
+        digest: clean_and_split(*jobs[i], comment_prefix)
+        for digest, i in misses.items()
+    }
+    for digest, result in fresh.items():
+        put_cached_result(digest, result)
+    for i, r in enumerate(results):
+        if r is None:
+            results[i] = _copy_result(fresh[digests[i]])
+    return results
+
+
+class FPTextCleanAndSplittList(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="FPTextCleanAndSplittList",
+            display_name="FP Text Clean And Splitt (List)",
+            category="AK/Folded Prompts",
+            description=(
+                "List version of FP Text Clean And Splitt. Processes a whole list "
+                "of prompts in one call and outputs parallel lists."
+            ),
+            is_input_list=True,
+            inputs=[
+                io.String.Input(
+                    "text",
+                    default="",
+                    multiline=True,
+                    force_input=True,
+                ),
+                io.String.Input(
+                    "before_text",
+                    default="",
+                    multiline=False,
+                    force_input=True,
+                    optional=True,
+                ),
+                io.String.Input(
+                    "after_text",
+                    default="",
+                    multiline=False,
+                    force_input=True,
+                    optional=True,
+                ),
+                io.String.Input(
+                    "comment_prefix",
+                    default="",
+                    multiline=False,
+                    optional=True,
+                    tooltip=(
+                        "Overrides the comment prefix from Keybinding Extra settings. "
+                        "Leave empty to use settings (or FP_COMMENT_PREFIX env var)."
+                    ),
+                ),
+            ],
+            outputs=[
+                io.String.Output(display_name="all_expt_comments", is_output_list=True),
+                io.String.Output(display_name="all_expt_areas", is_output_list=True),
+                io.Custom("LIST").Output(display_name="ar_list", is_output_list=True),
+                io.String.Output(display_name="impact_wildcard", is_output_list=True),
+            ],
+        )
+
+    @classmethod
+    @fp_metrics.instrument("FPTextCleanAndSplittList")
+    def execute(
+        cls,
+        text: list[str] = None,
+        before_text: list[str] = None,
+        after_text: list[str] = None,
+        comment_prefix: list[str] = None,
+    ) -> io.NodeOutput:
+        prefix = load_comment_prefix(_item(comment_prefix or [], 0))
+        results = clean_and_split_batch(
+            text or [],
+            before_text or [],
+            after_text or [],
+            prefix,
+        )
+        if not results:
+            return io.NodeOutput([], [], [], [])
+        all_expt_comments, all_expt_areas, ar_lists, impact_wildcards, _ = (
+            list(column) for column in zip(*results)
+        )
+        return io.NodeOutput(all_expt_comments, all_expt_areas, ar_lists, impact_wildcards)
+
+
+class FPTextCleanAndSplittListExtension(ComfyExtension):
+    async def get_node_list(self) -> list[type[io.ComfyNode]]:
+        return [FPTextCleanAndSplittList]
+
+
+async def comfy_entrypoint() -> FPTextCleanAndSplittListExtension:
+    return FPTextCleanAndSplittListExtension()
+
+
+NODE_CLASS_MAPPINGS = {
+    "FPTextCleanAndSplittList": FPTextCleanAndSplittList,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "FPTextCleanAndSplittList": "FP Text Clean And Splitt (List)",
+}
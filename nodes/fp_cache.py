@@ -0,0 +1,81 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+def _default_sizeof(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_default_sizeof(v) for v in value) + 8 * len(value)
+    if value is None:
+        return 0
+    return sys.getsizeof(value)
+
+
+class ByteBudgetLRU:
+    """Thread-safe LRU mapping evicted by an approximate byte budget.
+    Subclasses setting `keep_newest` always keep the most recently put
+    value, even one that alone exceeds the budget."""
+
+    keep_newest = False
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] | None = None):
+        self.max_bytes = max(0, int(max_bytes))
+        self._sizeof   = sizeof or _default_sizeof
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock     = threading.Lock()
+        self.bytes     = 0
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes and not self.keep_newest:
+                return
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._data) > (1 if self.keep_newest else 0):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":   len(self._data),
+                "bytes":     self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+                "hit_rate":  (self.hits / lookups) if lookups else 0.0,
+            }
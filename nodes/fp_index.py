@@ -0,0 +1,278 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+from . import fp_metrics
+from .fp_tree import iter_lines, js_truthy, line_text, load_tree
+
+INDEX_PATH_ENV = "FP_INDEX_PATH"
+INDEX_NAME     = ".pf_index.sqlite3"
+_SCHEMA_VERSION = 1
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _fts_query(query: str, prefix: bool) -> str | None:
+    """Quote every word so user input can't inject FTS syntax; prefix mode
+    lets the last word match as a prefix (search-as-you-type)."""
+    words = _WORD_RE.findall(query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class PromptIndex:
+    """Incrementally maintained SQLite index over saved trees: the refs of
+    a fp_store.TreeStore (files named "<workflow>/<node>") and any legacy
+    pf_*.json files in data_dir.
+
+    Every line (enabled or not) is stored with its text, folder path,
+    effective area and enabled flag. refresh() only re-reads files whose
+    (mtime, size) changed and only rewrites rows when the content digest
+    changed. Uses FTS5 when the sqlite build has it, LIKE scans otherwise."""
+
+    def __init__(
+        self,
+        data_dir: str,
+        db_path: str | None = None,
+        refresh_interval: float = 1.0,
+        store=None,
+    ):
+        self.data_dir = data_dir
+        self.store    = store
+        self.db_path  = db_path or os.environ.get(INDEX_PATH_ENV) or os.path.join(data_dir, INDEX_NAME)
+        self.refresh_interval = refresh_interval
+        self.fts5 = _fts5_available()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._last_refresh = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='lines_fts'"
+        ).fetchone() is not None
+        if version != _SCHEMA_VERSION or has_fts != self.fts5:
+            conn.executescript("""
+                DROP TABLE IF EXISTS lines_fts;
+                DROP TABLE IF EXISTS lines;
+                DROP TABLE IF EXISTS files;
+            """)
+
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                name     TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size     INTEGER NOT NULL,
+                digest   TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lines (
+                id      INTEGER PRIMARY KEY,
+                file    TEXT NOT NULL,
+                idx     INTEGER NOT NULL,
+                text    TEXT NOT NULL,
+                folder  TEXT NOT NULL,
+                area    TEXT NOT NULL,
+                enabled INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lines_file ON lines(file);
+        """)
+        if self.fts5:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+                    text, folder, content='lines', content_rowid='id', prefix='2 3'
+                );
+                CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+                    INSERT INTO lines_fts(rowid, text, folder) VALUES (new.id, new.text, new.folder);
+                END;
+                CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+                    INSERT INTO lines_fts(lines_fts, rowid, text, folder)
+                    VALUES ('delete', old.id, old.text, old.folder);
+                END;
+            """)
+        conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        found = {}
+        try:
+            entries = os.scandir(self.data_dir)
+        except FileNotFoundError:
+            return found
+        with entries:
+            for entry in entries:
+                if entry.name.startswith("pf_") and entry.name.endswith(".json") and entry.is_file():
+                    st = entry.stat()
+                    found[entry.name] = (st.st_mtime_ns, st.st_size)
+        if self.store is not None:
+            for name, mtime_ns, size, _ in self.store.iter_refs():
+                found[name] = (mtime_ns, size)
+        return found
+
+    def _read(self, name: str) -> str:
+        if "/" in name and self.store is not None:
+            content = self.store.read_ref(name)
+            if content is None:
+                raise OSError("missing ref or blob")
+            return content
+        with open(os.path.join(self.data_dir, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def refresh(self, force: bool = False) -> dict:
+        """Bring the index up to date with data_dir. Returns change counts."""
+        now = time.monotonic()
+        counts = {"indexed": 0, "touched": 0, "removed": 0}
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return counts
+            self._last_refresh = now
+            conn = self._connect()
+            on_disk = self._scan()
+            known = {
+                name: (mtime_ns, size, digest)
+                for name, mtime_ns, size, digest in conn.execute(
+                    "SELECT name, mtime_ns, size, digest FROM files"
+                )
+            }
+
+            with conn:
+                for name in known.keys() - on_disk.keys():
+                    conn.execute("DELETE FROM lines WHERE file=?", (name,))
+                    conn.execute("DELETE FROM files WHERE name=?", (name,))
+                    counts["removed"] += 1
+
+                for name, (mtime_ns, size) in on_disk.items():
+                    prev = known.get(name)
+                    if prev is not None and prev[0] == mtime_ns and prev[1] == size:
+                        continue
+                    try:
+                        content = self._read(name)
+                    except OSError as e:
+                        print(f"[fp_index] Failed to read {name}: {e}")
+                        continue
+                    digest = hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+                    if prev is None or prev[2] != digest:
+                        self._reindex_file(conn, name, content)
+                        counts["indexed"] += 1
+                    else:
+                        counts["touched"] += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO files(name, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+                        (name, mtime_ns, size, digest),
+                    )
+        return counts
+
+    def _reindex_file(self, conn: sqlite3.Connection, name: str, content: str) -> None:
+        conn.execute("DELETE FROM lines WHERE file=?", (name,))
+        try:
+            tree = load_tree(content)
+            rows = [
+                (name, idx, line_text(item), " / ".join(path), area, int(js_truthy(item.get("enabled"))))
+                for idx, (item, area, path) in enumerate(iter_lines(tree))
+            ]
+        except Exception as e:
+            print(f"[fp_index] Failed to parse {name}: {e}")
+            fp_metrics.parse_failure("pf_index", e)
+            return
+        conn.executemany(
+            "INSERT INTO lines(file, idx, text, folder, area, enabled) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def search(
+        self,
+        query: str,
+        prefix: bool = False,
+        limit: int = 50,
+        area: str | None = None,
+        enabled: bool | None = None,
+    ) -> list[dict]:
+        """Lines whose text or folder path contains every word of `query`.
+        With prefix=True the last word also matches as a prefix."""
+        self.refresh()
+        select = "SELECT l.file, l.idx, l.text, l.folder, l.area, l.enabled "
+        where, params = [], []
+
+        if self.fts5:
+            match = _fts_query(query, prefix)
+            if match is None:
+                return []
+            select += "FROM lines_fts JOIN lines l ON l.id = lines_fts.rowid"
+            where.append("lines_fts MATCH ?")
+            params.append(match)
+            order = "bm25(lines_fts), l.file, l.idx"
+        else:
+            words = _WORD_RE.findall(query)
+            if not words:
+                return []
+            select += "FROM lines l"
+            # Substring matches already cover prefix mode.
+            for w in words:
+                pattern = "%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                where.append("(l.text LIKE ? ESCAPE '\\' OR l.folder LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+            order = "l.file, l.idx"
+
+        if area:
+            where.append("l.area = ?")
+            params.append(area)
+        if enabled is not None:
+            where.append("l.enabled = ?")
+            params.append(int(enabled))
+
+        sql = f"{select} WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        params.append(max(1, int(limit)))
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [
+            {
+                "file":    file,
+                "line":    idx,
+                "text":    text,
+                "folder":  folder,
+                "area":    area_,
+                "enabled": bool(enabled_),
+            }
+            for file, idx, text, folder, area_, enabled_ in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connect()
+            files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            lines = conn.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+        return {"db_path": self.db_path, "fts5": self.fts5, "files": files, "lines": lines}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
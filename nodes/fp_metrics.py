@@ -0,0 +1,254 @@
+"""Shared instrumentation for the Folded Prompts nodes.
+
+Collection is off unless FP_METRICS=1: instrument() then returns the
+wrapped function untouched and observe()/inc() return immediately.
+FP_METRICS_LOG=1 additionally emits one JSON log record per event on the
+"fp_metrics" logger. Cache statistics are read from the caches' own
+stats() at scrape time, so they cost nothing on the hot path.
+
+GET /fp/metrics serves everything in Prometheus text format.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import functools
+import threading
+from typing import Any, Callable
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    web = None
+    PromptServer = None
+
+ENABLED     = os.environ.get("FP_METRICS", "").lower() in ("1", "true", "yes")
+LOG_ENABLED = ENABLED and os.environ.get("FP_METRICS_LOG", "").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("fp_metrics")
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS   = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+_HELP = {
+    "fp_node_seconds":             ("histogram", "Time spent in a node phase (execute / fingerprint)."),
+    "fp_node_input_bytes":         ("histogram", "Size of a node's text/tensor inputs."),
+    "fp_node_output_bytes":        ("histogram", "Size of a node's outputs."),
+    "fp_node_errors_total":        ("counter",   "Exceptions raised by a node phase."),
+    "fp_json_parse_failures_total": ("counter",  "Documents that failed to parse."),
+    "fp_pf_data_write_seconds":    ("histogram", "Latency of one pf_data snapshot write."),
+    "fp_pf_data_writes_total":     ("counter",   "pf_data snapshot writes by result."),
+}
+
+_lock = threading.Lock()
+_counters: dict[tuple[str, tuple], float] = {}
+_histograms: dict[tuple[str, tuple], list] = {}   # key -> [bucket counts..., +Inf count, sum]
+_collectors: list[Callable[[], list[tuple[str, str, str, dict, float]]]] = []
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _log(event: str, **fields) -> None:
+    if LOG_ENABLED:
+        logger.info(json.dumps({"event": event, "ts": time.time(), **fields}, default=str))
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    if not ENABLED:
+        return
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if not ENABLED:
+        return
+    buckets = BYTES_BUCKETS if name.endswith("_bytes") else SECONDS_BUCKETS
+    key = (name, _labels_key(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(buckets)] += 1
+        h[-1] += value
+
+
+def payload_size(value: Any, _depth: int = 0) -> int:
+    """Cheap size of node inputs/outputs: text length, tensor bytes, and
+    the sum over (shallow) lists, tuples and dicts of those."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if _depth < 2:
+        if isinstance(value, (list, tuple)):
+            return sum(payload_size(v, _depth + 1) for v in value)
+        if isinstance(value, dict):
+            return sum(payload_size(v, _depth + 1) for v in value.values())
+    return 0
+
+
+def _output_values(result: Any) -> Any:
+    # io.NodeOutput keeps its values in .args
+    return getattr(result, "args", result)
+
+
+def instrument(node: str, phase: str = "execute") -> Callable:
+    """Decorator for a node's execute / fingerprint_inputs function (apply
+    below @classmethod). A no-op when metrics are disabled."""
+
+    def decorate(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(cls, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = fn(cls, *args, **kwargs)
+            except Exception:
+                inc("fp_node_errors_total", node=node, phase=phase)
+                raise
+            elapsed = time.perf_counter() - t0
+            in_bytes = payload_size(args) + payload_size(kwargs)
+            observe("fp_node_seconds", elapsed, node=node, phase=phase)
+            observe("fp_node_input_bytes", in_bytes, node=node, phase=phase)
+            out_bytes = None
+            if phase == "execute":
+                out_bytes = payload_size(_output_values(result))
+                observe("fp_node_output_bytes", out_bytes, node=node, phase=phase)
+            _log("fp_node", node=node, phase=phase, seconds=elapsed, input_bytes=in_bytes, output_bytes=out_bytes)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def parse_failure(source: str, error: Exception) -> None:
+    inc("fp_json_parse_failures_total", source=source)
+    _log("fp_json_parse_failure", source=source, error=str(error))
+
+
+def pf_data_write(seconds: float | None, result: str) -> None:
+    if not ENABLED:
+        return
+    inc("fp_pf_data_writes_total", result=result)
+    if seconds is not None:
+        observe("fp_pf_data_write_seconds", seconds)
+    _log("fp_pf_data_write", result=result, seconds=seconds)
+
+
+def register_collector(fn: Callable[[], list[tuple[str, str, str, dict, float]]]) -> None:
+    """fn() returns (name, type, help, labels, value) samples at scrape time."""
+    _collectors.append(fn)
+
+
+_CACHE_FIELDS = (
+    ("hits",      "counter", "fp_cache_hits_total",      "Cache hits."),
+    ("misses",    "counter", "fp_cache_misses_total",    "Cache misses."),
+    ("evictions", "counter", "fp_cache_evictions_total", "Cache evictions."),
+    ("entries",   "gauge",   "fp_cache_entries",         "Entries currently cached."),
+    ("bytes",     "gauge",   "fp_cache_bytes",           "Bytes currently cached (estimated)."),
+    ("max_bytes", "gauge",   "fp_cache_max_bytes",       "Cache byte budget."),
+)
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Export a cache's stats() (hits, misses, evictions, entries, bytes,
+    max_bytes, whichever it has) with a cache=<name> label."""
+
+    def collect():
+        stats = cache.stats()
+        return [
+            (metric, mtype, help_text, {"cache": name}, stats[field])
+            for field, mtype, metric, help_text in _CACHE_FIELDS
+            if isinstance(stats.get(field), (int, float))
+        ]
+
+    register_collector(collect)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: dict | tuple, extra: tuple = ()) -> str:
+    items = list(labels.items() if isinstance(labels, dict) else labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    out: list[str] = []
+    typed: set[str] = set()
+
+    def header(name: str, mtype: str, help_text: str) -> None:
+        if name not in typed:
+            typed.add(name)
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {mtype}")
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, list(v)) for k, v in _histograms.items())
+
+    for (name, labels), value in counters:
+        header(name, *_HELP.get(name, ("counter", name)))
+        out.append(f"{name}{_fmt_labels(labels)} {value}")
+
+    for (name, labels), h in histograms:
+        header(name, *_HELP.get(name, ("histogram", name)))
+        buckets = BYTES_BUCKETS if name.endswith("_bytes") else SECONDS_BUCKETS
+        cumulative = 0
+        for bound, count in zip(buckets, h):
+            cumulative += count
+            out.append(f"{name}_bucket{_fmt_labels(labels, (('le', bound),))} {cumulative}")
+        cumulative += h[len(buckets)]
+        out.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {cumulative}")
+        out.append(f"{name}_sum{_fmt_labels(labels)} {h[-1]}")
+        out.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+
+    samples = []
+    for collect in list(_collectors):
+        try:
+            samples.extend(collect())
+        except Exception as e:
+            print(f"[fp_metrics] collector failed: {e}", file=sys.stderr)
+    for name, mtype, help_text, labels, value in sorted(samples, key=lambda s: s[0]):
+        header(name, mtype, help_text)
+        out.append(f"{name}{_fmt_labels(labels)} {value}")
+
+    header("fp_metrics_enabled", "gauge", "1 when FP_METRICS is set.")
+    out.append(f"fp_metrics_enabled {int(ENABLED)}")
+    return "\n".join(out) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/fp/metrics")
+    async def _fp_metrics(request):
+        return web.Response(
+            text=render_prometheus(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
@@ -0,0 +1,98 @@
+import os
+import time
+import atexit
+import threading
+
+from . import fp_metrics
+
+
+def write_atomic(path: str, content: str | bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if isinstance(content, bytes):
+            f = open(tmp_path, "wb")
+        else:
+            f = open(tmp_path, "w", encoding="utf-8")
+        with f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class WriteBehindPersister:
+    """Background writer for small text snapshots.
+
+    submit() only records the latest content per key and returns. A single
+    daemon thread waits `delay` seconds to coalesce bursts and hands the
+    last content of every key to write(key, content), which returns False
+    when nothing changed. Pending writes are flushed at interpreter exit.
+    `after_batch` runs on the writer thread after every batch."""
+
+    def __init__(self, write, delay: float = 0.5, after_batch=None):
+        self.delay    = delay
+        self._write   = write
+        self._after_batch = after_batch
+        self._pending: dict = {}
+        self._cond    = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.submitted = 0
+        self.skipped   = 0
+        self.written   = 0
+        atexit.register(self.flush)
+
+    def submit(self, key, content: str) -> None:
+        with self._cond:
+            self.submitted += 1
+            self._pending[key] = content
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="FPWriteBehind", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self) -> None:
+        with self._cond:
+            batch, self._pending = self._pending, {}
+        self._write_batch(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let a burst of executions settle so only the last snapshot lands.
+            time.sleep(self.delay)
+            self.flush()
+
+    def _write_batch(self, batch: dict) -> None:
+        if not batch:
+            return
+        with self._io_lock:
+            self._write_each(batch)
+            if self._after_batch is not None:
+                try:
+                    self._after_batch()
+                except Exception as e:
+                    print(f"[FPFoldedPrompts] Post-write task failed: {e}")
+
+    def _write_each(self, batch: dict) -> None:
+        for key, content in batch.items():
+            t0 = time.perf_counter()
+            try:
+                changed = self._write(key, content)
+            except Exception as e:
+                print(f"[FPFoldedPrompts] Failed to save {key}: {e}")
+                fp_metrics.pf_data_write(time.perf_counter() - t0, "failed")
+                continue
+            if changed:
+                self.written += 1
+                fp_metrics.pf_data_write(time.perf_counter() - t0, "written")
+            else:
+                self.skipped += 1
+                fp_metrics.pf_data_write(None, "skipped")
@@ -0,0 +1,230 @@
+"""FP_PROMPT_DOC: a prompt passed between nodes as lines, not text.
+
+A PromptDoc is the lines of a tree (text with the weight applied, area,
+weight, enabled state and folder path) plus free text before (head) and
+after (tail) them. Its text is exactly
+
+    head + "\\n".join(render_line(text, area) for enabled lines) + tail
+
+which is what the node's string output carries. Consumers that would
+otherwise parse that string again (regions, markers) read the lines
+instead.
+
+Docs are immutable: nodes hand the same instance to every consumer and
+cache it, and with_text() builds a new doc around the same lines tuple.
+Text that doesn't come from lines, or can't be expressed as above, is
+carried as a head-only doc (from_text()).
+"""
+import hashlib
+from typing import Iterable, NamedTuple
+
+from .fp_regions import OPEN_RE, ordered_keys, region_key
+from .fp_tokens import iter_packed
+from .fp_tree import WEIGHT_BASE, effective_weight, iter_lines, line_text, apply_weight, js_truthy, render_line
+
+TYPE_NAME = "FP_PROMPT_DOC"
+
+
+class PromptLine(NamedTuple):
+    text: str                       # weight applied, as rendered
+    area: str = "ALL"
+    weight: float = WEIGHT_BASE
+    enabled: bool = True
+    folder: tuple[str, ...] = ()
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8", "surrogatepass")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class _Body:
+    """What is derived from a lines tuple, shared by every doc built on it."""
+
+    __slots__ = ("lines", "enabled", "_text", "_views")
+
+    def __init__(self, lines: tuple[PromptLine, ...]):
+        self.lines   = lines
+        self.enabled = [line for line in lines if line.enabled]
+        self._text   = None
+        self._views  = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(render_line(line.text, line.area) for line in self.enabled)
+        return self._text
+
+    def views(self) -> tuple[str, str, dict[str, list[str]] | None]:
+        """(text without markers, text without blocks, region contents);
+        region contents is None when an area isn't a valid marker, so the
+        rendered text wouldn't split back into these lines."""
+        if self._views is None:
+            contents: dict[str, list[str]] = {}
+            keys: dict[str, str | None] = {}
+            valid = True
+            for line in self.enabled:
+                area = line.area
+                if not area or area == "ALL":
+                    continue
+                key = keys.get(area, "")
+                if key == "":
+                    key = keys[area] = region_key(area) if OPEN_RE.fullmatch(f"<{area}>") else None
+                if key is None:
+                    valid = False
+                    break
+                content = line.text.strip()
+                if content:
+                    contents.setdefault(key, []).append(content)
+            self._views = (
+                "\n".join(line.text for line in self.enabled),
+                "\n".join(line.text if not line.area or line.area == "ALL" else "" for line in self.enabled),
+                {key: contents[key] for key in ordered_keys(contents)} if valid else None,
+            )
+        return self._views
+
+
+class PromptDoc:
+    __slots__ = ("head", "tail", "digest", "_body", "_text", "_size")
+
+    def __init__(
+        self,
+        lines: Iterable[PromptLine] = (),
+        head: str = "",
+        tail: str = "",
+        digest: str | None = None,
+        text: str | None = None,
+    ):
+        body = lines if isinstance(lines, _Body) else _Body(tuple(lines))
+        setattr_ = object.__setattr__
+        setattr_(self, "head", head or "")
+        setattr_(self, "tail", tail or "")
+        setattr_(self, "_body", body)
+        setattr_(self, "_text", text)
+        setattr_(self, "digest", digest or _digest("lines", body.text, self.head, self.tail))
+        setattr_(self, "_size", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PromptDoc is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("PromptDoc is immutable")
+
+    def __repr__(self) -> str:
+        return f"PromptDoc({len(self.lines)} lines, digest={self.digest[:12]})"
+
+    def __sizeof__(self) -> int:
+        # Approximate bytes held, for ByteBudgetLRU.
+        if self._size is None:
+            size = 64 + len(self.head) + len(self.tail) + len(self._text or "")
+            size += sum(len(line.text) + 64 for line in self.lines)
+            object.__setattr__(self, "_size", size)
+        return self._size
+
+    @classmethod
+    def from_text(cls, text: str) -> "PromptDoc":
+        """A doc that is just `text`, e.g. a text-mode prompt."""
+        text = text or ""
+        return cls((), head=text, digest=_digest("text", text), text=text)
+
+    @classmethod
+    def from_tree(cls, tree: dict, packed: bool = False, digest: str | None = None) -> "PromptDoc":
+        """Every line of a tree in document order, or only the enabled ones
+        in fp_tokens.iter_packed() order."""
+        lines = []
+        for item, area, path in iter_lines(tree):
+            weight = item.get("weight")
+            lines.append(PromptLine(
+                apply_weight(line_text(item), weight),
+                area,
+                effective_weight(weight),
+                js_truthy(item.get("enabled")),
+                path,
+            ))
+        if packed:
+            lines = [
+                line if isinstance(line, PromptLine) else PromptLine(line[0], line[1])
+                for line in iter_packed([line for line in lines if line.enabled])
+            ]
+        return cls(lines, digest=digest)
+
+    @property
+    def lines(self) -> tuple[PromptLine, ...]:
+        return self._body.lines
+
+    @property
+    def body(self) -> str:
+        """The rendered lines alone."""
+        return self._body.text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            object.__setattr__(self, "_text", self.head + self._body.text + self.tail)
+        return self._text
+
+    def enabled_lines(self) -> list[PromptLine]:
+        return list(self._body.enabled)
+
+    def with_text(self, head: str | None = None, tail: str | None = None, text: str | None = None) -> "PromptDoc":
+        """The same lines with another head and/or tail. `text`, when the
+        caller already has it, saves rendering."""
+        head = self.head if head is None else head or ""
+        tail = self.tail if tail is None else tail or ""
+        if head == self.head and tail == self.tail:
+            return self
+        return PromptDoc(self._body, head, tail, _digest(self.digest, head, tail), text)
+
+    def append(self, text: str) -> "PromptDoc":
+        """This doc followed by `text` on a new line, like joining the
+        non-empty parts of [doc.text, text] with a newline."""
+        if not text:
+            return self
+        return self.with_text(tail=self.tail + ("\n" if self.text else "") + text)
+
+    def prepend(self, text: str) -> "PromptDoc":
+        """`text` followed by this doc on a new line, like joining the
+        non-empty parts of [text, doc.text] with a newline."""
+        if not text:
+            return self
+        return self.with_text(head=text + ("\n" if self.text else "") + self.head)
+
+    # The RegionIndex interface, answered from the lines.
+
+    def without_markers(self) -> str:
+        return self.head + self._body.views()[0] + self.tail
+
+    def without_blocks(self) -> str:
+        return self.head + self._body.views()[1] + self.tail
+
+    def region_contents(self) -> dict[str, list[str]] | None:
+        """Stripped, non-empty block contents per region key, or None when
+        the lines can't be read back from the rendered text."""
+        contents = self._body.views()[2]
+        return None if contents is None else {key: list(parts) for key, parts in contents.items()}
+
+
+def merge_before(before_text: str, main_text: str) -> str:
+    """before_text and main_text on separate lines, without blank lines in
+    between (FPFoldedPrompts' before_text)."""
+    before_text = before_text or ""
+    main_text   = main_text   or ""
+    if before_text and main_text:
+        return before_text.rstrip("\n") + "\n" + main_text.lstrip("\n")
+    return before_text or main_text
+
+
+def doc_merge_before(before_text: str, doc: PromptDoc, text: str | None = None) -> PromptDoc:
+    """merge_before(before_text, doc.text) as a doc. Falls back to a
+    head-only doc when the merge would strip newlines from the lines."""
+    if not before_text:
+        return doc
+    if not doc.text:
+        return doc.with_text(head=before_text + doc.head, text=text)
+    if doc.text.startswith("\n"):
+        return PromptDoc.from_text(merge_before(before_text, doc.text) if text is None else text)
+    return doc.with_text(head=before_text.rstrip("\n") + "\n" + doc.head, text=text)
@@ -0,0 +1,133 @@
+"""Region model for regional prompting blocks.
+
+A block opens with <ARn> (any number) or <AR:name> and closes with </>.
+RegionIndex splits the text at every marker in one regex pass and records
+where each region's blocks lie; extraction and removal are then slices
+over that index, so the cost stays linear in the text however many
+regions it uses.
+
+Region keys are the marker without brackets: "AR12", "AR:face". Numbers
+are normalized ("<ar012>" is "AR12"), names are kept as written. The same
+keys are used as line areas in pf_json trees, so fp_tree.render_line()
+writes them back unchanged.
+"""
+import re
+
+# Positional outputs (ar_list) cover AR1..ARn up to this number; every
+# region, numbered or named, is still reported by key.
+MIN_LISTED_REGIONS = 5
+MAX_LISTED_REGIONS = 1024
+
+_AREA = r"AR(?:\d+|:[^\s<>/]+)"
+TOKEN_RE = re.compile(rf"(<{_AREA}>|</>)", re.IGNORECASE)
+OPEN_RE  = re.compile(rf"<{_AREA}>", re.IGNORECASE)
+CLOSE_RE = re.compile(r"</>")
+_KEY_RE  = re.compile(r"<?AR(?:(\d+)|:([^\s<>/]+))>?\Z", re.IGNORECASE)
+
+
+def region_key(marker: str) -> str | None:
+    """Key of an opening marker or area name ("<ar3>", "AR3", "<AR:face>"),
+    None when it isn't one."""
+    m = _KEY_RE.match(marker)
+    if m is None:
+        return None
+    if m.group(1) is not None:
+        return f"AR{int(m.group(1))}"
+    return "AR:" + m.group(2)
+
+
+def region_number(key: str) -> int | None:
+    """n for "ARn" keys, None for named regions."""
+    return int(key[2:]) if key[2:].isdigit() else None
+
+
+def ordered_keys(keys) -> list[str]:
+    """Numbered regions by number, then named regions in the given order."""
+    keys = list(keys)
+    return sorted(keys, key=lambda k: (0, region_number(k)) if region_number(k) is not None else (1, 0))
+
+
+class RegionIndex:
+    """Marker positions of one text.
+
+    parts is TOKEN_RE.split(text): text at even indexes, markers at odd
+    ones. spans maps each region key (in order of first block) to the
+    (opener, closer) part indexes of its blocks; blocks lists the same
+    pairs for every closed block. An opener inside an open block is
+    content, and a </> outside any block is text, like the lazy
+    <ARn>(.*?)</> match this replaces."""
+
+    __slots__ = ("text", "parts", "blocks", "spans")
+
+    def __init__(self, text: str):
+        self.text  = text
+        self.parts = parts = TOKEN_RE.split(text)
+        self.blocks: list[tuple[int, int]] = []
+        self.spans:  dict[str, list[tuple[int, int]]] = {}
+
+        keys: dict[str, str] = {}
+        open_idx = -1
+        for i in range(1, len(parts), 2):
+            marker = parts[i]
+            if marker == "</>":
+                if open_idx < 0:
+                    continue
+                opener = parts[open_idx]
+                key = keys.get(opener)
+                if key is None:
+                    key = keys[opener] = region_key(opener)
+                self.spans.setdefault(key, []).append((open_idx, i))
+                self.blocks.append((open_idx, i))
+                open_idx = -1
+            elif open_idx < 0:
+                open_idx = i
+
+    def contents(self, key: str) -> list[str]:
+        """Stripped, non-empty contents of the region's blocks."""
+        parts, out = self.parts, []
+        for a, b in self.spans.get(key, ()):
+            content = (parts[a + 1] if b == a + 2 else "".join(parts[a + 1:b])).strip()
+            if content:
+                out.append(content)
+        return out
+
+    def region_contents(self) -> dict[str, list[str]]:
+        """contents() of every region that has any, in ordered_keys() order."""
+        out = {}
+        for key in ordered_keys(self.spans):
+            parts = self.contents(key)
+            if parts:
+                out[key] = parts
+        return out
+
+    def without_markers(self) -> str:
+        """The text with every marker removed, blocks' content kept."""
+        out = "".join(self.parts[0::2])
+        if "</>" in out:
+            # Removing an opener can glue "<" + "/>" into a new closer; the
+            # two-step substitution handles that corner case exactly.
+            out = CLOSE_RE.sub("", OPEN_RE.sub("", self.text))
+        return out
+
+    def without_blocks(self) -> str:
+        """The text with every closed block removed, markers included."""
+        if not self.blocks:
+            return self.text
+        parts, pos, pieces = self.parts, 0, []
+        for a, b in self.blocks:
+            pieces.append("".join(parts[pos:a]))
+            pos = b + 1
+        pieces.append("".join(parts[pos:]))
+        return "".join(pieces)
+
+
+def positional(regions: dict[str, str]) -> list:
+    """regions as a list indexed by n - 1 for every "ARn", None where a
+    region is absent; at least MIN_LISTED_REGIONS long."""
+    numbers = [n for n in map(region_number, regions) if n is not None and 0 < n <= MAX_LISTED_REGIONS]
+    out = [None] * max(MIN_LISTED_REGIONS, max(numbers, default=0))
+    for key, value in regions.items():
+        n = region_number(key)
+        if n is not None and 0 < n <= MAX_LISTED_REGIONS:
+            out[n - 1] = value
+    return out
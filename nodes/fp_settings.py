@@ -0,0 +1,74 @@
+import os
+import json
+import threading
+
+PREFIX_ENV     = "FP_COMMENT_PREFIX"
+DEFAULT_PREFIX = "//"
+SETTING_ID     = "keybinding_extra.comment_prefix"
+
+_SETTINGS_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "user", "settings.json")
+)
+
+
+class CommentPrefixConfig:
+    """Comment prefix from ComfyUI's settings file, re-read only when the
+    file's mtime or size changes.
+
+    An explicit override (node input) or the FP_COMMENT_PREFIX environment
+    variable takes precedence and never touches the settings file."""
+
+    def __init__(self, settings_path: str = _SETTINGS_PATH):
+        self.settings_path = settings_path
+        self._lock   = threading.Lock()
+        self._stamp: tuple[int, int] | None = None
+        self._loaded = False
+        self._value  = DEFAULT_PREFIX
+        self.hits    = 0
+        self.misses  = 0
+
+    def get(self, override: str | None = None) -> str:
+        if override and override.strip():
+            return override.strip()
+        env_val = os.environ.get(PREFIX_ENV)
+        if env_val and env_val.strip():
+            return env_val.strip()
+
+        try:
+            st = os.stat(self.settings_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+
+        with self._lock:
+            if self._loaded and stamp == self._stamp:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            self._value  = self._read() if stamp is not None else DEFAULT_PREFIX
+            self._stamp  = stamp
+            self._loaded = True
+            return self._value
+
+    def _read(self) -> str:
+        try:
+            with open(self.settings_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            val = data.get(SETTING_ID)
+            if val and isinstance(val, str):
+                return val.strip()
+        except Exception as e:
+            print(f"[FP load_comment_prefix] error reading settings: {e}")
+        return DEFAULT_PREFIX
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "settings_path": self.settings_path,
+                "hits":          self.hits,
+                "misses":        self.misses,
+                "value":         self._value,
+            }
+
+
+COMMENT_PREFIX = CommentPrefixConfig()
@@ -0,0 +1,363 @@
+"""Content-addressed store for saved trees (pf_data).
+
+    pf_data/blobs/ab/abcdef....json[.gz]    tree JSON, named by its sha256
+    pf_data/refs/<workflow>/<node>.ref      sha256 of the node's current tree
+
+A ref is rewritten only when its tree changes, and identical trees share
+one blob, so saving after every execution costs one small file write at
+most. Workflows are told apart by the id the frontend stores in the
+workflow, so equal node ids in different workflows no longer overwrite
+each other.
+
+Several ComfyUI processes may share the directory. Every file is written
+to a temp file and renamed into place; writers hold the store lock shared
+and garbage collection holds it exclusive, so a blob can't be collected
+between being written and being referenced.
+
+gc() drops refs not updated for FP_STORE_RETENTION_DAYS days (0 keeps them
+forever), then blobs no ref points to. Blobs younger than
+FP_STORE_GC_GRACE seconds are never removed, which also covers file
+systems where locks are advisory only. maybe_gc() runs it at most once
+per FP_STORE_GC_INTERVAL seconds across all processes.
+"""
+import os
+import re
+import gzip
+import time
+import hashlib
+import threading
+
+from .fp_persist import write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BLOB_DIR  = "blobs"
+REF_DIR   = "refs"
+REF_EXT   = ".ref"
+LOCK_NAME = ".store.lock"
+GC_STAMP  = ".store.gc"
+DEFAULT_WORKFLOW = "_"
+
+_SAFE_RE   = re.compile(r"[^A-Za-z0-9._-]")
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}\Z")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def safe_name(value) -> str:
+    """A file name for a workflow or node id. Ids that needed escaping get a
+    short hash suffix so distinct ids never share a name."""
+    value = str(value if value is not None else "")
+    safe = _SAFE_RE.sub("_", value)[:96].lstrip(".")
+    if safe != value or not safe:
+        digest = hashlib.sha256(value.encode("utf-8", "surrogatepass")).hexdigest()[:12]
+        safe = f"{safe}~{digest}" if safe else digest
+    return safe
+
+
+def workflow_id(extra_pnginfo) -> str:
+    """The id the frontend stores in the workflow, or DEFAULT_WORKFLOW."""
+    try:
+        wid = extra_pnginfo["workflow"]["id"]
+    except (KeyError, TypeError):
+        return DEFAULT_WORKFLOW
+    return str(wid) if wid else DEFAULT_WORKFLOW
+
+
+class FileLock:
+    """Cross-process lock on one file: flock on POSIX (shared or exclusive),
+    msvcrt on Windows (always exclusive). Not re-entrant."""
+
+    def __init__(self, path: str, shared: bool = False, blocking: bool = True):
+        self.path     = path
+        self.shared   = shared
+        self.blocking = blocking
+        self._fd: int | None = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                op = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+                fcntl.flock(fd, op if self.blocking else op | fcntl.LOCK_NB)
+            else:
+                mode = msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK
+                while True:
+                    try:
+                        msvcrt.locking(fd, mode, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10 s; keep waiting.
+                        if not self.blocking:
+                            raise
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise TimeoutError(f"lock busy: {self.path}")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class TreeStore:
+    def __init__(
+        self,
+        root: str,
+        compress: bool | None = None,
+        retention_days: float | None = None,
+        gc_grace: float | None = None,
+        gc_interval: float | None = None,
+    ):
+        self.root = root
+        self.compress = (
+            os.environ.get("FP_STORE_COMPRESS", "").lower() in ("1", "true", "yes")
+            if compress is None else compress
+        )
+        self.retention = 86400 * (
+            _env_float("FP_STORE_RETENTION_DAYS", 90) if retention_days is None else retention_days
+        )
+        self.gc_grace    = _env_float("FP_STORE_GC_GRACE", 3600) if gc_grace is None else gc_grace
+        self.gc_interval = _env_float("FP_STORE_GC_INTERVAL", 6 * 3600) if gc_interval is None else gc_interval
+        self._lock_path  = os.path.join(root, LOCK_NAME)
+        self._gc_lock    = threading.Lock()
+
+    # ------------------------------------------------------------ blobs
+
+    def _blob_path(self, digest: str, compressed: bool) -> str:
+        name = digest + (".json.gz" if compressed else ".json")
+        return os.path.join(self.root, BLOB_DIR, digest[:2], name)
+
+    def _find_blob(self, digest: str) -> str | None:
+        for compressed in (self.compress, not self.compress):
+            path = self._blob_path(digest, compressed)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put_blob(self, content: str) -> str:
+        """Store `content` (once) and return its digest. Call with the store
+        lock held shared, or a concurrent gc() may remove it again."""
+        data = content.encode("utf-8", "surrogatepass")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._find_blob(digest)
+        if path is not None:
+            # Refresh the mtime: the gc grace period counts from last use.
+            try:
+                os.utime(path)
+                return digest
+            except OSError:
+                pass
+        path = self._blob_path(digest, self.compress)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, gzip.compress(data, mtime=0) if self.compress else data)
+        return digest
+
+    def get_blob(self, digest: str) -> str | None:
+        if not _DIGEST_RE.match(digest or ""):
+            return None
+        path = self._find_blob(digest)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if path.endswith(".gz"):
+            data = gzip.decompress(data)
+        return data.decode("utf-8", "surrogatepass")
+
+    # ------------------------------------------------------------- refs
+
+    def _ref_path(self, workflow: str, node: str) -> str:
+        return os.path.join(self.root, REF_DIR, safe_name(workflow), safe_name(node) + REF_EXT)
+
+    def _read_ref_file(self, path: str) -> str | None:
+        try:
+            with open(path, "r", encoding="ascii") as f:
+                digest = f.read().strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+        return digest if _DIGEST_RE.match(digest) else None
+
+    def put(self, workflow: str, node: str, content: str) -> bool:
+        """Point workflow/node at `content`. Returns False when the ref
+        already pointed there (only its timestamp is refreshed)."""
+        path = self._ref_path(workflow, node)
+        with FileLock(self._lock_path, shared=True):
+            digest = self.put_blob(content)
+            if self._read_ref_file(path) == digest:
+                os.utime(path)
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, digest + "\n")
+            return True
+
+    def get(self, workflow: str, node: str) -> str | None:
+        digest = self._read_ref_file(self._ref_path(workflow, node))
+        return self.get_blob(digest) if digest else None
+
+    def iter_refs(self):
+        """Yield (name, mtime_ns, size, path) for every ref, name being
+        "<workflow>/<node>" in file-name form."""
+        refs_dir = os.path.join(self.root, REF_DIR)
+        try:
+            workflows = os.scandir(refs_dir)
+        except FileNotFoundError:
+            return
+        with workflows:
+            for wf in workflows:
+                if not wf.is_dir():
+                    continue
+                try:
+                    entries = os.scandir(wf.path)
+                except OSError:
+                    continue
+                with entries:
+                    for entry in entries:
+                        if entry.name.endswith(REF_EXT) and entry.is_file():
+                            st = entry.stat()
+                            name = f"{wf.name}/{entry.name[:-len(REF_EXT)]}"
+                            yield name, st.st_mtime_ns, st.st_size, entry.path
+
+    def read_ref(self, name: str) -> str | None:
+        """Tree of a ref by the name iter_refs() reported."""
+        workflow, _, node = name.partition("/")
+        path = os.path.join(self.root, REF_DIR, workflow, node + REF_EXT)
+        digest = self._read_ref_file(path)
+        return self.get_blob(digest) if digest else None
+
+    # --------------------------------------------------------------- gc
+
+    def gc(self, now: float | None = None, blocking: bool = True) -> dict | None:
+        """Expire old refs, then remove unreferenced blobs. Returns counts,
+        or None when another process holds the lock and blocking is False."""
+        now = time.time() if now is None else now
+        counts = {"refs_expired": 0, "blobs_removed": 0, "bytes_freed": 0, "refs": 0, "blobs": 0}
+        lock = FileLock(self._lock_path, blocking=blocking)
+        if not lock.acquire():
+            return None
+        try:
+            live: set[str] = set()
+            for _, mtime_ns, _, path in list(self.iter_refs()):
+                if self.retention > 0 and mtime_ns / 1e9 < now - self.retention:
+                    try:
+                        os.remove(path)
+                        counts["refs_expired"] += 1
+                    except OSError:
+                        pass
+                    continue
+                digest = self._read_ref_file(path)
+                if digest:
+                    live.add(digest)
+                    counts["refs"] += 1
+            self._remove_empty_dirs(os.path.join(self.root, REF_DIR))
+
+            blobs_dir = os.path.join(self.root, BLOB_DIR)
+            for shard in _listdir(blobs_dir):
+                shard_path = os.path.join(blobs_dir, shard)
+                for name in _listdir(shard_path):
+                    path = os.path.join(shard_path, name)
+                    if name.split(".", 1)[0] in live:
+                        counts["blobs"] += 1
+                        continue
+                    try:
+                        st = os.stat(path)
+                        if st.st_mtime < now - self.gc_grace:
+                            os.remove(path)
+                            counts["blobs_removed"] += 1
+                            counts["bytes_freed"] += st.st_size
+                        else:
+                            counts["blobs"] += 1
+                    except OSError:
+                        pass
+            self._remove_empty_dirs(blobs_dir)
+            write_atomic(os.path.join(self.root, GC_STAMP), f"{now}\n")
+        finally:
+            lock.release()
+        return counts
+
+    def maybe_gc(self) -> dict | None:
+        """gc() if no process ran one in the last gc_interval seconds."""
+        if self.gc_interval <= 0 or not self._gc_lock.acquire(blocking=False):
+            return None
+        try:
+            try:
+                last = os.path.getmtime(os.path.join(self.root, GC_STAMP))
+            except OSError:
+                last = 0.0
+            if time.time() - last < self.gc_interval:
+                return None
+            counts = self.gc(blocking=False)
+            if counts is not None and (counts["refs_expired"] or counts["blobs_removed"]):
+                print(
+                    f"[fp_store] gc: {counts['refs_expired']} refs expired, "
+                    f"{counts['blobs_removed']} blobs removed ({counts['bytes_freed']} bytes)"
+                )
+            return counts
+        finally:
+            self._gc_lock.release()
+
+    @staticmethod
+    def _remove_empty_dirs(parent: str) -> None:
+        for name in _listdir(parent):
+            try:
+                os.rmdir(os.path.join(parent, name))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        refs = sum(1 for _ in self.iter_refs())
+        blobs, size = 0, 0
+        blobs_dir = os.path.join(self.root, BLOB_DIR)
+        for shard in _listdir(blobs_dir):
+            for name in _listdir(os.path.join(blobs_dir, shard)):
+                try:
+                    size += os.path.getsize(os.path.join(blobs_dir, shard, name))
+                    blobs += 1
+                except OSError:
+                    pass
+        return {
+            "root":           self.root,
+            "compress":       self.compress,
+            "retention_days": self.retention / 86400,
+            "refs":           refs,
+            "blobs":          blobs,
+            "bytes":          size,
+        }
+
+
+def _listdir(path: str) -> list[str]:
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
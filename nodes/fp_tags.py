@@ -0,0 +1,136 @@
+"""Tag-level canonicalization: drop repeated comma-separated tags before
+the text reaches the encoder.
+
+- Tags are deduplicated per region (text outside any region block, and
+  each region separately, see fp_regions), keeping the first occurrence's
+  position.
+- Repeats of a tag multiply its weight; "(tag:1.2)" is parsed like the
+  keybinding parsePowered() helper and merged tags are written back the way
+  makePowered() writes them ("(tag: 1.32)"). A merged weight of 1 drops
+  the parentheses.
+- Whitespace inside a tag is collapsed; tags are joined with ", ".
+- Comment lines, BREAK / AND separators, blank lines and the <ARn> / </>
+  markers are kept as they are. Lines left without tags are removed.
+
+Single pass over the text; one dict lookup per tag.
+"""
+import re
+
+from .fp_regions import TOKEN_RE, region_key
+from .fp_tree import js_round2
+
+# Same shape as POWERED_RE in js/keybinding_extra.js.
+_POWERED_RE = re.compile(r"\A\(\s*(.+?)\s*:\s*(\d+(?:\.\d+)?)\s*\)\Z")
+_WS_RE = re.compile(r"\s+")
+_KEEP_ALL = frozenset(("BREAK", "AND"))
+_OPEN, _CLOSE = "([{<", ")]}>"
+_NESTING_RE = re.compile(r"[\\(\[{<]")
+
+
+def parse_powered(tag: str) -> tuple[str, float] | None:
+    m = _POWERED_RE.match(tag.strip())
+    if m is None:
+        return None
+    return m.group(1).strip(), float(m.group(2))
+
+
+def make_powered(inner: str, value: float) -> str:
+    text = f"{js_round2(value):.2f}".rstrip("0").rstrip(".")
+    return f"({inner}: {text})"
+
+
+def split_tags(line: str) -> list[str]:
+    """Split on commas outside (), [], {} and <>; backslash-escaped
+    brackets ("\\(") don't nest."""
+    if _NESTING_RE.search(line) is None:
+        return line.split(",")
+    tags, depth, start, escaped = [], 0, 0, False
+    for i, ch in enumerate(line):
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch in _OPEN:
+            depth += 1
+        elif ch in _CLOSE:
+            depth = max(0, depth - 1)
+        elif ch == "," and depth == 0:
+            tags.append(line[start:i])
+            start = i + 1
+    tags.append(line[start:])
+    return tags
+
+
+class _Slot:
+    __slots__ = ("text", "inner", "weight", "merged")
+
+    def __init__(self, text: str, inner: str, weight: float):
+        self.text   = text
+        self.inner  = inner
+        self.weight = weight
+        self.merged = False
+
+    def render(self) -> str:
+        if not self.merged:
+            return self.text
+        if abs(js_round2(self.weight) - 1.0) < 1e-9:
+            return self.inner
+        return make_powered(self.inner, self.weight)
+
+
+def canonicalize_tags(text: str, comment_prefix: str = "//") -> str:
+    if not text:
+        return text or ""
+
+    seen: dict[str | None, dict[str, _Slot]] = {}
+    region: str | None = None
+    # Per segment: kept lines, as strings or (slots, trailing_comma) for tag
+    # lines; slots are rendered at the end, once all repeats have merged in.
+    segments: list = []
+
+    for segment in TOKEN_RE.split(text):
+        if TOKEN_RE.fullmatch(segment):
+            region = None if segment == "</>" else region_key(segment)
+            segments.append(segment)
+            continue
+        region_seen = seen.setdefault(region, {})
+        kept: list = []
+        for line in segment.split("\n"):
+            stripped = line.strip()
+            if not stripped or (comment_prefix and stripped.startswith(comment_prefix)):
+                kept.append(line)
+                continue
+
+            slots: list[_Slot] = []
+            for raw in split_tags(line):
+                tag = _WS_RE.sub(" ", raw).strip()
+                if not tag:
+                    continue
+                if tag in _KEEP_ALL:
+                    slots.append(_Slot(tag, tag, 1.0))
+                    continue
+                powered = parse_powered(tag)
+                inner, weight = powered if powered else (tag, 1.0)
+                key = inner.casefold()
+                slot = region_seen.get(key)
+                if slot is None:
+                    slot = region_seen[key] = _Slot(tag, inner, weight)
+                    slots.append(slot)
+                else:
+                    slot.weight *= weight
+                    slot.merged = True
+            if slots:
+                kept.append((slots, stripped.endswith(",")))
+        segments.append(kept)
+
+    out = []
+    for kept in segments:
+        if isinstance(kept, str):
+            out.append(kept)
+            continue
+        out.append("\n".join(
+            line if isinstance(line, str)
+            else ", ".join(s.render() for s in line[0]) + (", " if line[1] else "")
+            for line in kept
+        ))
+    return "".join(out)
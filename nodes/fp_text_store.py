@@ -0,0 +1,133 @@
+"""Content-addressed store for tab texts shared between FP Tabbed Text Area
+and its FP Tab readers.
+
+Readers carry a short reference ("fpt:" + 32 hex chars of the SHA-256 of
+the UTF-8 text, computed identically in js/fp_text_ref.js) instead of a
+copy of the text. References are resolved against the interned copies
+here; on a miss the texts stored in the workflow's graph.extra (shipped
+with every prompt as extra_pnginfo) are interned and searched. Widget
+values that are not references are plain text from older workflows.
+"""
+import os
+import re
+import hashlib
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    web = None
+    PromptServer = None
+
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+
+REF_PREFIX   = "fpt:"
+DIGEST_CHARS = 32
+SOURCE_STORE_KEY = "fp_tabbed_text_area"
+
+_REF_RE = re.compile(r"\Afpt:[0-9a-f]{%d}\Z" % DIGEST_CHARS)
+
+
+def _utf8(text: str) -> bytes:
+    try:
+        return text.encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates: encode like the browser's TextEncoder (U+FFFD).
+        return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace").encode("utf-8")
+
+
+def make_ref(text: str) -> str:
+    return REF_PREFIX + hashlib.sha256(_utf8(text)).hexdigest()[:DIGEST_CHARS]
+
+
+def is_ref(value) -> bool:
+    return isinstance(value, str) and _REF_RE.match(value) is not None
+
+
+# Empty tabs aren't always stored in graph.extra; their ref needs no lookup.
+_EMPTY_REF = make_ref("")
+
+
+def _workflow_texts(extra_pnginfo) -> list[str]:
+    try:
+        stores = extra_pnginfo["workflow"]["extra"][SOURCE_STORE_KEY]
+    except (KeyError, TypeError):
+        return []
+    texts = []
+    if isinstance(stores, dict):
+        for store in stores.values():
+            tab_texts = store.get("texts") if isinstance(store, dict) else None
+            if isinstance(tab_texts, dict):
+                texts.extend(t for t in tab_texts.values() if isinstance(t, str))
+    return texts
+
+
+class TextStore:
+    """Interned texts keyed by reference, bounded by a byte budget.
+
+    Evicting an entry is harmless: the owner node re-interns its tabs on
+    every run and the workflow copy is always available as a fallback."""
+
+    def __init__(self, max_bytes: int):
+        self._texts = ByteBudgetLRU(max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def intern(self, text: str) -> str:
+        """Store `text` (if not already present) and return its reference."""
+        ref = make_ref(text)
+        if ref not in self._texts:
+            self._texts.put(ref, text)
+        return ref
+
+    def get(self, ref: str) -> str | None:
+        return self._texts.get(ref)
+
+    def intern_workflow(self, extra_pnginfo) -> int:
+        texts = _workflow_texts(extra_pnginfo)
+        for text in texts:
+            self.intern(text)
+        return len(texts)
+
+    def resolve(self, value: str | None, extra_pnginfo=None) -> str:
+        """Text for a widget value: references are looked up, anything else
+        is returned as is. Raises ValueError for unknown references."""
+        if not is_ref(value):
+            return value or ""
+        if value == _EMPTY_REF:
+            return ""
+        text = self.get(value)
+        if text is None and self.intern_workflow(extra_pnginfo):
+            text = self.get(value)
+        if text is None:
+            raise ValueError(
+                f"Tab text {value} is not in the text store; "
+                "queue the workflow from the UI so the source tab is sent along."
+            )
+        return text
+
+    def stats(self) -> dict:
+        return self._texts.stats()
+
+
+STORE = TextStore(int(os.environ.get("FP_TEXT_STORE_BYTES", 64 * 1024 * 1024)))
+fp_metrics.register_cache("text_store", STORE)
+
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.post("/fp/text_store")
+    async def _fp_text_store_put(request):
+        try:
+            body = await request.json()
+            texts = body["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("'texts' must be a list of strings")
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"refs": [STORE.intern(t) for t in texts]})
+
+    @PromptServer.instance.routes.get("/fp/text_store/stats")
+    async def _fp_text_store_stats(request):
+        return web.json_response(STORE.stats())
@@ -0,0 +1,245 @@
+"""CLIP token counting and chunk-aware line packing.
+
+Counts use the CLIP BPE tokenizer from ComfyUI's own comfy/sd1_tokenizer
+directory (or FP_CLIP_TOKENIZER_PATH), loaded through transformers with
+local files only. When either is missing, e.g. outside ComfyUI, counts
+fall back to an approximation of CLIP's pre-tokenizer and every result is
+flagged "approximate".
+
+Weight syntax is stripped before counting, as ComfyUI's prompt parser
+does: "(tag:1.2)" costs the tokens of "tag". A CLIP chunk holds 75 prompt
+tokens (77 minus start/end). BREAK separator lines cost nothing: encoders
+that honour them drop them, and they only ever stand between chunks.
+"""
+import os
+import re
+import json
+import heapq
+import threading
+from typing import Iterable, Iterator
+
+from . import fp_metrics
+from .fp_cache import ByteBudgetLRU
+from .fp_regions import TOKEN_RE, region_key
+from .fp_tree import iter_enabled_lines, render_line
+
+CHUNK_TOKENS = 75
+BREAK = "BREAK"
+TOKENIZER_PATH_ENV = "FP_CLIP_TOKENIZER_PATH"
+
+_WEIGHT_RE    = re.compile(r":\s*[0-9]*\.?[0-9]+\s*\)")
+_PAREN_RE     = re.compile(r"(?<!\\)[()]")
+# Letters, single digits, and runs of anything else (CLIP's pre-tokenizer).
+_APPROX_RE    = re.compile(r"'(?:s|t|re|ve|m|ll|d)|[^\W\d_]+|\d|(?:[^\s\w]|_)+", re.IGNORECASE)
+_APPROX_CHARS = 7
+
+_lock = threading.Lock()
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def _tokenizer_path() -> str | None:
+    path = os.environ.get(TOKENIZER_PATH_ENV)
+    if path:
+        return path
+    try:
+        import comfy.sd1_clip
+    except ImportError:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(comfy.sd1_clip.__file__)), "sd1_tokenizer")
+
+
+def get_tokenizer():
+    """The CLIP tokenizer, or None when it can't be loaded locally."""
+    global _tokenizer, _tokenizer_loaded
+    with _lock:
+        if _tokenizer_loaded:
+            return _tokenizer
+        _tokenizer_loaded = True
+        path = _tokenizer_path()
+        try:
+            from transformers import CLIPTokenizer
+            if path is None or not os.path.isdir(path):
+                raise FileNotFoundError(f"no CLIP tokenizer directory ({path})")
+            _tokenizer = CLIPTokenizer.from_pretrained(path, local_files_only=True)
+        except Exception as e:
+            print(f"[fp_tokens] CLIP tokenizer unavailable, token counts are approximate: {e}")
+            _tokenizer = None
+        return _tokenizer
+
+
+def plain_text(text: str) -> str:
+    """Text as the encoder sees it: weights and unescaped parens removed."""
+    text = _WEIGHT_RE.sub(")", text)
+    text = _PAREN_RE.sub(" ", text)
+    return text.replace("\\(", "(").replace("\\)", ")")
+
+
+def _approx_count(text: str) -> int:
+    count = 0
+    for piece in _APPROX_RE.findall(text):
+        count += max(1, -(-len(piece) // _APPROX_CHARS)) if piece[0].isalpha() else 1
+    return count
+
+
+class TokenCounter:
+    """Per-line token counts, cached by line text."""
+
+    def __init__(self, max_bytes: int):
+        # The value repeats the key so the byte budget accounts for it.
+        self._cache = ByteBudgetLRU(max_bytes)
+
+    @property
+    def approximate(self) -> bool:
+        return get_tokenizer() is None
+
+    def count(self, line: str) -> int:
+        entry = self._cache.get(line)
+        if entry is not None:
+            return entry[0]
+        text = plain_text(line).strip()
+        if not text or text == BREAK:
+            n = 0
+        else:
+            tokenizer = get_tokenizer()
+            if tokenizer is None:
+                n = _approx_count(text)
+            else:
+                n = len(tokenizer(text, add_special_tokens=False)["input_ids"])
+        self._cache.put(line, (n, line))
+        return n
+
+    def count_lines(self, text: str) -> int:
+        return sum(self.count(line) for line in text.split("\n"))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+COUNTER = TokenCounter(int(os.environ.get("FP_TOKEN_CACHE_BYTES", 16 * 1024 * 1024)))
+fp_metrics.register_cache("token_counts", COUNTER)
+
+
+def chunks_for(tokens: int) -> int:
+    return -(-tokens // CHUNK_TOKENS)
+
+
+def _region_entry(tokens: int) -> dict:
+    return {"tokens": tokens, "chunks": chunks_for(tokens)}
+
+
+def text_token_stats(text: str, comment_prefix: str = "//") -> dict:
+    """Token totals of a prompt text, per region (ALL, AR1, ...).
+    Comment and BREAK lines are skipped."""
+    regions: dict[str, int] = {}
+    region = "ALL"
+    for segment in TOKEN_RE.split(text or ""):
+        if TOKEN_RE.fullmatch(segment):
+            region = "ALL" if segment == "</>" else region_key(segment)
+            continue
+        for line in segment.split("\n"):
+            if comment_prefix and line.lstrip().startswith(comment_prefix):
+                continue
+            n = COUNTER.count(line)
+            if n:
+                regions[region] = regions.get(region, 0) + n
+    return _stats(regions)
+
+
+def region_token_stats(main_text: str, region_texts: dict[str, str | None]) -> dict:
+    """Token totals for already split text (main prompt plus region texts)."""
+    regions = {"ALL": COUNTER.count_lines(main_text or "")}
+    for name, text in region_texts.items():
+        if text:
+            regions[name] = COUNTER.count_lines(text)
+    return _stats({k: v for k, v in regions.items() if v})
+
+
+def tree_token_stats(tree: dict) -> dict:
+    """Token totals of the enabled lines of a tree, per region and per
+    folder path (folder totals include sub-folders)."""
+    regions: dict[str, int] = {}
+    folders: dict[str, int] = {}
+    for text, area, path in iter_enabled_lines(tree):
+        n = COUNTER.count(text)
+        regions[area] = regions.get(area, 0) + n
+        for depth in range(1, len(path) + 1):
+            key = " / ".join(path[:depth])
+            folders[key] = folders.get(key, 0) + n
+    stats = _stats(regions)
+    stats["folders"] = folders
+    return stats
+
+
+def _stats(regions: dict[str, int]) -> dict:
+    total = sum(regions.values())
+    return {
+        "approximate":  COUNTER.approximate,
+        "chunk_tokens": CHUNK_TOKENS,
+        "tokens":       total,
+        "chunks":       chunks_for(total),
+        "regions":      {name: _region_entry(n) for name, n in regions.items()},
+    }
+
+
+def dump_stats(stats: dict) -> str:
+    return json.dumps(stats, ensure_ascii=False, separators=(",", ":"))
+
+
+def pack_lines(token_counts: list[int], capacity: int = CHUNK_TOKENS) -> list[list[int]]:
+    """First-fit decreasing: group line indexes into as few chunks of
+    `capacity` tokens as possible. Lines longer than a chunk get a group of
+    their own. Groups come out in order of their first line, and lines in
+    a group keep their original order."""
+    bins: list[list[int]] = []
+    # open_bins[free] is a min-heap of bin numbers with exactly `free` tokens
+    # left, so "first bin that fits" is the smallest head over free >= n.
+    open_bins: list[list[int]] = [[] for _ in range(capacity + 1)]
+    for i in sorted(range(len(token_counts)), key=lambda i: -token_counts[i]):
+        n = max(0, token_counts[i])
+        best_free, best_bin = -1, len(bins)
+        for free in range(min(n, capacity + 1), capacity + 1):
+            heap = open_bins[free]
+            if heap and heap[0] < best_bin:
+                best_free, best_bin = free, heap[0]
+        if best_free < 0:
+            bins.append([i])
+            if n <= capacity:
+                heapq.heappush(open_bins[capacity - n], best_bin)
+        else:
+            heapq.heappop(open_bins[best_free])
+            bins[best_bin].append(i)
+            heapq.heappush(open_bins[best_free - n], best_bin)
+    for group in bins:
+        group.sort()
+    bins.sort(key=lambda group: group[0])
+    return bins
+
+
+def iter_packed(lines: Iterable[tuple], separator: str = BREAK) -> Iterator[tuple]:
+    """(text, area, ...) items with the ALL region packed into the fewest
+    75-token chunks and a (separator, "ALL") item between chunks (for
+    BREAK-aware encoders). Region lines are encoded on their own, so they
+    keep their order and get no separators. Regions appear in order of
+    first use."""
+    by_area: dict[str, list[tuple]] = {}
+    for line in lines:
+        by_area.setdefault(line[1], []).append(line)
+
+    for area, area_lines in by_area.items():
+        if area != "ALL":
+            yield from area_lines
+            continue
+        groups = pack_lines([COUNTER.count(line[0]) for line in area_lines])
+        for g, group in enumerate(groups):
+            if g and separator:
+                yield separator, "ALL"
+            for i in group:
+                yield area_lines[i]
+
+
+def render_packed(tree: dict, separator: str = BREAK) -> str:
+    """Enabled lines of a tree packed by iter_packed()."""
+    return "\n".join(
+        render_line(line[0], line[1]) for line in iter_packed(iter_enabled_lines(tree), separator)
+    )
@@ -0,0 +1,719 @@
+"""Headless FP Folded Prompts tree compiler.
+
+Renders pf_json trees exactly like the browser widget does (weights, areas,
+enabled state) without any ComfyUI imports, so it can also run as a script:
+
+    python nodes/fp_tree.py pf_data/ other_tree.json --out-dir rendered/
+    python nodes/fp_tree.py --from-text library.txt --out-dir trees/
+
+The second form builds trees from Edit-mode [Folder/Sub] text, like the
+widget's parser (see FolderTextParser).
+"""
+import os
+import re
+import sys
+import json
+import math
+import functools
+import base64
+import argparse
+from typing import Any, Callable, Iterable, Iterator
+
+WEIGHT_BASE = 1.0
+WEIGHT_MIN  = 0.10
+_EPS        = 1e-6
+
+# JavaScript's \s and "." differ from Python's; spell them out for parity.
+_JS_WS      = "[\\t\\n\\x0b\\x0c\\r \\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000\\ufeff]"
+_JS_DOT     = "[^\\n\\r\\u2028\\u2029]"
+
+_WEIGHTED_RE    = re.compile(rf"\A\((.*):([0-9]+(?:\.[0-9]+)?)\){_JS_WS}*(,{_JS_WS}*)?\Z", re.DOTALL)
+_TRAIL_COMMA_RE = re.compile(rf"{_JS_WS}*,{_JS_WS}*\Z")
+_SPLIT_TAIL_RE  = re.compile(rf"\A({_JS_DOT}*?)(,{_JS_WS}*)\Z")
+
+
+def js_round2(value: float) -> float:
+    """Math.round(value * 100) / 100"""
+    x = value * 100
+    r = math.floor(x)
+    if x - r >= 0.5:
+        r += 1
+    return r / 100
+
+
+def js_truthy(value: Any) -> bool:
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    if isinstance(value, (list, dict)):
+        return True
+    return bool(value)
+
+
+def _is_js_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def detect_line_weight(text: Any) -> float:
+    """Python port of detectLineWeightFromText() in js/FPFoldedPrompts.js."""
+    if text is None:
+        return WEIGHT_BASE
+    m = _WEIGHTED_RE.match(str(text))
+    if m:
+        num = float(m.group(2))
+        if math.isfinite(num) and num >= WEIGHT_MIN:
+            return js_round2(num)
+    return WEIGHT_BASE
+
+
+def effective_weight(weight: Any) -> float:
+    """A line's weight field as applyWeightToLineText() uses it."""
+    w = float(weight) if _is_js_number(weight) else WEIGHT_BASE
+    if w < WEIGHT_MIN:
+        w = WEIGHT_MIN
+    return js_round2(w)
+
+
+def apply_weight(raw_text: Any, weight: Any) -> str:
+    """Python port of applyWeightToLineText() in js/FPFoldedPrompts.js."""
+    text = "" if raw_text is None else str(raw_text)
+    w = effective_weight(weight)
+    w_str = f"{w:.2f}"
+
+    m = _WEIGHTED_RE.match(text)
+    if m:
+        inner   = m.group(1)
+        old_num = float(m.group(2))
+        tail    = m.group(3) or ""
+        if abs(w - WEIGHT_BASE) <= _EPS:
+            return _TRAIL_COMMA_RE.sub("", inner, count=1) + ", "
+        if math.isfinite(old_num) and abs(old_num - w) < _EPS:
+            return text
+        return f"({inner}:{w_str}){tail}"
+
+    if abs(w - WEIGHT_BASE) <= _EPS:
+        return text
+
+    tail = ""
+    m2 = _SPLIT_TAIL_RE.match(text)
+    if m2:
+        text, tail = m2.group(1), m2.group(2)
+    return f"({text}:{w_str}){tail}"
+
+
+def line_text(item: dict) -> str:
+    """A line's raw text, coerced the way the widget does (item.text || "")."""
+    text = item.get("text")
+    if isinstance(text, str):
+        return text
+    return str(text) if js_truthy(text) else ""
+
+
+def walk_lines(tree: dict) -> Iterator[tuple[dict, str, tuple[str, ...], tuple[dict, ...]]]:
+    """Yield (line_item, effective_area, folder_path, folders) for every
+    line, enabled or not, in document order; folders are the enclosing
+    folder items, outermost first. A folder's non-ALL area overrides its
+    children."""
+
+    # An explicit stack: every line is yielded from this one frame, however
+    # deep its folder.
+    stack = [(iter(tree.get("items") or []), "ALL", (), ())]
+    while stack:
+        items, parent_area, path, folders = stack[-1]
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            itype = item.get("type")
+            area  = item.get("area", "ALL") or "ALL"
+            current_area = parent_area if parent_area != "ALL" else area
+
+            if itype == "folder":
+                title = item.get("title")
+                stack.append((
+                    iter(item.get("children") or []),
+                    current_area,
+                    path + (str(title or ""),),
+                    folders + (item,),
+                ))
+                break
+            elif itype == "line":
+                yield item, current_area, path, folders
+        else:
+            stack.pop()
+
+
+def iter_lines(tree: dict) -> Iterator[tuple[dict, str, tuple[str, ...]]]:
+    """Yield (line_item, effective_area, folder_path) for every line, enabled
+    or not, in document order (see walk_lines)."""
+    for item, area, path, _ in walk_lines(tree):
+        yield item, area, path
+
+
+def iter_enabled_lines(tree: dict) -> Iterator[tuple[str, str, tuple[str, ...]]]:
+    """Yield (weighted_text, effective_area, folder_path) for enabled lines."""
+    for item, area, path in iter_lines(tree):
+        if js_truthy(item.get("enabled")):
+            yield apply_weight(line_text(item), item.get("weight")), area, path
+
+
+def render_line(text: str, area: str) -> str:
+    if area and area != "ALL":
+        return f"<{area}>{text}</>"
+    return text
+
+
+def render_tree(tree: dict) -> str:
+    return "\n".join(render_line(text, area) for text, area, _ in iter_enabled_lines(tree))
+
+
+# ------------------- text -> tree -------------------
+#
+# Port of parseFolderTextToTree() in js/FPFoldedPrompts.js, fed one line at a
+# time so multi-megabyte libraries never have to be held as one string. The
+# result serializes to the same JSON as JSON.stringify() of the widget's tree.
+
+_JS_WS_CHARS   = "\t\n\x0b\x0c\r \xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+_JS_AREA_TAG   = rf"AR(?:[0-9]+|:[^<>/{_JS_WS[1:-1]}]+)"
+_FOLDER_RE     = re.compile(rf"\A\[({_JS_DOT}+)\]\Z")
+_COMMENT_RE    = re.compile(rf"\A//{_JS_WS}*({_JS_DOT}*)\Z")
+_SINGLE_AREA_RE = re.compile(rf"\A<({_JS_AREA_TAG})>{_JS_WS}*(.*?){_JS_WS}*</>{_JS_WS}*\Z", re.IGNORECASE | re.DOTALL)
+_OPEN_AREA_RE  = re.compile(rf"\A<({_JS_AREA_TAG})>{_JS_WS}*({_JS_DOT}*)\Z", re.IGNORECASE)
+READ_CHUNK_CHARS = 1 << 20
+_AREA_KEY_RE   = re.compile(r"\AAR(?:([0-9]+)|:(.+))\Z", re.IGNORECASE | re.DOTALL)
+
+
+def js_number_string(value: float) -> str:
+    """String(value) for a finite or infinite double, as JavaScript prints it."""
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value == int(value) and abs(value) < 1e21:
+        text = repr(float(value))
+        if "e" not in text:
+            return str(int(value))
+        # repr() switches to exponent form at 1e16; JavaScript pads with zeros.
+        mantissa, exp = text.split("e")
+        digits = mantissa.replace(".", "").replace("-", "")
+        int_digits = int(exp) + 1
+        return ("-" if value < 0 else "") + digits + "0" * (int_digits - len(digits))
+    return repr(float(value))
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_area(tag: str) -> str:
+    """Port of normalizeArea(): "<ar012>" -> "AR12", "ar:face" -> "AR:face"."""
+    m = _AREA_KEY_RE.match(tag)
+    if m is None:
+        return "ALL"
+    if m.group(1) is None:
+        return "AR:" + m.group(2)
+    try:
+        number = float(int(m.group(1)))
+    except OverflowError:
+        number = math.inf
+    return "AR" + js_number_string(number)
+
+
+class FolderTextParser:
+    """Incremental parseFolderTextToTree(): feed() lines (without their
+    newline), then finish() returns the tree. feed_text() accepts arbitrary
+    chunks of a text and splits them into lines itself."""
+
+    def __init__(self):
+        self.root: dict = {"items": []}
+        self.root_folder = {
+            "type":     "folder",
+            "id":       "folder-ROOT",
+            "title":    "ROOT",
+            "expanded": True,
+            "area":     "ALL",
+            "children": [],
+            "_isRootFolder": True,
+        }
+        self.lines = 0
+        self._current: dict | None = None
+        self._line_counter = 1
+        # First folder of each title per children list, for ensure_folder().
+        self._folders: dict[int, dict[str, dict]] = {}
+        self._in_block = False
+        self._block_area = "ALL"
+        self._block_enabled = True
+        self._block_lines: list[str] = []
+        self._pending: list[str] = []
+
+    def _target(self) -> list:
+        if self._current is not None and self._current is not self.root_folder:
+            return self._current["children"]
+        return self.root_folder["children"]
+
+    def _add_line(self, enabled: bool, area: str, text: str) -> None:
+        self._target().append({
+            "type":    "line",
+            "id":      f"line-{self._line_counter}",
+            "enabled": enabled,
+            "area":    area,
+            "text":    text,
+            "weight":  _js_number_value(detect_line_weight(text)) if text[:1] == "(" else 1,
+        })
+        self._line_counter += 1
+
+    def _ensure_folder(self, path_parts: list[str]) -> dict | None:
+        current_list = self.root["items"]
+        folder = None
+        id_path = []
+        for raw_part in path_parts:
+            part = raw_part.strip(_JS_WS_CHARS).rstrip("/")
+            if not part:
+                continue
+            id_path.append(part)
+            index = self._folders.setdefault(id(current_list), {})
+            folder = index.get(part)
+            if folder is None:
+                folder = {
+                    "type":     "folder",
+                    "id":       "folder-" + "_".join(id_path),
+                    "title":    part,
+                    "expanded": False,
+                    "area":     "ALL",
+                    "children": [],
+                }
+                current_list.append(folder)
+                index[part] = folder
+            current_list = folder["children"]
+        return folder
+
+    def _flush_block(self) -> None:
+        text = "\n".join(self._block_lines).strip(_JS_WS_CHARS)
+        if text:
+            self._add_line(self._block_enabled, self._block_area, text)
+        self._in_block = False
+        self._block_area = "ALL"
+        self._block_enabled = True
+        self._block_lines = []
+
+    def feed(self, raw_line: str) -> None:
+        self.lines += 1
+        line = raw_line.rstrip(_JS_WS_CHARS)
+
+        if self._in_block:
+            close_idx = line.find("</>")
+            if close_idx != -1:
+                before = line[:close_idx].strip(_JS_WS_CHARS)
+                if before:
+                    self._block_lines.append(before)
+                self._flush_block()
+            elif line.strip(_JS_WS_CHARS):
+                self._block_lines.append(line.strip(_JS_WS_CHARS))
+            return
+
+        if not line.strip(_JS_WS_CHARS):
+            return
+
+        # Every pattern below is anchored on a literal first character.
+        m = _FOLDER_RE.match(line) if line[0] == "[" else None
+        if m:
+            parts = [p.strip(_JS_WS_CHARS) for p in m.group(1).strip(_JS_WS_CHARS).split("/")]
+            parts = [p for p in parts if p]
+            if len(parts) == 1 and parts[0].lower() == "root":
+                self._current = self.root_folder
+            else:
+                self._current = self._ensure_folder(parts)
+            return
+
+        enabled = True
+        text = line
+        if text[:2] == "//":
+            m = _COMMENT_RE.match(text)
+            if m:
+                enabled = False
+                text = m.group(1)
+
+        if text[:1] != "<":
+            self._add_line(enabled, "ALL", text)
+            return
+
+        m = _SINGLE_AREA_RE.match(text)
+        if m:
+            self._add_line(enabled, normalize_area(m.group(1)), m.group(2).strip(_JS_WS_CHARS))
+            return
+
+        m = _OPEN_AREA_RE.match(text)
+        if m:
+            self._block_area = normalize_area(m.group(1))
+            self._block_enabled = enabled
+            self._block_lines = []
+            after = m.group(2) or ""
+            close_idx = after.find("</>")
+            if close_idx != -1:
+                before = after[:close_idx].strip(_JS_WS_CHARS)
+                if before:
+                    self._block_lines.append(before)
+                self._flush_block()
+            else:
+                if after.strip(_JS_WS_CHARS):
+                    self._block_lines.append(after.strip(_JS_WS_CHARS))
+                self._in_block = True
+            return
+
+        self._add_line(enabled, "ALL", text)
+
+    def feed_text(self, chunk: str) -> None:
+        """Feed part of a text; lines end at "\n" or "\r\n" like
+        split(/\r?\n/)."""
+        if "\n" not in chunk:
+            self._pending.append(chunk)
+            return
+        self._pending.append(chunk)
+        lines = "".join(self._pending).split("\n")
+        self._pending = [lines.pop()]
+        for line in lines:
+            self.feed(line[:-1] if line.endswith("\r") else line)
+
+    def finish(self) -> dict:
+        # split() always yields a last (possibly empty) line.
+        self.feed("".join(self._pending))
+        self._pending = []
+        if self._in_block:
+            self._flush_block()
+        if self.root_folder["children"]:
+            self.root["items"].append(self.root_folder)
+        return self.root
+
+
+def parse_folder_text(text: str) -> dict:
+    parser = FolderTextParser()
+    parser.feed_text(text or "")
+    return parser.finish()
+
+
+def parse_folder_file(path: str, encoding: str = "utf-8") -> dict:
+    """Parse a [Folder/Sub] text file in bounded chunks."""
+    parser = FolderTextParser()
+    # newline="": no newline translation; feed_text() splits like the widget.
+    with open(path, "r", encoding=encoding, newline="") as f:
+        while chunk := f.read(READ_CHUNK_CHARS):
+            parser.feed_text(chunk)
+    return parser.finish()
+
+
+# ------------------- compact pf_json (format 1) -------------------
+#
+# {"fp": 1, "areas": ["AR2", ...], "en": "<base64 bitset>", "items": [...], "x": {...}}
+#
+#   "text"                                   line: area ALL, weight derived from text,
+#                                            id = next "line-N", enabled from "en"
+#   {"t": text, "a": 1, "w": 1.2, "i": id, "x": {...}}
+#                                            line with non-default fields ("a" is a
+#                                            1-based index into "areas")
+#   [title, [children], {"a": 1, "e": 1, "i": id, "x": {...}}]
+#                                            folder; the options element is omitted
+#                                            when all defaults (area ALL, collapsed,
+#                                            id "folder-" + titles joined by "_")
+#   {"r": node}                              node that doesn't fit the schema, verbatim
+#
+# "en" holds one bit per compact line in document order, least significant bit
+# first. Derived folder fields are recomputed by the widget and never stored.
+# "e" is view state and only written with view_state=True (imports): the
+# widget keeps it in a node property, so expanding a folder doesn't change
+# pf_json, which ComfyUI includes in the node's cache signature.
+# js/FPFoldedPrompts.js (encodeTree / decodeTree) implements the same format.
+
+COMPACT_VERSION = 1
+DERIVED_FIELDS  = frozenset(("_hasAnyEnabled", "_hasAnyDisabled", "_partialSelected", "_derivedEnabled"))
+_LINE_KEYS      = frozenset(("type", "id", "enabled", "area", "text", "weight"))
+_FOLDER_KEYS    = frozenset(("type", "id", "title", "expanded", "area", "children"))
+_LINE_ID_RE     = re.compile(r"\Aline-(0|[1-9][0-9]{0,14})\Z")
+
+
+def is_compact(doc: Any) -> bool:
+    return isinstance(doc, dict) and "fp" in doc
+
+
+def _strip_derived(node: Any) -> Any:
+    if isinstance(node, dict):
+        return {k: _strip_derived(v) for k, v in node.items() if k not in DERIVED_FIELDS}
+    if isinstance(node, list):
+        return [_strip_derived(v) for v in node]
+    return node
+
+
+def _extras(item: dict, known: frozenset) -> dict:
+    return {k: v for k, v in item.items() if k not in known and k not in DERIVED_FIELDS}
+
+
+def _next_line_id(line_id: str, expected: int) -> int:
+    m = _LINE_ID_RE.match(line_id)
+    return int(m.group(1)) + 1 if m else expected + 1
+
+
+def _js_number_value(value: float) -> int | float:
+    # JSON.stringify(1.0) === "1", but JSON.stringify(1e21) === "1e+21"
+    return int(value) if value == int(value) and abs(value) < 1e21 else value
+
+
+def encode_tree(tree: Any, view_state: bool = False) -> Any:
+    """Compact a verbose tree. Anything that isn't a tree is returned as is.
+    Folders' expanded flags are kept only with view_state."""
+    if is_compact(tree) or not isinstance(tree, dict) or not isinstance(tree.get("items"), list):
+        return tree
+
+    areas: dict[str, int] = {}
+    bits: list[bool] = []
+    next_id = 1
+
+    def area_ref(area: str) -> int:
+        if area not in areas:
+            areas[area] = len(areas) + 1
+        return areas[area]
+
+    def enc(item, path):
+        nonlocal next_id
+        if not isinstance(item, dict):
+            return {"r": _strip_derived(item)}
+        itype = item.get("type")
+
+        if itype == "line":
+            text, weight, line_id = item.get("text"), item.get("weight"), item.get("id")
+            if not (
+                isinstance(text, str) and isinstance(item.get("enabled"), bool)
+                and isinstance(item.get("area"), str) and isinstance(line_id, str)
+                and "weight" in item
+            ):
+                return {"r": _strip_derived(item)}
+            out = {}
+            if item["area"] != "ALL":
+                out["a"] = area_ref(item["area"])
+            if not (_is_js_number(weight) and weight == detect_line_weight(text)):
+                out["w"] = weight
+            if line_id != f"line-{next_id}":
+                out["i"] = line_id
+            next_id = _next_line_id(line_id, next_id)
+            extras = _extras(item, _LINE_KEYS)
+            if extras:
+                out["x"] = extras
+            bits.append(item["enabled"])
+            if not out:
+                return text
+            return {"t": text, **out}
+
+        if itype == "folder":
+            title, children, folder_id = item.get("title"), item.get("children"), item.get("id")
+            if not (
+                isinstance(title, str) and isinstance(children, list)
+                and isinstance(item.get("area"), str) and isinstance(item.get("expanded"), bool)
+                and isinstance(folder_id, str)
+            ):
+                return {"r": _strip_derived(item)}
+            sub_path = path + (title,)
+            encoded = [title, [enc(child, sub_path) for child in children]]
+            opts = {}
+            if item["area"] != "ALL":
+                opts["a"] = area_ref(item["area"])
+            if view_state and item["expanded"]:
+                opts["e"] = 1
+            if folder_id != "folder-" + "_".join(sub_path):
+                opts["i"] = folder_id
+            extras = _extras(item, _FOLDER_KEYS)
+            if extras:
+                opts["x"] = extras
+            if opts:
+                encoded.append(opts)
+            return encoded
+
+        return {"r": _strip_derived(item)}
+
+    items = [enc(item, ()) for item in tree["items"]]
+    packed = bytearray((len(bits) + 7) // 8)
+    for i, bit in enumerate(bits):
+        if bit:
+            packed[i >> 3] |= 1 << (i & 7)
+
+    doc = {"fp": COMPACT_VERSION, "areas": list(areas), "en": base64.b64encode(bytes(packed)).decode("ascii"), "items": items}
+    extras = _extras(tree, frozenset(("items",)))
+    if extras:
+        doc["x"] = extras
+    return doc
+
+
+def decode_tree(doc: Any) -> Any:
+    """Expand a compact document to the verbose schema; verbose trees pass
+    through with derived fields removed."""
+    if not is_compact(doc):
+        return _strip_derived(doc)
+    if doc.get("fp") != COMPACT_VERSION:
+        raise ValueError(f"unsupported pf_json format version: {doc.get('fp')!r}")
+
+    areas = doc.get("areas") or []
+    packed = base64.b64decode(doc.get("en") or "")
+    line_index = 0
+    next_id = 1
+
+    def area_of(ref) -> str:
+        return areas[ref - 1] if isinstance(ref, int) and 0 < ref <= len(areas) else "ALL"
+
+    def dec(node, path):
+        nonlocal line_index, next_id
+        if isinstance(node, list):
+            title, children = node[0], node[1]
+            opts = node[2] if len(node) > 2 else {}
+            sub_path = path + (title,)
+            folder = {
+                "type":     "folder",
+                "id":       opts.get("i", "folder-" + "_".join(sub_path)),
+                "title":    title,
+                "expanded": bool(opts.get("e")),
+                "area":     area_of(opts.get("a")),
+                "children": [dec(child, sub_path) for child in children],
+            }
+            folder.update(opts.get("x") or {})
+            return folder
+
+        if isinstance(node, dict) and "r" in node:
+            return node["r"]
+
+        fields = {"t": node} if isinstance(node, str) else node
+        text = fields["t"]
+        line_id = fields.get("i", f"line-{next_id}")
+        next_id = _next_line_id(line_id, next_id)
+        i = line_index
+        line_index += 1
+        line = {
+            "type":    "line",
+            "id":      line_id,
+            "enabled": i >> 3 < len(packed) and bool(packed[i >> 3] & (1 << (i & 7))),
+            "area":    area_of(fields.get("a")),
+            "text":    text,
+            "weight":  fields["w"] if "w" in fields else _js_number_value(detect_line_weight(text)),
+        }
+        line.update(fields.get("x") or {})
+        return line
+
+    tree = {"items": [dec(node, ()) for node in doc.get("items") or []]}
+    tree.update(doc.get("x") or {})
+    return tree
+
+
+def encode_document(pf_json: str) -> str:
+    return json.dumps(encode_tree(json.loads(pf_json)), ensure_ascii=False, separators=(",", ":"))
+
+
+def load_tree(pf_json: str) -> dict:
+    """Parse pf_json in either the verbose or the compact format."""
+    return decode_tree(json.loads(pf_json))
+
+
+def render_document(pf_json: str) -> str:
+    return render_tree(load_tree(pf_json))
+
+
+def render_documents(documents: Iterable[str]) -> list[str | None]:
+    """Render many pf_json strings; unparsable documents yield None."""
+    results = []
+    for doc in documents:
+        try:
+            results.append(render_document(doc))
+        except Exception as e:
+            print(f"[fp_tree] Failed to render document: {e}", file=sys.stderr)
+            results.append(None)
+    return results
+
+
+def _tree_store(root: str):
+    # fp_store imports its siblings relatively; as a script, load it as
+    # nodes.fp_store from the repo root.
+    if __package__:
+        from .fp_store import TreeStore
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from nodes.fp_store import TreeStore
+    return TreeStore(root)
+
+
+def _read_file(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _iter_sources(paths: Iterable[str]) -> Iterator[tuple[str, str, Callable[[], str | None]]]:
+    """(label, output stem, reader) for every tree under `paths`: files as
+    given, and for a directory its *.json files plus every tree its store
+    (blobs/ and refs/, see fp_store) points to."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, os.path.splitext(os.path.basename(path))[0], functools.partial(_read_file, path)
+            continue
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".json"):
+                file_path = os.path.join(path, name)
+                yield file_path, name[:-len(".json")], functools.partial(_read_file, file_path)
+        store = _tree_store(path)
+        for ref in sorted(name for name, _, _, _ in store.iter_refs()):
+            label = os.path.join(path, "refs", ref + ".ref")
+            yield label, ref, functools.partial(store.read_ref, ref)
+
+
+def render_files(paths: Iterable[str]) -> Iterator[tuple[str, str, str | None]]:
+    """Yield (label, output stem, text) per tree; text is None on failure."""
+    for label, name, read in _iter_sources(paths):
+        try:
+            content = read()
+            if content is None:
+                raise OSError("missing ref or blob")
+            yield label, name, render_document(content)
+        except Exception as e:
+            print(f"[fp_tree] {label}: {e}", file=sys.stderr)
+            yield label, name, None
+
+
+def import_files(paths: Iterable[str], out_dir: str | None) -> int:
+    failed = 0
+    for path in paths:
+        try:
+            doc = json.dumps(encode_tree(parse_folder_file(path), view_state=True), ensure_ascii=False, separators=(",", ":"))
+        except Exception as e:
+            print(f"[fp_tree] {path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0] + ".json"
+            with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+                f.write(doc)
+        else:
+            sys.stdout.write(json.dumps({"file": path, "pf_json": doc}, ensure_ascii=False) + "\n")
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render FP Folded Prompts trees headlessly.")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="pf_json files or directories (e.g. pf_data/, including the trees its store refs point to)",
+    )
+    parser.add_argument("--out-dir", help="write <name>.txt per tree instead of JSON lines on stdout")
+    parser.add_argument(
+        "--from-text",
+        action="store_true",
+        help="paths are [Folder/Sub] text files: convert them to pf_json (<name>.json) instead",
+    )
+    args = parser.parse_args(argv)
+    if args.from_text:
+        return import_files(args.paths, args.out_dir)
+
+    failed = 0
+    for label, name, text in render_files(args.paths):
+        if text is None:
+            failed += 1
+            continue
+        if args.out_dir:
+            # Store refs are "<workflow>/<node>": one subdirectory per workflow.
+            out_path = os.path.join(args.out_dir, name + ".txt")
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(json.dumps({"file": label, "text": text}, ensure_ascii=False) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
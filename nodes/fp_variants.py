@@ -0,0 +1,205 @@
+"""Lazy, indexable prompt variants over a folder tree.
+
+A folder whose title ends in "[pick]" or "[pick k]" contributes exactly k
+of its enabled options (a line, or a sub-folder containing at least one
+enabled line) instead of all of them; every other folder contributes all
+of its enabled content. The variants of a tree form a mixed-radix space:
+
+    count(line)          = 1
+    count(folder)        = prod(count(child))
+    count(pick-k folder) = e_k(count(option_1), ..., count(option_n))
+
+where e_k is the elementary symmetric polynomial. Counts are Python ints,
+so spaces of 10**8 and far beyond are fine; variant i is built by
+unranking i directly, and nothing is ever enumerated. A variant renders
+exactly like fp_tree.render_tree would render the tree restricted to the
+chosen lines.
+"""
+import re
+import hashlib
+from typing import Iterator
+
+from .fp_tree import apply_weight, js_truthy, line_text, load_tree, render_line, walk_lines
+
+_PICK_RE = re.compile(r"\[\s*pick(?:\s+(\d+))?\s*\]\s*\Z", re.IGNORECASE)
+
+
+def pick_count(title) -> int | None:
+    """k for a "[pick k]" folder title ("[pick]" means 1), else None."""
+    m = _PICK_RE.search(str(title or ""))
+    if m is None:
+        return None
+    return int(m.group(1)) if m.group(1) is not None else 1
+
+
+class _Line:
+    __slots__ = ("text", "count")
+
+    def __init__(self, text: str):
+        self.text  = text
+        self.count = 1
+
+    def unrank(self, index: int, out: list[str]) -> None:
+        out.append(self.text)
+
+
+class _All:
+    """Every child, each contributing one of its own variants."""
+    __slots__ = ("children", "count")
+
+    def __init__(self, children: list):
+        self.children = children
+        self.count = 1
+        for child in children:
+            self.count *= child.count
+
+    def unrank(self, index: int, out: list[str]) -> None:
+        # Last child varies fastest.
+        digits = []
+        for child in reversed(self.children):
+            index, digit = divmod(index, child.count)
+            digits.append(digit)
+        for child, digit in zip(self.children, reversed(digits)):
+            child.unrank(digit, out)
+
+
+class _Pick:
+    """k distinct options in document order, each with one of its variants."""
+    __slots__ = ("options", "k", "suffix", "count")
+
+    def __init__(self, options: list, k: int):
+        self.options = options
+        self.k = min(k, len(options))
+        n = len(options)
+        # suffix[j][m] = e_m(count(options[j:]))
+        self.suffix = [[0] * (self.k + 1) for _ in range(n + 1)]
+        self.suffix[n][0] = 1
+        for j in range(n - 1, -1, -1):
+            c = options[j].count
+            below, row = self.suffix[j + 1], self.suffix[j]
+            row[0] = 1
+            for m in range(1, self.k + 1):
+                row[m] = below[m] + c * below[m - 1]
+        self.count = self.suffix[0][self.k]
+
+    def unrank(self, index: int, out: list[str]) -> None:
+        m = self.k
+        for j, option in enumerate(self.options):
+            if m == 0:
+                break
+            rest = self.suffix[j + 1][m - 1]
+            with_j = option.count * rest
+            if index < with_j:
+                sub, index = divmod(index, rest)
+                option.unrank(sub, out)
+                m -= 1
+            else:
+                index -= with_j
+
+
+def _close_folder(stack: list) -> None:
+    folder, children = stack.pop()
+    k = pick_count(folder.get("title"))
+    stack[-1][1].append(_Pick(children, k) if k is not None else _All(children))
+
+
+def _compile(tree: dict) -> list:
+    """The enabled lines of fp_tree.walk_lines, grouped back into their
+    folders; folders without enabled lines are left out."""
+    root: list = []
+    stack = [(None, root)]      # (folder item, compiled children)
+    last_folders = ()
+    append = root.append
+    for item, area, _, folders in walk_lines(tree):
+        if not js_truthy(item.get("enabled")):
+            continue
+        # walk_lines passes the same folders tuple for every line of a folder.
+        if folders is not last_folders:
+            depth = 0
+            while depth < len(folders) and depth + 1 < len(stack) and stack[depth + 1][0] is folders[depth]:
+                depth += 1
+            while len(stack) > depth + 1:
+                _close_folder(stack)
+            stack.extend((folder, []) for folder in folders[depth:])
+            last_folders = folders
+            append = stack[-1][1].append
+        append(_Line(render_line(apply_weight(line_text(item), item.get("weight")), area)))
+    while len(stack) > 1:
+        _close_folder(stack)
+    return root
+
+
+class _Permutation:
+    """Seeded bijection on [0, n): a balanced Feistel network over the
+    smallest even bit width covering n, cycle-walked back into range."""
+
+    _ROUNDS = 4
+
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        self.half = max(1, (max(0, n - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half) - 1
+        self.key = str(seed).encode()
+
+    def _round(self, r: int, value: int) -> int:
+        h = hashlib.blake2b(
+            value.to_bytes((self.half + 7) // 8 or 1, "little"),
+            key=self.key[:64],
+            person=r.to_bytes(16, "little"),
+            digest_size=max(8, min(64, (self.half + 7) // 8)),
+        ).digest()
+        return int.from_bytes(h, "little") & self.mask
+
+    def _encrypt(self, x: int) -> int:
+        left, right = x >> self.half, x & self.mask
+        for r in range(self._ROUNDS):
+            left, right = right, left ^ self._round(r, right)
+        return (left << self.half) | right
+
+    def apply(self, x: int) -> int:
+        x = self._encrypt(x)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+
+class VariantSpace:
+    """Random-access view over every variant of a tree.
+
+    `count` is the number of variants (may exceed sys.maxsize, so len()
+    is not supported); `variant(i)` renders variant i."""
+
+    def __init__(self, tree: dict):
+        self._root = _All(_compile(tree))
+        self.count = self._root.count
+
+    @classmethod
+    def from_json(cls, pf_json: str) -> "VariantSpace":
+        return cls(load_tree(pf_json))
+
+    def variant(self, index: int) -> str:
+        if not 0 <= index < self.count:
+            raise IndexError(f"variant index {index} out of range (0..{self.count - 1})")
+        out: list[str] = []
+        self._root.unrank(index, out)
+        return "\n".join(out)
+
+    __getitem__ = variant
+
+    def indices(self, start: int, count: int) -> range:
+        start = max(0, start)
+        return range(start, min(start + max(0, count), self.count))
+
+    def shuffled_indices(self, start: int, count: int, seed: int) -> list[int]:
+        """Variant indices at positions [start, start + count) of a seeded
+        shuffle of all variants.
+
+        The shuffle is a permutation, so consecutive chunks never repeat a
+        variant until all of them have been visited, and any chunk is
+        computed directly without generating the ones before it."""
+        perm = _Permutation(self.count, seed)
+        return [perm.apply(position) for position in self.indices(start, count)]
+
+    def iter_variants(self, indices) -> Iterator[tuple[int, str]]:
+        for index in indices:
+            yield index, self.variant(index)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import nodes through bench.stubs (ComfyUI isn't installed here).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+// Checks the widget's tree functions in js/FPFoldedPrompts.js against the
+// fixtures tests/test_fp_tree_fixtures.py checks nodes/fp_tree.py with.
+//
+//     node tests/js/check_fp_tree_fixtures.mjs
+//
+// The widget file needs ComfyUI to load, so the functions below are cut
+// out of its source by name and evaluated on their own.
+
+import { readFileSync } from "node:fs";
+import { dirname, join } from "node:path";
+import { fileURLToPath } from "node:url";
+
+const here = dirname(fileURLToPath(import.meta.url));
+const root = join(here, "..", "..");
+
+const CONSTS = ["AREA_TAG", "SINGLE_AREA_RE", "OPEN_AREA_RE", "TREE_WEIGHT_BASE", "TREE_WEIGHT_MIN"];
+const FUNCTIONS = ["normalizeArea", "detectLineWeightFromText", "applyWeightToLineText", "parseFolderTextToTree"];
+
+function extractConst(source, name) {
+    const m = new RegExp("^\\s*const " + name + " = .*;$", "m").exec(source);
+    if (!m) throw new Error("const not found: " + name);
+    return m[0].trim();
+}
+
+function extractFunction(source, name) {
+    const start = source.indexOf("function " + name + "(");
+    if (start === -1) throw new Error("function not found: " + name);
+    let depth = 0;
+    for (let i = source.indexOf("{", start); i < source.length; i++) {
+        if (source[i] === "{") depth++;
+        else if (source[i] === "}" && --depth === 0) return source.slice(start, i + 1);
+    }
+    throw new Error("unbalanced function: " + name);
+}
+
+function loadWidgetFunctions() {
+    const source = readFileSync(join(root, "js", "FPFoldedPrompts.js"), "utf8");
+    const body = [
+        "const log = () => {};",
+        ...CONSTS.map((name) => extractConst(source, name)),
+        ...FUNCTIONS.map((name) => extractFunction(source, name)),
+        "return { " + FUNCTIONS.join(", ") + " };",
+    ].join("\n");
+    return new Function(body)();
+}
+
+const { detectLineWeightFromText, applyWeightToLineText, parseFolderTextToTree } = loadWidgetFunctions();
+
+// The compile walk of nodes/fp_tree.py (iter_lines / render_tree), with the
+// widget's weight rule: a folder's non-ALL area overrides its children.
+function renderTree(tree) {
+    const out = [];
+    (function walk(items, parentArea) {
+        for (const item of items || []) {
+            if (!item || typeof item !== "object" || Array.isArray(item)) continue;
+            const area = item.area || "ALL";
+            const current = parentArea !== "ALL" ? parentArea : area;
+            if (item.type === "folder") {
+                walk(item.children, current);
+            } else if (item.type === "line" && item.enabled) {
+                const text = applyWeightToLineText(item.text || "", item.weight);
+                out.push(current && current !== "ALL" ? `<${current}>${text}</>` : text);
+            }
+        }
+    })(tree.items, "ALL");
+    return out.join("\n");
+}
+
+function readFixture(name) {
+    return JSON.parse(readFileSync(join(root, "tests", "fixtures", name), "utf8"));
+}
+
+let failures = 0;
+let checked = 0;
+
+function check(label, actual, expected) {
+    checked++;
+    if (actual !== expected) {
+        failures++;
+        if (failures <= 20) {
+            console.error(`FAIL ${label}\n  expected ${JSON.stringify(expected)}\n  actual   ${JSON.stringify(actual)}`);
+        }
+    }
+}
+
+const render = readFixture("tree_render.json");
+render.weights.forEach((c, i) => {
+    check(`weights[${i}] apply`, applyWeightToLineText(c.text, c.weight), c.applied);
+    check(`weights[${i}] detect`, detectLineWeightFromText(c.text), c.detected);
+});
+render.trees.forEach((c, i) => check(`trees[${i}]`, renderTree(c.tree), c.text));
+
+readFixture("folder_text.json").forEach((c, i) => {
+    check(`folder_text[${i}]`, JSON.stringify(parseFolderTextToTree(c.text)), JSON.stringify(c.tree));
+});
+
+console.log(`${checked - failures}/${checked} checks passed`);
+process.exit(failures ? 1 : 0);
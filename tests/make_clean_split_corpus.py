@@ -0,0 +1,118 @@
+"""Regenerate tests/fixtures/clean_split_parity.json.
+
+The expected outputs come from the original FPTextCleanAndSplitt (the
+regex implementation, before the lexer), so the corpus pins what
+existing workflows got. Pass that file's source:
+
+    git show 56b4db3:nodes/FPTextCleanAndSplitt.py > /tmp/reference.py
+    python tests/make_clean_split_corpus.py /tmp/reference.py
+
+Only AR1..AR5 markers are generated: the reference has no other regions.
+"""
+import importlib.util
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench.stubs import install_stubs  # noqa: E402
+
+FIXTURE = os.path.join(HERE, "fixtures", "clean_split_parity.json")
+SEED    = 4004
+COUNT   = 300
+
+PREFIXES = ["//", "#", "--", ";;"]
+WORDS    = ["cat", "dog", "red hat", "(blue:1.2)", "1girl", "sky", "a, b", ",", " , ,", "  ", "\t", "x,", ",y", "é", "<lora:z:0.5>"]
+
+EDGE_CASES = [
+    ("", "", "", "//"),
+    ("   \n\n  ", "", "", "//"),
+    ("cat, dog", "", "", "//"),
+    ("<AR1>cat</>", "", "", "//"),
+    ("<ar3>cat, , dog,</>", "", "", "//"),
+    ("<AR1>a</><AR1>b</>\n<AR5>c</>", "", "", "//"),
+    ("<AR2>open only", "", "", "//"),
+    ("</> stray close", "", "", "//"),
+    ("<AR1>\n// hidden\nshown\n</>", "", "", "//"),
+    ("line\r\n<AR4>crlf\r\nblock</>\r\n", "", "", "//"),
+    ("<AR2>x</>", "before", "after", "//"),
+    ("", "<AR1>from before</>", "", "//"),
+    ("body", "", "<AR3>from after</>", "#"),
+    ("<AR1> , </>", "b", "a", "//"),
+    ("a\n\n\n\nb", "\n\nb\n", "\na\n\n", "--"),
+    ("  // indented comment\ntext // not a comment", "", "", "//"),
+]
+
+
+def load_reference(path: str):
+    install_stubs()
+    spec = importlib.util.spec_from_file_location("clean_split_reference", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def random_text(rng: random.Random, prefix: str) -> str:
+    lines = []
+    for _ in range(rng.randint(0, 8)):
+        kind = rng.random()
+        words = ", ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+        if kind < 0.2:
+            lines.append(" " * rng.randint(0, 2) + prefix + " " + words)
+        elif kind < 0.55:
+            tag = f"AR{rng.randint(1, 5)}"
+            tag = tag.lower() if rng.random() < 0.2 else tag
+            inner = words
+            if rng.random() < 0.3:
+                inner += "\n" + ", ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 3)))
+            if rng.random() < 0.15:
+                inner += "\n" + prefix + " hidden"
+            close = "</>" if rng.random() < 0.9 else ""
+            lines.append(f"{rng.choice(['', 'x ', ' '])}<{tag}>{inner}{close}{rng.choice(['', ' tail', ','])}")
+        elif kind < 0.65:
+            lines.append("")
+        else:
+            lines.append(words)
+    sep = "\r\n" if rng.random() < 0.1 else "\n"
+    return sep.join(lines)
+
+
+def make_cases() -> list[tuple[str, str, str, str]]:
+    rng = random.Random(SEED)
+    cases = list(EDGE_CASES)
+    while len(cases) < COUNT:
+        prefix = rng.choice(PREFIXES)
+        before = random_text(rng, prefix) if rng.random() < 0.25 else rng.choice(["", "", "masterpiece"])
+        after  = random_text(rng, prefix) if rng.random() < 0.2 else rng.choice(["", "", "lowres"])
+        cases.append((random_text(rng, prefix), before, after, prefix))
+    return cases
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) != 1:
+        print(__doc__)
+        return 2
+    reference = load_reference(argv[0])
+    cls = reference.FPTextCleanAndSplitt
+    corpus = []
+    for text, before, after, prefix in make_cases():
+        reference.load_comment_prefix = lambda prefix=prefix: prefix
+        out = cls.execute(text=text, before_text=before, after_text=after)
+        comments, areas, ar_list, impact = out.args
+        corpus.append({
+            "text": text, "before_text": before, "after_text": after, "comment_prefix": prefix,
+            "all_expt_comments": comments, "all_expt_areas": areas,
+            "ar_list": ar_list, "impact_wildcard": impact,
+        })
+    with open(FIXTURE, "w", encoding="utf-8", newline="\n") as f:
+        # One case per line keeps diffs readable.
+        f.write("[\n" + ",\n".join(json.dumps(case, ensure_ascii=False) for case in corpus) + "\n]\n")
+    print(f"wrote {len(corpus)} cases to {FIXTURE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
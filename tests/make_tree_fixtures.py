@@ -0,0 +1,140 @@
+"""Regenerate the fixtures shared by the Python and JS tree tests:
+
+    tests/fixtures/tree_render.json   fp_tree.render_tree() / apply_weight()
+    tests/fixtures/folder_text.json   fp_tree.FolderTextParser
+
+Expected values come from fp_tree; tests/js/check_fp_tree_fixtures.mjs
+checks that the widget functions in js/FPFoldedPrompts.js agree. Run both
+after regenerating:
+
+    python tests/make_tree_fixtures.py
+    node tests/js/check_fp_tree_fixtures.mjs
+"""
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench.stubs import load_node_module  # noqa: E402
+
+fp_tree = load_node_module("fp_tree")
+
+FIXTURES = os.path.join(HERE, "fixtures")
+SEED     = 9023
+
+TEXTS   = ["cat", "cat, ", "(cat:1.5)", "(cat:1.50), ", "(a, b:0.05)", "(x:1)", "red hat,", "", " ", "(é:2.345) ,\t",
+           "(nested (x:1.2):0.9)", "a, ", "(:1.2)", "(cat:1.2) x", "1girl, solo", "　(wide:1.1)　"]
+WEIGHTS = [1, 1.0, 0.5, 1.25, 1.255, 0.005, 0.1, 2, 10.004, -3, None, "1.5", True, False]
+AREAS   = ["ALL", "AR1", "AR2", "AR12", "AR:face", "", None]
+ENABLED = [True, True, True, False, None, 0, 1, "", "yes"]
+
+WEIGHT_EDGE_CASES = [
+    ("(cat:1.5)", 1.0), ("(cat:1.5), ", 1.5), ("(cat:1.5)", 1.499999), ("cat", 0.01), ("cat, ", 1.005),
+    ("cat,\n", 2), ("a\nb, ", 1.3), ("(a\nb:1.2)", 0.7), ("", 1.2), ("(x:0.09)", 1.0),
+]
+
+FOLDER_TEXT_EDGE_CASES = [
+    "",
+    "\n\n",
+    "cat\ndog",
+    "[ROOT]\ncat\n[root]\ndog",
+    "[A/B/]\nx\n[A]\ny\n[ A / B ]\nz",
+    "// disabled\n//(cat:1.2)\n  // indented is text",
+    "<AR1>one</>\n<ar2> two </>  \n<AR:face>named</>",
+    "<AR3>\nmulti\n\n  line  \n</>\nafter",
+    "<AR1>open then\nclose</> trailing",
+    "//<AR2>disabled block\nline</>",
+    "<AR4>never closed\nstill in block",
+    "<AR5></>\n<AR6>  </>\n<AR1>\n</>",
+    "[]\n[/]\n[//]\nx",
+    "a\r\nb\rc\r\n\r\n[F]\r\nd",
+    " padded \n sep ",
+    "<ARx>not a region</>\n<AR:>nope</>\n<AR:a b>nope</>",
+    "(weighted:1.35), \n(low:0.05)\n(bad:1.2.3)",
+]
+
+PARSE_WORDS = ["cat", "dog, ", "(w:1.3)", "(w:0.5), ", "a, b", " ", " x", "é"]
+
+
+def random_item(rng: random.Random, depth: int) -> dict:
+    if depth < 3 and rng.random() < 0.25:
+        folder = {"type": "folder", "title": rng.choice(["F", "G", "", "Sub"]), "children": []}
+        if rng.random() < 0.5:
+            folder["area"] = rng.choice(AREAS)
+        folder["children"] = [random_item(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+        return folder
+    line = {"type": "line", "text": rng.choice(TEXTS)}
+    for key, choices in (("enabled", ENABLED), ("weight", WEIGHTS), ("area", AREAS)):
+        if rng.random() < 0.85:
+            line[key] = rng.choice(choices)
+    return line
+
+
+def random_folder_text(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(0, 12)):
+        kind = rng.random()
+        words = ", ".join(rng.choice(PARSE_WORDS) for _ in range(rng.randint(0, 3)))
+        if kind < 0.15:
+            lines.append("[" + "/".join(rng.choice(["A", "B", " C ", "root", ""]) for _ in range(rng.randint(1, 3))) + "]")
+        elif kind < 0.3:
+            lines.append("//" + rng.choice(["", " "]) + words)
+        elif kind < 0.5:
+            tag = rng.choice(["AR1", "ar2", "AR10", "AR:face", "AR:"])
+            close = rng.choice(["</>", "</>", "", " </> x"])
+            lines.append(f"{rng.choice(['', '//'])}<{tag}>{words}{close}")
+        elif kind < 0.6:
+            lines.append(rng.choice(["", "  ", "</>"]))
+        else:
+            lines.append(words + rng.choice(["", " ", "\t"]))
+    return rng.choice(["\n", "\n", "\r\n"]).join(lines)
+
+
+def make_render_fixture(rng: random.Random) -> dict:
+    weights = [{"text": t, "weight": w} for t, w in WEIGHT_EDGE_CASES]
+    weights += [{"text": rng.choice(TEXTS), "weight": rng.choice(WEIGHTS)} for _ in range(120)]
+    for case in weights:
+        case["applied"]  = fp_tree.apply_weight(case["text"], case["weight"])
+        case["detected"] = fp_tree.detect_line_weight(case["text"])
+
+    trees = [{"items": []}, {"items": [{"type": "line", "text": "cat"}]}]
+    trees += [{"items": [random_item(rng, 0) for _ in range(rng.randint(1, 6))]} for _ in range(120)]
+    return {
+        "weights": weights,
+        "trees": [{"tree": tree, "text": fp_tree.render_tree(tree)} for tree in trees],
+    }
+
+
+def make_folder_text_fixture(rng: random.Random) -> list[dict]:
+    texts = FOLDER_TEXT_EDGE_CASES + [random_folder_text(rng) for _ in range(120)]
+    return [{"text": text, "tree": fp_tree.parse_folder_text(text)} for text in texts]
+
+
+def _dump_list(cases: list) -> str:
+    # One case per line keeps diffs readable.
+    return "[\n" + ",\n".join(json.dumps(case, ensure_ascii=False) for case in cases) + "\n]"
+
+
+def write(name: str, data) -> None:
+    path = os.path.join(FIXTURES, name)
+    if isinstance(data, dict):
+        text = "{\n" + ",\n".join(f"{json.dumps(key)}: {_dump_list(cases)}" for key, cases in data.items()) + "\n}\n"
+    else:
+        text = _dump_list(data) + "\n"
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    print(f"wrote {path}")
+
+
+def main() -> int:
+    rng = random.Random(SEED)
+    write("tree_render.json", make_render_fixture(rng))
+    write("folder_text.json", make_folder_text_fixture(rng))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
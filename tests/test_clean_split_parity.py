@@ -0,0 +1,37 @@
+"""FPTextCleanAndSplitt against the outputs of its original implementation.
+
+The corpus is generated by tests/make_clean_split_corpus.py; AR1..AR5
+outputs must stay identical for existing workflows.
+"""
+import importlib
+import json
+import os
+
+import pytest
+
+from bench.stubs import load_node_module
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "clean_split_parity.json")
+
+with open(FIXTURE, encoding="utf-8") as f:
+    CASES = json.load(f)
+
+node = load_node_module("FPTextCleanAndSplitt")
+PromptDoc = importlib.import_module(node.__package__ + ".fp_prompt_doc").PromptDoc
+
+
+def expected(case: dict) -> tuple:
+    return case["all_expt_comments"], case["all_expt_areas"], case["ar_list"], case["impact_wildcard"]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[f"case{i}" for i in range(len(CASES))])
+def test_clean_and_split(case):
+    out = node.clean_and_split(case["text"], case["before_text"], case["after_text"], case["comment_prefix"])
+    assert (out[0], out[1], out[2][:5], out[3]) == expected(case)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[f"case{i}" for i in range(len(CASES))])
+def test_doc_clean_and_split(case):
+    doc = PromptDoc.from_text(case["text"])
+    out = node.doc_clean_and_split(doc, case["before_text"], case["after_text"], case["comment_prefix"])
+    assert (out[0], out[1], out[2][:5], out[3]) == expected(case)
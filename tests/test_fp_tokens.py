@@ -0,0 +1,106 @@
+"""fp_tokens chunk packing and BREAK handling."""
+import random
+
+import pytest
+
+from bench.stubs import load_node_module
+
+fp_tokens = load_node_module("fp_tokens")
+
+
+def _naive_ffd(counts, capacity):
+    # Textbook first-fit decreasing, scanning every bin for every line.
+    bins, free = [], []
+    for i in sorted(range(len(counts)), key=lambda i: -counts[i]):
+        n = max(0, counts[i])
+        for b, left in enumerate(free):
+            if n <= left:
+                bins[b].append(i)
+                free[b] -= n
+                break
+        else:
+            bins.append([i])
+            free.append(capacity - n if n <= capacity else -1)
+    return sorted((sorted(group) for group in bins), key=lambda group: group[0])
+
+
+def _optimal_bins(counts, capacity):
+    best = len(counts)
+
+    def place(k, free):
+        nonlocal best
+        if len(free) >= best:
+            return
+        if k == len(counts):
+            best = len(free)
+            return
+        n = counts[k]
+        for b in range(len(free)):
+            if n <= free[b]:
+                free[b] -= n
+                place(k + 1, free)
+                free[b] += n
+        free.append(capacity - n)
+        place(k + 1, free)
+        free.pop()
+
+    place(0, [])
+    return best
+
+
+def _random_counts(rng, capacity):
+    return [rng.randint(1, capacity) for _ in range(rng.randint(1, 9))]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_pack_lines_matches_first_fit_decreasing(seed):
+    rng = random.Random(seed)
+    capacity = rng.choice((10, 20, 75))
+    counts = _random_counts(rng, capacity)
+    groups = fp_tokens.pack_lines(counts, capacity)
+    assert groups == _naive_ffd(counts, capacity)
+    # FFD's bound: at most 11/9 OPT + 6/9 chunks.
+    assert 9 * len(groups) <= 11 * _optimal_bins(sorted(counts, reverse=True), capacity) + 6
+
+
+def test_pack_lines_keeps_order_and_capacity():
+    counts = [40, 30, 50, 20, 35, 10, 70, 5]
+    groups = fp_tokens.pack_lines(counts)
+    assert sorted(i for group in groups for i in group) == list(range(len(counts)))
+    assert [group[0] for group in groups] == sorted(group[0] for group in groups)
+    for group in groups:
+        assert group == sorted(group)
+        assert sum(counts[i] for i in group) <= fp_tokens.CHUNK_TOKENS
+    assert len(groups) == 4
+
+
+def test_pack_lines_oversize_lines_get_their_own_chunk():
+    groups = fp_tokens.pack_lines([5, 200, 80, 5], 75)
+    assert [1] in groups and [2] in groups
+    assert [0, 3] in groups
+
+
+def _tree(*lines):
+    return {"items": [
+        {"type": "line", "text": text, "enabled": True, **({"area": area} if area else {})}
+        for text, area in lines
+    ]}
+
+
+def test_render_packed_keeps_break_outside_regions():
+    word = " ".join(["w"] * 50)
+    tree = _tree((word, None), ("r1", "AR1"), (word, None), ("r2", "AR1"), ("s", "AR2"), ("x", None))
+    text = fp_tokens.render_packed(tree)
+    assert text.split("\n") == [word, "x", "BREAK", word, "<AR1>r1</>", "<AR1>r2</>", "<AR2>s</>"]
+
+
+def test_iter_packed_region_lines_keep_order():
+    lines = [(" ".join(["w"] * n), "AR1") for n in (10, 70, 60, 10)]
+    assert list(fp_tokens.iter_packed(lines)) == lines
+
+
+def test_text_token_stats_skips_break_lines():
+    stats = fp_tokens.text_token_stats("a b c\nBREAK\nd e")
+    assert stats["tokens"] == 5
+    assert stats["regions"] == {"ALL": {"tokens": 5, "chunks": 1}}
+    assert fp_tokens.COUNTER.count_lines("BREAK\n  BREAK  ") == 0
@@ -0,0 +1,60 @@
+"""fp_tree against the fixtures shared with the widget's JS functions
+(tests/js/check_fp_tree_fixtures.mjs checks the same files)."""
+import json
+import os
+import random
+
+import pytest
+
+from bench.stubs import load_node_module
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+fp_tree = load_node_module("fp_tree")
+
+
+def _load(name: str):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ordered(value):
+    # JSON.stringify compares key order too.
+    if isinstance(value, dict):
+        return [(key, _ordered(item)) for key, item in value.items()]
+    if isinstance(value, list):
+        return [_ordered(item) for item in value]
+    return value
+
+
+RENDER      = _load("tree_render.json")
+FOLDER_TEXT = _load("folder_text.json")
+
+
+@pytest.mark.parametrize("case", RENDER["weights"], ids=[f"weights{i}" for i in range(len(RENDER["weights"]))])
+def test_apply_weight(case):
+    assert fp_tree.apply_weight(case["text"], case["weight"]) == case["applied"]
+    assert fp_tree.detect_line_weight(case["text"]) == case["detected"]
+
+
+@pytest.mark.parametrize("case", RENDER["trees"], ids=[f"trees{i}" for i in range(len(RENDER["trees"]))])
+def test_render_tree(case):
+    assert fp_tree.render_tree(case["tree"]) == case["text"]
+
+
+@pytest.mark.parametrize("case", FOLDER_TEXT, ids=[f"folder_text{i}" for i in range(len(FOLDER_TEXT))])
+def test_folder_text_parser(case):
+    assert _ordered(fp_tree.parse_folder_text(case["text"])) == _ordered(case["tree"])
+
+
+@pytest.mark.parametrize("case", FOLDER_TEXT, ids=[f"folder_text{i}" for i in range(len(FOLDER_TEXT))])
+def test_folder_text_parser_chunked(case):
+    text = case["text"]
+    rng = random.Random(len(text))
+    parser = fp_tree.FolderTextParser()
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 7)
+        parser.feed_text(text[pos:pos + step])
+        pos += step
+    assert _ordered(parser.finish()) == _ordered(case["tree"])